@@ -1,11 +1,31 @@
 import os
 from flask import Flask
 from flask_jwt_extended import JWTManager
-from .models import db
+from .models import db, migrate
+from .repository import search
+from .repository.routing import replica_router
+from .repository.text_cache import text_cache
+from .repository.write_behind import write_behind
+from .utils.compression import response_codec
 from .utils.logging import configure_logging
+from .utils.query_stats import query_instrumentation
 from .routes.auth import auth_bp
 from .routes.api import api_bp
 from .middleware.logging_middleware import LoggingMiddleware
+from .cli import register_commands
+from .service.factory import AIProviderFactory
+from .service.cache import response_cache
+from .service.coalescing import single_flight
+from .service.providers.http_pool import http_pool
+from .service.circuit_breaker import circuit_breakers
+from .service.rate_limiter import rate_limiters
+from .service.retry import retry_policy
+from .service.job_worker import job_workers
+from .service.purge_worker import purge_worker
+from .service.retention_worker import retention_worker
+
+# Resolved against the project root so `flask db` works from any directory
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
 
 
 def create_app(config_class=None):
@@ -23,11 +43,39 @@ def create_app(config_class=None):
 
     # Initialize extensions
     db.init_app(app)
+    migrate.init_app(
+        app,
+        db,
+        directory=MIGRATIONS_DIR,
+        render_as_batch=True,
+        include_name=search.include_name,
+    )
     jwt = JWTManager(app)
 
     # Configure logging
     configure_logging(app)
 
+    # Per-request SQL query counts and timings
+    query_instrumentation.init_app(app)
+
+    # Send repository reads to the read replica when one is configured
+    replica_router.init_app(app)
+
+    # Read-through cache for single-text lookups
+    text_cache.init_app(app)
+
+    # Compressed storage of long responses
+    response_codec.init_app(app)
+
+    # Build pooled AI providers up front so requests reuse them
+    AIProviderFactory.init_app(app)
+    response_cache.init_app(app)
+    single_flight.init_app(app)
+    http_pool.init_app(app)
+    circuit_breakers.init_app(app)
+    rate_limiters.init_app(app)
+    retry_policy.init_app(app)
+
     # Register middleware
     app.wsgi_app = LoggingMiddleware(app.wsgi_app)
 
@@ -35,9 +83,26 @@ def create_app(config_class=None):
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(api_bp, url_prefix="/api")
 
-    # Create database tables if they don't exist
-    with app.app_context():
-        db.create_all()
+    # Create database tables if they don't exist; disable when the schema is
+    # managed with `flask db upgrade`
+    if app.config.get("AUTO_CREATE_TABLES", True):
+        with app.app_context():
+            db.create_all()
+
+    # Background writer for generated texts when write-behind is enabled
+    write_behind.init_app(app)
+
+    # Start background workers for queued generation jobs
+    job_workers.init_app(app)
+
+    # Remove the rows of deleted users in the background
+    purge_worker.init_app(app)
+
+    # Archive and delete texts past their retention policy
+    retention_worker.init_app(app)
+
+    # Register CLI commands
+    register_commands(app)
 
     @app.route("/health")
     def health_check():
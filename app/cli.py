@@ -1,4 +1,6 @@
+import time
 import click
+from flask import current_app
 from flask.cli import with_appcontext
 from .models import db
 
@@ -9,5 +11,178 @@ def init_db_command():
     db.create_all()
     click.echo('Initialized the database.')
 
+@click.command('run-job-worker')
+@click.option('--workers', default=None, type=int, help='Number of worker threads.')
+@with_appcontext
+def run_job_worker_command(workers):
+    """Run generation job workers in the foreground."""
+    from .service.job_worker import job_workers
+
+    app = current_app._get_current_object()
+    job_workers.start(app, size=workers)
+    click.echo('Job workers running. Press Ctrl+C to stop.')
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        click.echo('Stopping job workers...')
+        job_workers.stop()
+
+@click.command('sync-replica')
+@with_appcontext
+def sync_replica_command():
+    """Copy the primary SQLite database onto the replica (local testing)."""
+    from .repository.routing import REPLICA_BIND
+
+    if REPLICA_BIND not in db.engines:
+        raise click.ClickException('No replica bind is configured (set DATABASE_REPLICA_URL).')
+
+    primary, replica = db.engines[None], db.engines[REPLICA_BIND]
+    if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+        raise click.ClickException('sync-replica only copies SQLite databases; use real replication elsewhere.')
+
+    source = primary.raw_connection()
+    target = replica.raw_connection()
+    try:
+        source.driver_connection.backup(target.driver_connection)
+    finally:
+        target.close()
+        source.close()
+    click.echo('Copied the primary database to the replica.')
+
+@click.command('delete-user')
+@click.argument('user_id', type=int)
+@with_appcontext
+def delete_user_command(user_id):
+    """Delete a user; large users are queued for the background purge."""
+    from .repository.purge_repository import PurgeRepository
+    from .repository.user_repository import UserRepository
+
+    if not UserRepository().delete(user_id):
+        raise click.ClickException(f'User {user_id} not found.')
+
+    purge = PurgeRepository().get_latest_for_user(user_id)
+    if purge and purge.status != purge.COMPLETED:
+        click.echo(f'User {user_id} marked deleted; purge {purge.id} queued.')
+    else:
+        click.echo(f'Deleted user {user_id}.')
+
+@click.command('purge-users')
+@with_appcontext
+def purge_users_command():
+    """Run every queued user purge in the foreground."""
+    from .service.purge_worker import purge_worker
+
+    def report(purge):
+        click.echo(
+            f'purge {purge.id} user {purge.user_id}: {purge.status}, '
+            f'{purge.texts_deleted}/{purge.texts_total} texts, {purge.jobs_deleted} jobs'
+        )
+
+    count = 0
+    while purge_worker.run_once(on_progress=report):
+        count += 1
+    click.echo(f'Ran {count} purge(s).')
+
+@click.command('purge-status')
+@with_appcontext
+def purge_status_command():
+    """Show the progress of user purges that have not completed."""
+    from .repository.purge_repository import PurgeRepository
+
+    purges = PurgeRepository().get_active()
+    if not purges:
+        click.echo('No purges in progress.')
+    for purge in purges:
+        info = purge.to_dict()
+        progress = f"{info['progress']:.0%}" if info['progress'] is not None else 'not started'
+        click.echo(
+            f"purge {info['id']} user {info['user_id']}: {info['status']}, {progress} "
+            f"({info['texts_deleted']}/{info['texts_total']} texts), updated {info['updated_at']}"
+        )
+
+@click.command('apply-retention')
+@click.option('--user-id', default=None, type=int, help='Only apply the policy of this user.')
+@click.option('--archive-dir', default=None, help='Overrides RETENTION_ARCHIVE_DIR.')
+@with_appcontext
+def apply_retention_command(user_id, archive_dir):
+    """Archive expired texts to compressed files, then delete them."""
+    from .service.retention_worker import retention_worker
+
+    if archive_dir:
+        retention_worker.archive_dir = archive_dir
+
+    def report(text_user_id, archived, paths):
+        click.echo(f'user {text_user_id}: {archived} text(s) archived')
+
+    totals = retention_worker.run_once(user_id=user_id, on_progress=report)
+    click.echo(
+        f"Archived {totals['archived']} text(s) of {totals['users']} user(s) "
+        f"into {len(totals['files'])} file(s); deleted {totals['deleted']}."
+    )
+
+@click.command('import-archive')
+@click.argument('path', type=click.Path(exists=True))
+@click.option('--batch-size', default=500, type=int, help='Rows inserted per transaction.')
+@with_appcontext
+def import_archive_command(path, batch_size):
+    """Restore archived texts from a file or directory; existing rows are skipped."""
+    from .repository.retention_repository import RetentionRepository
+    from .utils.archive import iter_archive
+
+    repo = RetentionRepository()
+    read = restored = 0
+    batch = []
+    for row in iter_archive(path):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            restored += repo.restore_batch(batch)
+            read += len(batch)
+            batch = []
+    restored += repo.restore_batch(batch)
+    read += len(batch)
+    click.echo(f'Restored {restored} of {read} archived text(s).')
+
+@click.command('set-retention')
+@click.argument('user_id', type=int)
+@click.option('--max-age-days', default=None, type=int, help='0 keeps texts forever; omit to follow the global policy.')
+@click.option('--max-texts', default=None, type=int, help='0 keeps any number; omit to follow the global policy.')
+@with_appcontext
+def set_retention_command(user_id, max_age_days, max_texts):
+    """Override the retention policy of one user."""
+    from .repository.retention_repository import RetentionRepository
+
+    if not RetentionRepository().set_policy(user_id, max_age_days, max_texts):
+        raise click.ClickException(f'User {user_id} not found.')
+    click.echo(f'Retention of user {user_id}: max age {max_age_days} days, max {max_texts} texts (None follows the global policy).')
+
+@click.command('compress-responses')
+@click.option('--batch-size', default=500, type=int, help='Rows rewritten per transaction.')
+@with_appcontext
+def compress_responses_command(batch_size):
+    """Compress stored responses that are long enough (RESPONSE_COMPRESSION_MIN_LENGTH)."""
+    from .repository.text_repository import TextRepository
+    from .utils.compression import response_codec
+
+    if not response_codec.enabled:
+        raise click.ClickException('Set RESPONSE_COMPRESSION_ENABLED=true first.')
+
+    repo = TextRepository()
+    total, after_id = 0, 0
+    while after_id is not None:
+        count, after_id = repo.compress_batch(after_id, batch_size)
+        total += count
+    click.echo(f'Compressed {total} response(s).')
+
 def register_commands(app):
-    app.cli.add_command(init_db_command)
\ No newline at end of file
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(run_job_worker_command)
+    app.cli.add_command(sync_replica_command)
+    app.cli.add_command(delete_user_command)
+    app.cli.add_command(purge_users_command)
+    app.cli.add_command(purge_status_command)
+    app.cli.add_command(apply_retention_command)
+    app.cli.add_command(import_archive_command)
+    app.cli.add_command(set_retention_command)
+    app.cli.add_command(compress_responses_command)
\ No newline at end of file
@@ -1,3 +1,4 @@
+import json
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -18,9 +19,205 @@ class Config:
     if database_url.startswith("postgres://"):
         database_url = database_url.replace("postgres://", "postgresql://", 1)
     SQLALCHEMY_DATABASE_URI = database_url
+    # Optional read replica; repository reads go there, writes to the primary
+    replica_url = os.environ.get("DATABASE_REPLICA_URL")
+    if replica_url and replica_url.startswith("postgres://"):
+        replica_url = replica_url.replace("postgres://", "postgresql://", 1)
+    SQLALCHEMY_BINDS = {"replica": replica_url} if replica_url else {}
+    REPLICA_READS_ENABLED = (
+        os.environ.get("REPLICA_READS_ENABLED", "true").lower() == "true"
+    )
+    # Seconds a user's reads stay on the primary after they write
+    REPLICA_READ_YOUR_WRITES_SECONDS = float(
+        os.environ.get("REPLICA_READ_YOUR_WRITES_SECONDS", 5)
+    )
+    # Run db.create_all() at startup; set to false once migrations manage the schema
+    AUTO_CREATE_TABLES = os.environ.get("AUTO_CREATE_TABLES", "true").lower() == "true"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
     OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+    DEFAULT_AI_PROVIDER = os.environ.get("DEFAULT_AI_PROVIDER", "openai")
+    # Providers built when the worker boots; defaults to DEFAULT_AI_PROVIDER only
+    AI_PROVIDER_PRELOAD = [
+        name.strip()
+        for name in os.environ.get("AI_PROVIDER_PRELOAD", "").split(",")
+        if name.strip()
+    ] or None
+    # In-process cache of provider responses for repeated prompts
+    RESPONSE_CACHE_ENABLED = (
+        os.environ.get("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+    )
+    RESPONSE_CACHE_MAX_BYTES = int(
+        os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+    )
+    RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 3600))
+    # Serve cache hits for temperature > 0 without a per-request opt-in
+    RESPONSE_CACHE_ALLOW_SAMPLED = (
+        os.environ.get("RESPONSE_CACHE_ALLOW_SAMPLED", "false").lower() == "true"
+    )
+    # Share one upstream call between identical concurrent generation requests
+    REQUEST_COALESCING_ENABLED = (
+        os.environ.get("REQUEST_COALESCING_ENABLED", "false").lower() == "true"
+    )
+    # Seconds a waiter blocks on the in-flight call before giving up
+    REQUEST_COALESCING_TIMEOUT = float(
+        os.environ.get("REQUEST_COALESCING_TIMEOUT", 120)
+    )
+    # Keep-alive connection pool shared by async provider calls
+    HTTP_POOL_MAX_CONNECTIONS = int(os.environ.get("HTTP_POOL_MAX_CONNECTIONS", 100))
+    HTTP_POOL_MAX_KEEPALIVE = int(os.environ.get("HTTP_POOL_MAX_KEEPALIVE", 20))
+    HTTP_POOL_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_POOL_KEEPALIVE_EXPIRY", 30))
+    HTTP_POOL_TIMEOUT = float(os.environ.get("HTTP_POOL_TIMEOUT", 60))
+    # Maximum provider calls in flight for one batch request
+    BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 8))
+    # Background generation jobs (POST /api/generate-text?async=true) are run
+    # by `flask run-job-worker`; set this to also run workers in the app process
+    JOB_WORKERS_ENABLED = (
+        os.environ.get("JOB_WORKERS_ENABLED", "false").lower() == "true"
+    )
+    JOB_WORKER_COUNT = int(os.environ.get("JOB_WORKER_COUNT", 2))
+    JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 1.0))
+    # Seconds a claimed job stays hidden from other workers
+    JOB_VISIBILITY_TIMEOUT = int(os.environ.get("JOB_VISIBILITY_TIMEOUT", 300))
+    JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+    # Read-through cache for GET /api/generated-text/<id>; "memory" is per
+    # worker, "redis" (needs the redis package) is shared by all workers
+    TEXT_CACHE_ENABLED = os.environ.get("TEXT_CACHE_ENABLED", "false").lower() == "true"
+    TEXT_CACHE_BACKEND = os.environ.get("TEXT_CACHE_BACKEND", "memory")
+    TEXT_CACHE_REDIS_URL = os.environ.get("TEXT_CACHE_REDIS_URL", "redis://localhost:6379/0")
+    TEXT_CACHE_MAX_BYTES = int(os.environ.get("TEXT_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+    TEXT_CACHE_TTL = int(os.environ.get("TEXT_CACHE_TTL", 60))
+    # Fraction of cache hits re-read from the database to measure staleness
+    TEXT_CACHE_VERIFY_RATE = float(os.environ.get("TEXT_CACHE_VERIFY_RATE", 0.01))
+    # Rows fetched per round trip by GET /api/generated-texts/export
+    EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+    # Users with more texts than this are deleted by the background purge
+    USER_PURGE_THRESHOLD = int(os.environ.get("USER_PURGE_THRESHOLD", 1000))
+    # Purges are run by `flask purge-users`; set this to also run them in a
+    # background thread of the app process
+    USER_PURGE_WORKER_ENABLED = (
+        os.environ.get("USER_PURGE_WORKER_ENABLED", "false").lower() == "true"
+    )
+    # Rows deleted per purge transaction, and seconds to yield between them
+    USER_PURGE_BATCH_SIZE = int(os.environ.get("USER_PURGE_BATCH_SIZE", 1000))
+    USER_PURGE_BATCH_PAUSE = float(os.environ.get("USER_PURGE_BATCH_PAUSE", 0.05))
+    USER_PURGE_POLL_INTERVAL = float(os.environ.get("USER_PURGE_POLL_INTERVAL", 5))
+    # Global retention of generated texts; unset keeps everything. Users can
+    # override either limit (see `flask set-retention`)
+    RETENTION_MAX_AGE_DAYS = (
+        int(os.environ["RETENTION_MAX_AGE_DAYS"])
+        if os.environ.get("RETENTION_MAX_AGE_DAYS")
+        else None
+    )
+    RETENTION_MAX_TEXTS = (
+        int(os.environ["RETENTION_MAX_TEXTS"])
+        if os.environ.get("RETENTION_MAX_TEXTS")
+        else None
+    )
+    # Expired texts are written here as gzip NDJSON, partitioned by date
+    RETENTION_ARCHIVE_DIR = os.environ.get("RETENTION_ARCHIVE_DIR", "archive")
+    RETENTION_BATCH_SIZE = int(os.environ.get("RETENTION_BATCH_SIZE", 500))
+    RETENTION_BATCH_PAUSE = float(os.environ.get("RETENTION_BATCH_PAUSE", 0.05))
+    # Apply retention every RETENTION_INTERVAL seconds in a background thread
+    RETENTION_SCHEDULER_ENABLED = (
+        os.environ.get("RETENTION_SCHEDULER_ENABLED", "false").lower() == "true"
+    )
+    RETENTION_INTERVAL = float(os.environ.get("RETENTION_INTERVAL", 86400))
+    # Store responses of at least RESPONSE_COMPRESSION_MIN_LENGTH characters
+    # gzip-compressed
+    RESPONSE_COMPRESSION_ENABLED = (
+        os.environ.get("RESPONSE_COMPRESSION_ENABLED", "false").lower() == "true"
+    )
+    RESPONSE_COMPRESSION_MIN_LENGTH = int(
+        os.environ.get("RESPONSE_COMPRESSION_MIN_LENGTH", 4096)
+    )
+    RESPONSE_COMPRESSION_LEVEL = int(os.environ.get("RESPONSE_COMPRESSION_LEVEL", 6))
+    # Per-request SQL instrumentation attached to the request log line
+    QUERY_STATS_ENABLED = os.environ.get("QUERY_STATS_ENABLED", "true").lower() == "true"
+    # Statements slower than this are logged with their parameter types
+    QUERY_SLOW_MS = float(os.environ.get("QUERY_SLOW_MS", 100))
+    # Identical SELECTs repeated this often in one request are flagged as N+1
+    QUERY_REPEAT_THRESHOLD = int(os.environ.get("QUERY_REPEAT_THRESHOLD", 5))
+    # Write-behind persistence of generated texts (off by default)
+    WRITE_BEHIND_ENABLED = (
+        os.environ.get("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+    )
+    WRITE_BEHIND_QUEUE_SIZE = int(os.environ.get("WRITE_BEHIND_QUEUE_SIZE", 1000))
+    WRITE_BEHIND_BATCH_SIZE = int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", 100))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(
+        os.environ.get("WRITE_BEHIND_FLUSH_INTERVAL", 0.05)
+    )
+    # Seconds to wait for queue space before writing synchronously
+    WRITE_BEHIND_ENQUEUE_TIMEOUT = float(
+        os.environ.get("WRITE_BEHIND_ENQUEUE_TIMEOUT", 1.0)
+    )
+    # Seconds before retrying rows the database was unavailable for, doubling
+    # up to WRITE_BEHIND_MAX_RETRY_INTERVAL
+    WRITE_BEHIND_RETRY_INTERVAL = float(os.environ.get("WRITE_BEHIND_RETRY_INTERVAL", 0.5))
+    WRITE_BEHIND_MAX_RETRY_INTERVAL = float(
+        os.environ.get("WRITE_BEHIND_MAX_RETRY_INTERVAL", 30)
+    )
+    # "none" keeps queued rows in memory only; "journal" fsyncs them to a file first
+    WRITE_BEHIND_DURABILITY = os.environ.get("WRITE_BEHIND_DURABILITY", "none")
+    # Each process journals to this path suffixed with ".<hostname>-<pid>"
+    WRITE_BEHIND_JOURNAL_PATH = os.environ.get("WRITE_BEHIND_JOURNAL_PATH")
+    WRITE_BEHIND_ID_BLOCK_SIZE = int(os.environ.get("WRITE_BEHIND_ID_BLOCK_SIZE", 100))
+    # Per-provider circuit breaker; opens on error rate or slow-call rate
+    CIRCUIT_BREAKER_ENABLED = (
+        os.environ.get("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+    )
+    CIRCUIT_BREAKER_WINDOW_SIZE = int(os.environ.get("CIRCUIT_BREAKER_WINDOW_SIZE", 20))
+    CIRCUIT_BREAKER_MINIMUM_CALLS = int(
+        os.environ.get("CIRCUIT_BREAKER_MINIMUM_CALLS", 10)
+    )
+    CIRCUIT_BREAKER_FAILURE_RATE = float(
+        os.environ.get("CIRCUIT_BREAKER_FAILURE_RATE", 0.5)
+    )
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS = float(
+        os.environ.get("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", 10)
+    )
+    CIRCUIT_BREAKER_SLOW_CALL_RATE = float(
+        os.environ.get("CIRCUIT_BREAKER_SLOW_CALL_RATE", 0.8)
+    )
+    CIRCUIT_BREAKER_OPEN_SECONDS = float(
+        os.environ.get("CIRCUIT_BREAKER_OPEN_SECONDS", 30)
+    )
+    # Provider used while the requested provider's circuit is open
+    AI_FALLBACK_PROVIDER = os.environ.get("AI_FALLBACK_PROVIDER")
+    # Client-side quota per model/API key; unset means unlimited
+    RATE_LIMIT_REQUESTS_PER_MINUTE = (
+        int(os.environ["RATE_LIMIT_REQUESTS_PER_MINUTE"])
+        if os.environ.get("RATE_LIMIT_REQUESTS_PER_MINUTE")
+        else None
+    )
+    RATE_LIMIT_TOKENS_PER_MINUTE = (
+        int(os.environ["RATE_LIMIT_TOKENS_PER_MINUTE"])
+        if os.environ.get("RATE_LIMIT_TOKENS_PER_MINUTE")
+        else None
+    )
+    # Longest a call may queue for quota before it is shed with a 429
+    RATE_LIMIT_MAX_WAIT = float(os.environ.get("RATE_LIMIT_MAX_WAIT", 30))
+    # Per-model limits as JSON, e.g. {"gpt-4": {"requests_per_minute": 500}}
+    RATE_LIMIT_OVERRIDES = json.loads(os.environ.get("RATE_LIMIT_OVERRIDES", "{}"))
+    # Retries of throttled or transient provider errors
+    PROVIDER_RETRY_MAX_ATTEMPTS = int(os.environ.get("PROVIDER_RETRY_MAX_ATTEMPTS", 4))
+    PROVIDER_RETRY_BASE_DELAY = float(os.environ.get("PROVIDER_RETRY_BASE_DELAY", 0.5))
+    PROVIDER_RETRY_MAX_DELAY = float(os.environ.get("PROVIDER_RETRY_MAX_DELAY", 8))
+    # Total time budget for a provider call across all attempts
+    PROVIDER_RETRY_DEADLINE = float(os.environ.get("PROVIDER_RETRY_DEADLINE", 60))
+    # Offline "mock" provider for load testing; latency is fixed, normal or long_tail
+    MOCK_MODEL = os.environ.get("MOCK_MODEL", "mock-1")
+    MOCK_LATENCY_DISTRIBUTION = os.environ.get("MOCK_LATENCY_DISTRIBUTION", "fixed")
+    MOCK_LATENCY_MS = float(os.environ.get("MOCK_LATENCY_MS", 200))
+    MOCK_LATENCY_STDDEV_MS = float(os.environ.get("MOCK_LATENCY_STDDEV_MS", 50))
+    MOCK_LATENCY_TAIL_SIGMA = float(os.environ.get("MOCK_LATENCY_TAIL_SIGMA", 1.0))
+    MOCK_TTFT_MS = float(os.environ.get("MOCK_TTFT_MS", 150))
+    MOCK_TOKENS_PER_SECOND = float(os.environ.get("MOCK_TOKENS_PER_SECOND", 50))
+    MOCK_RESPONSE_TOKENS = int(os.environ.get("MOCK_RESPONSE_TOKENS", 64))
+    # Fractions of calls that fail with a simulated 5xx or 429
+    MOCK_ERROR_RATE = float(os.environ.get("MOCK_ERROR_RATE", 0))
+    MOCK_RATE_LIMIT_RATE = float(os.environ.get("MOCK_RATE_LIMIT_RATE", 0))
+    MOCK_SEED = int(os.environ["MOCK_SEED"]) if os.environ.get("MOCK_SEED") else None
     # Remove any proxy settings that might be causing issues
     HTTP_PROXY = None
     HTTPS_PROXY = None
@@ -37,6 +234,11 @@ class TestingConfig(Config):
 
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///test.db"
+    JOB_WORKERS_ENABLED = False
+    USER_PURGE_WORKER_ENABLED = False
+    MOCK_LATENCY_MS = 0
+    MOCK_TTFT_MS = 0
+    MOCK_TOKENS_PER_SECOND = 0
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=5)
 
 
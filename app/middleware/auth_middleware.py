@@ -1,6 +1,7 @@
 from functools import wraps
 from flask import jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..repository.user_repository import UserRepository
 import logging
 
 
@@ -19,6 +20,12 @@ def auth_middleware():
             try:
                 user_id = int(current_user_id)
 
+                # Tokens outlive their user; deleted users, including those
+                # still being purged, lose access at once
+                if not UserRepository().is_active(user_id):
+                    logger.warning(f"Rejected token of deleted user ID: {user_id}")
+                    return jsonify({"error": "User not found"}), 401
+
                 # Set user_id on request for logging middleware
                 request.user_id = user_id
 
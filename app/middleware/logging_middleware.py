@@ -1,6 +1,8 @@
 import time
 import logging
 from flask import request, g
+from werkzeug.wsgi import ClosingIterator
+from ..utils.query_stats import query_instrumentation
 
 
 class LoggingMiddleware:
@@ -14,30 +16,43 @@ class LoggingMiddleware:
         # Start timer
         start_time = time.time()
 
-        # Process the request
+        # Collect the SQL statements this request runs
+        query_stats, token = query_instrumentation.activate()
+
+        # Filled in by start_response; logged once the body has been sent
+        response_info = {}
+
         def custom_start_response(status, headers, exc_info=None):
-            # Log after request is processed
+            response_info["status"] = int(status.split(" ")[0])
+
+            # Get user ID if it's in g
+            response_info["user_id"] = getattr(g, "user_id", None)
+
+            return start_response(status, headers, exc_info)
+
+        def finish():
+            # Log after the body is sent, so streamed responses (SSE, exports)
+            # count the statements they run while being iterated
+            query_instrumentation.deactivate(token)
             duration = time.time() - start_time
-            status_code = int(status.split(" ")[0])
+            status_code = response_info.get("status", 500)
 
             # Get the path and method
             path = environ.get("PATH_INFO", "")
             method = environ.get("REQUEST_METHOD", "")
 
-            # Get user ID if it's in g
-            user_id = getattr(g, "user_id", None)
-
             # Log basic info for all requests
             log_data = {
                 "method": method,
                 "path": path,
                 "status": status_code,
                 "duration_ms": round(duration * 1000, 2),
+                **query_stats.summary(),
             }
 
             # Add user ID if available
-            if user_id:
-                log_data["user_id"] = user_id
+            if response_info.get("user_id"):
+                log_data["user_id"] = response_info["user_id"]
 
             # Determine log level based on status code
             if status_code >= 500:
@@ -47,6 +62,12 @@ class LoggingMiddleware:
             else:
                 self.logger.info(f"Request processed: {log_data}")
 
-            return start_response(status, headers, exc_info)
+            query_instrumentation.log(query_stats, f"{method} {path}")
+
+        try:
+            app_iter = self.app(environ, custom_start_response)
+        except Exception:
+            query_instrumentation.deactivate(token)
+            raise
 
-        return self.app(environ, custom_start_response)
+        return ClosingIterator(app_iter, finish)
@@ -1,19 +1,85 @@
+import base64
+import json
+import sqlite3
+import uuid
 from datetime import datetime
+from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import MetaData, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
+from .utils.compression import response_codec
+
+# Deterministic constraint names so migrations can refer to them on every backend
+naming_convention = {
+    'ix': 'ix_%(column_0_label)s',
+    'uq': 'uq_%(table_name)s_%(column_0_name)s',
+    'ck': 'ck_%(table_name)s_%(constraint_name)s',
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+    'pk': 'pk_%(table_name)s'
+}
+
+db = SQLAlchemy(metadata=MetaData(naming_convention=naming_convention))
+migrate = Migrate()
+
+
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores foreign keys, ON DELETE CASCADE included, unless they are
+    # enabled on each connection
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+def normalize_username(username):
+    """Canonical form of a username, used for case-insensitive lookups and uniqueness"""
+    return username.lower() if username else None
 
-db = SQLAlchemy()
 
 class User(db.Model):
     __tablename__ = 'users'
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
+    # Kept in sync with username; looked up by login and unique across case
+    username_normalized = db.Column(db.String(80), nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped by every write to the user's generated texts; ETags derive from it
+    texts_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Set when the account is deleted but a background purge is still removing its rows
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    # Retention overrides; NULL follows the global policy, 0 keeps texts forever
+    retention_max_age_days = db.Column(db.Integer, nullable=True)
+    retention_max_texts = db.Column(db.Integer, nullable=True)
     
-    # Relationship
-    generated_texts = db.relationship('GeneratedText', backref='user', lazy=True, cascade='all, delete-orphan')
+    __table_args__ = (
+        # Case-insensitive lookups in UserRepository.get_by_username
+        db.Index('ix_users_username_normalized', username_normalized, unique=True),
+    )
+    
+    # Relationship; the database deletes children (ON DELETE CASCADE), so
+    # deleting a user never loads them
+    generated_texts = db.relationship('GeneratedText', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    generation_jobs = db.relationship('GenerationJob', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    
+    @validates('username')
+    def _normalize_username(self, key, username):
+        self.username_normalized = normalize_username(username)
+        return username
+    
+    @classmethod
+    def bump_texts_version(cls, user_ids):
+        """UPDATE statement bumping texts_version for the given users
+        
+        Execute it in the same transaction as the text write it accounts for.
+        """
+        return db.update(cls).where(cls.id.in_(user_ids)).values(
+            texts_version=cls.texts_version + 1
+        ).execution_options(synchronize_session=False)
     
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -29,11 +95,68 @@ class GeneratedText(db.Model):
     __tablename__ = 'generated_texts'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     prompt = db.Column(db.Text, nullable=False)
-    response = db.Column(db.Text, nullable=False)
+    # Read and write the `response` property; long responses are stored
+    # compressed in response_compressed and this column holds '' (see ResponseCodec)
+    response_text = db.Column('response', db.Text, nullable=False)
+    response_compressed = db.Column(db.LargeBinary, nullable=True)
+    response_codec = db.Column(db.String(16), nullable=True)
+    response_length = db.Column(db.Integer, nullable=True)  # Characters, for compressed responses
     provider = db.Column(db.String(50), nullable=True)  # Added to track which AI provider was used
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    cached = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())  # Served from the response cache
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Serves per-user listings newest first, including keyset pagination
+        db.Index('ix_generated_texts_user_id_timestamp_id', user_id, timestamp.desc(), id.desc()),
+        # SQLite never reuses ids and tracks the high-water mark in sqlite_sequence,
+        # which lets the write-behind writer reserve ids up front
+        {'sqlite_autoincrement': True}
+    )
+    
+    @property
+    def response(self):
+        """The response text, decompressed on first access"""
+        if self.response_codec is None:
+            return self.response_text
+        
+        decoded = self.__dict__.get('_decoded_response')
+        if decoded is None or decoded[0] is not self.response_compressed:
+            decoded = (
+                self.response_compressed,
+                response_codec.decode(self.response_text, self.response_codec, self.response_compressed)
+            )
+            self.__dict__['_decoded_response'] = decoded
+        return decoded[1]
+    
+    @response.setter
+    def response(self, value):
+        stored = response_codec.encode(value)
+        self.response_text = stored['response']
+        self.response_compressed = stored['response_compressed']
+        self.response_codec = stored['response_codec']
+        self.response_length = stored['response_length']
+    
+    def to_stored_dict(self):
+        """Like to_dict(), but a compressed response stays compressed
+        
+        The payload is base64-encoded under 'response_compressed' next to
+        'response_codec'; ResponseCodec.expand() turns it into the to_dict() form.
+        """
+        if self.response_codec is None:
+            return self.to_dict()
+        
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'prompt': self.prompt,
+            'response_codec': self.response_codec,
+            'response_compressed': base64.b64encode(self.response_compressed).decode('ascii'),
+            'provider': self.provider,
+            'cached': bool(self.cached),
+            'timestamp': self.timestamp.isoformat()
+        }
     
     def to_dict(self):
         return {
@@ -42,8 +165,107 @@ class GeneratedText(db.Model):
             'prompt': self.prompt,
             'response': self.response,
             'provider': self.provider,
+            'cached': bool(self.cached),
             'timestamp': self.timestamp.isoformat()
         }
     
     def __repr__(self):
-        return f'<GeneratedText {self.id}>'
\ No newline at end of file
+        return f'<GeneratedText {self.id}>'
+
+
+class GenerationJob(db.Model):
+    __tablename__ = 'generation_jobs'
+    
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    prompt = db.Column(db.Text, nullable=False)
+    options = db.Column(db.Text, nullable=True)  # JSON-encoded generation options
+    provider = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=QUEUED)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    locked_until = db.Column(db.DateTime, nullable=True)  # Visibility timeout of the current claim
+    worker_id = db.Column(db.String(64), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    result_text_id = db.Column(db.Integer, db.ForeignKey('generated_texts.id', ondelete='SET NULL'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Workers claim the oldest queued job and sweep expired claims
+        db.Index('ix_generation_jobs_status_created_at', status, created_at),
+        db.Index('ix_generation_jobs_status_locked_until', status, locked_until),
+        db.Index('ix_generation_jobs_user_id', user_id),
+    )
+    
+    # Relationship
+    result_text = db.relationship('GeneratedText', lazy=True)
+    
+    def get_options(self):
+        return json.loads(self.options) if self.options else {}
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'provider': self.provider,
+            'attempts': self.attempts,
+            'error': self.error,
+            'result': self.result_text.to_dict() if self.result_text else None,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<GenerationJob {self.id} {self.status}>'
+
+
+class UserPurge(db.Model):
+    """Progress of a background purge of a deleted user's rows"""
+    __tablename__ = 'user_purges'
+    
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Not a foreign key: the record outlives the user it describes
+    user_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=PENDING)
+    texts_total = db.Column(db.Integer, nullable=True)  # Counted when the purge starts
+    texts_deleted = db.Column(db.Integer, nullable=False, default=0)
+    jobs_deleted = db.Column(db.Integer, nullable=False, default=0)
+    batches = db.Column(db.Integer, nullable=False, default=0)
+    locked_until = db.Column(db.DateTime, nullable=True)  # Claim held by the purging worker
+    worker_id = db.Column(db.String(64), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_user_purges_status_created_at', status, created_at),
+        db.Index('ix_user_purges_user_id', user_id),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'status': self.status,
+            'texts_total': self.texts_total,
+            'texts_deleted': self.texts_deleted,
+            'jobs_deleted': self.jobs_deleted,
+            'batches': self.batches,
+            'progress': round(self.texts_deleted / self.texts_total, 4) if self.texts_total else None,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+    
+    def __repr__(self):
+        return f'<UserPurge {self.id} user={self.user_id} {self.status}>'
@@ -0,0 +1,167 @@
+import json
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, select, update
+from ..models import db, GenerationJob
+
+class JobRepository:
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    def enqueue(self, user_id, prompt, provider, options=None, max_attempts=3):
+        """Queue a generation job"""
+        try:
+            job = GenerationJob(
+                user_id=user_id,
+                prompt=prompt,
+                provider=provider,
+                options=json.dumps(options) if options else None,
+                max_attempts=max_attempts
+            )
+
+            db.session.add(job)
+            db.session.commit()
+
+            self.logger.info(f"Queued generation job {job.id} for user {user_id}")
+            return job
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error queueing job for user {user_id}: {str(e)}")
+            raise
+
+    def get_by_id_and_user(self, job_id, user_id):
+        """Get a job by ID and ensure it belongs to the specified user"""
+        try:
+            return GenerationJob.query.filter_by(id=job_id, user_id=user_id).first()
+        except Exception as e:
+            self.logger.error(f"Error retrieving job {job_id} for user {user_id}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _claimable(now):
+        # Queued jobs, plus running jobs whose worker let the visibility timeout lapse
+        return and_(
+            GenerationJob.attempts < GenerationJob.max_attempts,
+            or_(
+                GenerationJob.status == GenerationJob.QUEUED,
+                and_(
+                    GenerationJob.status == GenerationJob.RUNNING,
+                    GenerationJob.locked_until < now
+                )
+            )
+        )
+
+    def claim_next(self, worker_id, visibility_timeout=300):
+        """Atomically claim the oldest available job, or return None"""
+        try:
+            now = datetime.utcnow()
+            job_id = db.session.execute(
+                select(GenerationJob.id)
+                .where(self._claimable(now))
+                .order_by(GenerationJob.created_at)
+                .limit(1)
+            ).scalar()
+
+            if job_id is None:
+                db.session.rollback()
+                return None
+
+            # Re-check the claim condition so only one worker wins a race
+            result = db.session.execute(
+                update(GenerationJob)
+                .where(GenerationJob.id == job_id, self._claimable(now))
+                .values(
+                    status=GenerationJob.RUNNING,
+                    worker_id=worker_id,
+                    locked_until=now + timedelta(seconds=visibility_timeout),
+                    attempts=GenerationJob.attempts + 1,
+                    updated_at=now
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+
+            if result.rowcount != 1:
+                return None
+
+            job = db.session.get(GenerationJob, job_id, populate_existing=True)
+            self.logger.info(f"Worker {worker_id} claimed job {job_id} (attempt {job.attempts})")
+            return job
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error claiming job for worker {worker_id}: {str(e)}")
+            return None
+
+    def complete(self, job_id, worker_id, text_id):
+        """Mark a claimed job as succeeded"""
+        return self._finish(
+            job_id, worker_id,
+            status=GenerationJob.SUCCEEDED,
+            result_text_id=text_id,
+            error=None
+        )
+
+    def fail(self, job_id, worker_id, error):
+        """Record a failed attempt, re-queueing the job if attempts remain"""
+        job = db.session.get(GenerationJob, job_id)
+        if job is None:
+            return False
+
+        status = GenerationJob.QUEUED if job.attempts < job.max_attempts else GenerationJob.FAILED
+        return self._finish(job_id, worker_id, status=status, error=error)
+
+    def _finish(self, job_id, worker_id, **values):
+        try:
+            # Only the worker that still holds the claim may finish the job
+            result = db.session.execute(
+                update(GenerationJob)
+                .where(
+                    GenerationJob.id == job_id,
+                    GenerationJob.worker_id == worker_id,
+                    GenerationJob.status == GenerationJob.RUNNING
+                )
+                .values(locked_until=None, updated_at=datetime.utcnow(), **values)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+
+            if result.rowcount != 1:
+                self.logger.warning(f"Worker {worker_id} no longer holds job {job_id}")
+                return False
+
+            self.logger.info(f"Job {job_id} is now {values['status']}")
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error finishing job {job_id}: {str(e)}")
+            return False
+
+    def fail_expired(self):
+        """Fail running jobs whose last allowed attempt timed out"""
+        try:
+            now = datetime.utcnow()
+            result = db.session.execute(
+                update(GenerationJob)
+                .where(
+                    GenerationJob.status == GenerationJob.RUNNING,
+                    GenerationJob.locked_until < now,
+                    GenerationJob.attempts >= GenerationJob.max_attempts
+                )
+                .values(
+                    status=GenerationJob.FAILED,
+                    locked_until=None,
+                    error='Visibility timeout expired on the final attempt',
+                    updated_at=now
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            return result.rowcount
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error failing expired jobs: {str(e)}")
+            return 0
@@ -0,0 +1,199 @@
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, func, or_, select, update
+from ..models import db, GeneratedText, GenerationJob, User, UserPurge
+from . import search as search_index
+from .text_cache import text_cache
+
+
+class PurgeRepository:
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    def schedule(self, user_id):
+        """Mark a user deleted and queue the purge of their rows
+
+        Returns the purge, the one already queued if the user was deleted
+        before, or None if the user doesn't exist.
+        """
+        try:
+            now = datetime.utcnow()
+            marked = db.session.execute(
+                update(User)
+                .where(User.id == user_id, User.deleted_at.is_(None))
+                .values(deleted_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+
+            if not marked:
+                db.session.rollback()
+                return self.get_latest_for_user(user_id)
+
+            purge = UserPurge(user_id=user_id)
+            db.session.add(purge)
+            db.session.commit()
+            text_cache.invalidate_user(user_id)
+
+            self.logger.info(f"Scheduled purge {purge.id} for user {user_id}")
+            return purge
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error scheduling purge for user {user_id}: {str(e)}")
+            raise
+
+    def get_latest_for_user(self, user_id):
+        """Get the most recent purge of a user, or None"""
+        try:
+            return db.session.execute(
+                select(UserPurge)
+                .where(UserPurge.user_id == user_id)
+                .order_by(UserPurge.id.desc())
+                .limit(1)
+            ).scalar()
+        except Exception as e:
+            self.logger.error(f"Error retrieving purge for user {user_id}: {str(e)}")
+            return None
+
+    def get_active(self):
+        """Get every purge that has not completed yet, oldest first"""
+        return db.session.execute(
+            select(UserPurge)
+            .where(UserPurge.status != UserPurge.COMPLETED)
+            .order_by(UserPurge.created_at)
+        ).scalars().all()
+
+    @staticmethod
+    def _claimable(now):
+        # Pending purges, plus running ones whose worker let the claim lapse
+        return or_(
+            UserPurge.status == UserPurge.PENDING,
+            and_(UserPurge.status == UserPurge.RUNNING, UserPurge.locked_until < now)
+        )
+
+    def claim_next(self, worker_id, visibility_timeout=300):
+        """Atomically claim the oldest available purge, or return None
+
+        Batches are idempotent, so a purge reclaimed after a crash simply
+        carries on where its previous worker stopped.
+        """
+        try:
+            now = datetime.utcnow()
+            purge_id = db.session.execute(
+                select(UserPurge.id)
+                .where(self._claimable(now))
+                .order_by(UserPurge.created_at)
+                .limit(1)
+            ).scalar()
+
+            if purge_id is None:
+                db.session.rollback()
+                return None
+
+            # Re-check the claim condition so only one worker wins a race
+            result = db.session.execute(
+                update(UserPurge)
+                .where(UserPurge.id == purge_id, self._claimable(now))
+                .values(
+                    status=UserPurge.RUNNING,
+                    worker_id=worker_id,
+                    locked_until=now + timedelta(seconds=visibility_timeout),
+                    updated_at=now
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+
+            if result.rowcount != 1:
+                return None
+
+            purge = db.session.get(UserPurge, purge_id, populate_existing=True)
+            if purge.texts_total is None:
+                purge.texts_total = db.session.execute(
+                    select(func.count()).select_from(GeneratedText).where(GeneratedText.user_id == purge.user_id)
+                ).scalar()
+                db.session.commit()
+
+            self.logger.info(f"Worker {worker_id} claimed purge {purge_id} of user {purge.user_id}")
+            return purge
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error claiming purge for worker {worker_id}: {str(e)}")
+            return None
+
+    def delete_batch(self, purge, batch_size, visibility_timeout=300):
+        """Delete up to batch_size of the user's rows in one short transaction
+
+        Texts go first, then jobs. Progress is recorded in the same
+        transaction and the claim is extended. Returns the number of rows
+        deleted; 0 means nothing is left but the user row.
+        """
+        try:
+            deleted = db.session.execute(
+                delete(GeneratedText)
+                .where(GeneratedText.id.in_(
+                    select(GeneratedText.id).where(GeneratedText.user_id == purge.user_id).limit(batch_size)
+                ))
+                .returning(*search_index.INDEXED_COLUMNS)
+                .execution_options(synchronize_session=False)
+            ).all()
+            search_index.unindex(db.session.connection(), deleted)
+            texts = len(deleted)
+
+            jobs = 0
+            if texts < batch_size:
+                jobs = db.session.execute(
+                    delete(GenerationJob)
+                    .where(GenerationJob.id.in_(
+                        select(GenerationJob.id).where(GenerationJob.user_id == purge.user_id).limit(batch_size - texts)
+                    ))
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+
+            now = datetime.utcnow()
+            db.session.execute(
+                update(UserPurge)
+                .where(UserPurge.id == purge.id)
+                .values(
+                    texts_deleted=UserPurge.texts_deleted + texts,
+                    jobs_deleted=UserPurge.jobs_deleted + jobs,
+                    batches=UserPurge.batches + 1,
+                    locked_until=now + timedelta(seconds=visibility_timeout),
+                    updated_at=now
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            return texts + jobs
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error purging rows of user {purge.user_id}: {str(e)}")
+            raise
+
+    def complete(self, purge):
+        """Delete the user row itself and mark the purge completed"""
+        try:
+            # Anything the user wrote since the last batch goes with the cascade
+            search_index.unindex_user(db.session.connection(), purge.user_id)
+            db.session.execute(
+                delete(User).where(User.id == purge.user_id).execution_options(synchronize_session=False)
+            )
+            now = datetime.utcnow()
+            db.session.execute(
+                update(UserPurge)
+                .where(UserPurge.id == purge.id)
+                .values(status=UserPurge.COMPLETED, locked_until=None, updated_at=now, completed_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            text_cache.invalidate_user(purge.user_id)
+
+            self.logger.info(f"Purge {purge.id} of user {purge.user_id} completed")
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error completing purge {purge.id}: {str(e)}")
+            raise
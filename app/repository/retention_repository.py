@@ -0,0 +1,188 @@
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import delete, or_, select, tuple_, update
+from ..models import db, GeneratedText, User
+from . import search as search_index
+from .routing import replica_router
+from .text_cache import text_cache
+from ..utils.compression import response_codec
+
+
+class RetentionRepository:
+    """Queries behind retention: who has a policy, which texts expired, and
+    removing or restoring them in small batches"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def effective_policy(override, default):
+        """A user's limit: their override if set, else the global one; 0 means no limit"""
+        limit = default if override is None else override
+        return limit or None
+
+    def iter_policies(self, max_age_days=None, max_texts=None, user_id=None, page_size=500):
+        """Yield (user_id, max_age_days, max_texts) for every live user with a policy
+
+        max_age_days and max_texts are the global defaults. Users are read a
+        page at a time by primary key.
+        """
+        last_id = 0
+        while True:
+            stmt = (
+                select(User.id, User.retention_max_age_days, User.retention_max_texts)
+                .where(User.deleted_at.is_(None), User.id > last_id)
+                .order_by(User.id)
+                .limit(page_size)
+            )
+            if user_id is not None:
+                stmt = stmt.where(User.id == user_id)
+            page = db.session.execute(stmt).all()
+            db.session.rollback()
+
+            for row in page:
+                max_age = self.effective_policy(row.retention_max_age_days, max_age_days)
+                limit = self.effective_policy(row.retention_max_texts, max_texts)
+                if max_age or limit:
+                    yield row.id, max_age, limit
+
+            if len(page) < page_size:
+                return
+            last_id = page[-1].id
+
+    def expired_condition(self, user_id, max_age_days=None, max_texts=None, now=None):
+        """WHERE clause matching the user's expired texts, or None if none expired
+
+        Texts expire when older than max_age_days, or when more than max_texts
+        newer ones exist. The newest text past max_texts is found by walking
+        the (user_id, timestamp, id) index, and everything at or before it
+        expires; the boundary is fixed for the run, so texts written meanwhile
+        only make it keep more.
+        """
+        conditions = []
+        if max_age_days:
+            now = now or datetime.utcnow()
+            conditions.append(GeneratedText.timestamp < now - timedelta(days=max_age_days))
+
+        if max_texts:
+            boundary = db.session.execute(
+                select(GeneratedText.timestamp, GeneratedText.id)
+                .where(GeneratedText.user_id == user_id)
+                .order_by(GeneratedText.timestamp.desc(), GeneratedText.id.desc())
+                .offset(max_texts)
+                .limit(1)
+            ).first()
+            db.session.rollback()
+            if boundary is not None:
+                conditions.append(
+                    tuple_(GeneratedText.timestamp, GeneratedText.id) <= tuple_(boundary.timestamp, boundary.id)
+                )
+
+        return or_(*conditions) if conditions else None
+
+    def get_expired_batch(self, user_id, condition, batch_size=500):
+        """The user's oldest expired texts, as plain rows ready for archiving"""
+        rows = db.session.execute(
+            select(
+                GeneratedText.id,
+                GeneratedText.user_id,
+                GeneratedText.prompt,
+                GeneratedText.response_text.label('response'),
+                GeneratedText.response_codec,
+                GeneratedText.response_compressed,
+                GeneratedText.provider,
+                GeneratedText.cached,
+                GeneratedText.timestamp
+            )
+            .where(GeneratedText.user_id == user_id, condition)
+            .order_by(GeneratedText.timestamp, GeneratedText.id)
+            .limit(batch_size)
+        ).all()
+        db.session.rollback()
+        return rows
+
+    def delete_batch(self, user_id, text_ids):
+        """Delete archived texts by primary key in one short transaction"""
+        if not text_ids:
+            return 0
+
+        try:
+            deleted = db.session.execute(
+                delete(GeneratedText)
+                .where(GeneratedText.id.in_(text_ids), GeneratedText.user_id == user_id)
+                .returning(*search_index.INDEXED_COLUMNS)
+            ).all()
+            deleted_ids = [row.id for row in deleted]
+            if deleted_ids:
+                search_index.unindex(db.session.connection(), deleted)
+                db.session.execute(User.bump_texts_version([user_id]))
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error deleting expired texts of user {user_id}: {str(e)}")
+            raise
+
+        if deleted_ids:
+            replica_router.record_write(user_id)
+            for text_id in deleted_ids:
+                text_cache.invalidate(user_id, text_id)
+        return len(deleted_ids)
+
+    def restore_batch(self, rows):
+        """Insert archived rows that are not in the database
+
+        Rows already present are skipped, so importing an archive twice is
+        harmless, and so are rows of users that no longer exist. Returns the
+        number of rows inserted.
+        """
+        if not rows:
+            return 0
+
+        try:
+            existing = set(db.session.execute(
+                select(GeneratedText.id).where(GeneratedText.id.in_([row['id'] for row in rows]))
+            ).scalars())
+            users = set(db.session.execute(
+                select(User.id).where(User.id.in_({row['user_id'] for row in rows}), User.deleted_at.is_(None))
+            ).scalars())
+            # Archives hold plain responses; they are stored as new texts would be
+            missing = [
+                response_codec.encode_row(
+                    {column: row[column] for column in ('id', 'user_id', 'prompt', 'response', 'provider', 'cached', 'timestamp')}
+                )
+                for row in rows
+                if row['id'] not in existing and row['user_id'] in users
+            ]
+
+            if missing:
+                db.session.execute(GeneratedText.__table__.insert(), missing)
+                search_index.index(db.session.connection(), missing)
+                db.session.execute(User.bump_texts_version({row['user_id'] for row in missing}))
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error restoring {len(rows)} archived texts: {str(e)}")
+            raise
+
+        for user_id in {row['user_id'] for row in missing}:
+            replica_router.record_write(user_id)
+        return len(missing)
+
+    def set_policy(self, user_id, max_age_days=None, max_texts=None):
+        """Set a user's retention overrides; None follows the global policy"""
+        try:
+            updated = db.session.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(retention_max_age_days=max_age_days, retention_max_texts=max_texts)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            return updated == 1
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error setting retention policy of user {user_id}: {str(e)}")
+            return False
@@ -0,0 +1,92 @@
+import logging
+import threading
+import time
+from ..models import db
+
+REPLICA_BIND = 'replica'
+
+
+class ReplicaRouter:
+    """Chooses the engine repository reads run on
+
+    When SQLALCHEMY_BINDS has a 'replica' entry, reads go to the replica and
+    writes stay on the primary (the default bind). Replicas lag, so after a
+    user writes, their reads are pinned to the primary for
+    read_your_writes_seconds; everyone else keeps reading from the replica.
+
+    The recent-writes table is per process. Behind a load balancer without
+    sticky sessions, set the window comfortably above the replication lag.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = False
+        self.read_your_writes_seconds = 5.0
+        self.clock = time.monotonic
+
+        self._recent_writes = {}
+        self._lock = threading.Lock()
+
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.fallbacks = 0
+
+    def init_app(self, app):
+        """Enable replica reads if a replica bind is configured"""
+        binds = app.config.get('SQLALCHEMY_BINDS') or {}
+        self.enabled = REPLICA_BIND in binds and app.config.get('REPLICA_READS_ENABLED', True)
+        self.read_your_writes_seconds = app.config.get('REPLICA_READ_YOUR_WRITES_SECONDS', 5.0)
+        with self._lock:
+            self._recent_writes.clear()
+        self.replica_reads = self.primary_reads = self.fallbacks = 0
+        app.extensions['replica_router'] = self
+
+        if self.enabled:
+            self.logger.info(f"Replica reads enabled (read-your-writes window: {self.read_your_writes_seconds}s)")
+
+    def record_write(self, user_id):
+        """Pin the user's reads to the primary for the read-your-writes window"""
+        if not self.enabled or user_id is None:
+            return
+        now = self.clock()
+        with self._lock:
+            self._recent_writes[user_id] = now + self.read_your_writes_seconds
+            # Prune occasionally so the table only holds active writers
+            if len(self._recent_writes) > 10000:
+                self._recent_writes = {
+                    key: until for key, until in self._recent_writes.items() if until > now
+                }
+
+    def wrote_recently(self, user_id):
+        with self._lock:
+            until = self._recent_writes.get(user_id)
+        return until is not None and until > self.clock()
+
+    def read_bind(self, user_id=None):
+        """bind_arguments for a read on behalf of user_id
+
+        An empty dict leaves the choice to the session, which uses the primary.
+        """
+        if not self.enabled or (user_id is not None and self.wrote_recently(user_id)):
+            self.primary_reads += 1
+            return {}
+        self.replica_reads += 1
+        return {'bind': db.engines[REPLICA_BIND]}
+
+    def record_fallback(self):
+        """Count a replica miss that was retried on the primary"""
+        self.fallbacks += 1
+
+    def stats(self):
+        with self._lock:
+            pinned = sum(1 for until in self._recent_writes.values() if until > self.clock())
+        return {
+            'enabled': self.enabled,
+            'replica_reads': self.replica_reads,
+            'primary_reads': self.primary_reads,
+            'fallbacks': self.fallbacks,
+            'pinned_users': pinned
+        }
+
+
+replica_router = ReplicaRouter()
@@ -0,0 +1,218 @@
+"""Full-text search index over generated_texts
+
+The index lives outside the ORM model because each backend needs its own
+structure:
+
+- SQLite: an FTS5 external-content table, generated_texts_fts. Its user_id
+  column indexes the owner as a token, and every query matches it, so a
+  search walks the owner's postings rather than every user's.
+- PostgreSQL: a tsvector column, generated_texts.search_vector, with a GIN
+  index on (user_id, search_vector) (btree_gin), so the owner filter is
+  answered by the same index scan as the match.
+
+Plain rows (response_codec NULL) are indexed by triggers, so every write path
+that stores them, bulk inserts and writes from outside the app included,
+keeps the index current. The database can't read compressed responses, so
+the triggers skip those rows and the app indexes them itself with the
+decoded text: every write path that may store or remove a compressed row
+calls index() or unindex() in the same transaction.
+
+The DDL runs after generated_texts is created by metadata.create_all(). The
+0003, 0010 and 0011 migrations create the same objects for databases whose
+schema is managed by Alembic.
+"""
+from sqlalchemy import DDL, event, func, literal_column, select, table, column, text
+from ..models import GeneratedText
+from ..utils.compression import response_codec
+
+FTS_TABLE = 'generated_texts_fts'
+SEARCH_VECTOR_COLUMN = 'search_vector'
+SEARCH_CONFIG = 'english'
+SEARCH_INDEX = 'ix_generated_texts_user_id_search_vector'
+
+
+class SearchNotSupportedError(Exception):
+    """Raised when the database has no full-text search index"""
+
+SQLITE_TRIGGERS = [
+    f"CREATE TRIGGER IF NOT EXISTS generated_texts_fts_insert AFTER INSERT ON generated_texts "
+    f"WHEN new.response_codec IS NULL BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, prompt, response, user_id) VALUES (new.id, new.prompt, new.response, new.user_id); END",
+    f"CREATE TRIGGER IF NOT EXISTS generated_texts_fts_delete AFTER DELETE ON generated_texts "
+    f"WHEN old.response_codec IS NULL BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, prompt, response, user_id) "
+    f"VALUES ('delete', old.id, old.prompt, old.response, old.user_id); END",
+    f"CREATE TRIGGER IF NOT EXISTS generated_texts_fts_update AFTER UPDATE OF user_id, prompt, response, response_codec ON generated_texts BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, prompt, response, user_id) "
+    f"SELECT 'delete', old.id, old.prompt, old.response, old.user_id WHERE old.response_codec IS NULL; "
+    f"INSERT INTO {FTS_TABLE}(rowid, prompt, response, user_id) "
+    f"SELECT new.id, new.prompt, new.response, new.user_id WHERE new.response_codec IS NULL; END",
+]
+
+SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "prompt, response, user_id, content='generated_texts', content_rowid='id', "
+    "tokenize='porter unicode61')",
+    *SQLITE_TRIGGERS,
+]
+SQLITE_DROP = [f"DROP TABLE IF EXISTS {FTS_TABLE}"]
+
+# Compressed rows keep the search_vector the app gave them
+POSTGRESQL_TRIGGER = [
+    "CREATE OR REPLACE FUNCTION generated_texts_search_vector() RETURNS trigger AS $$ "
+    "BEGIN "
+    "IF NEW.response_codec IS NULL THEN "
+    f"NEW.{SEARCH_VECTOR_COLUMN} := to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.prompt, '') || ' ' || coalesce(NEW.response, '')); "
+    "END IF; "
+    "RETURN NEW; "
+    "END $$ LANGUAGE plpgsql",
+    "CREATE TRIGGER generated_texts_search_vector BEFORE INSERT OR UPDATE OF prompt, response, response_codec "
+    "ON generated_texts FOR EACH ROW EXECUTE FUNCTION generated_texts_search_vector()",
+]
+
+POSTGRESQL_CREATE = [
+    f"ALTER TABLE generated_texts ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector",
+    *POSTGRESQL_TRIGGER,
+    # GIN operator classes for plain columns such as user_id
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} ON generated_texts USING GIN (user_id, {SEARCH_VECTOR_COLUMN})",
+]
+
+for statement in SQLITE_CREATE:
+    event.listen(GeneratedText.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in SQLITE_DROP:
+    event.listen(GeneratedText.__table__, 'before_drop', DDL(statement).execute_if(dialect='sqlite'))
+for statement in POSTGRESQL_CREATE:
+    event.listen(GeneratedText.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+# What unindex() needs of a row; a DELETE can return these for the rows it removes
+INDEXED_COLUMNS = (
+    GeneratedText.id,
+    GeneratedText.user_id,
+    GeneratedText.prompt,
+    GeneratedText.response_codec,
+    GeneratedText.response_compressed,
+)
+
+
+def _compressed_entries(rows):
+    """Parameters indexing the compressed rows among rows, with decoded responses
+
+    rows are GeneratedText instances, or mappings and result rows with the
+    INDEXED_COLUMNS (such as ResponseCodec.encode_row() dicts).
+    """
+    entries = []
+    for row in rows:
+        if not isinstance(row, GeneratedText):
+            row = getattr(row, '_mapping', row)
+            if row['response_codec'] is None:
+                continue
+            response = response_codec.decode(None, row['response_codec'], row['response_compressed'])
+            entries.append({'id': row['id'], 'user_id': row['user_id'], 'prompt': row['prompt'], 'response': response})
+        elif row.response_codec is not None:
+            entries.append({'id': row.id, 'user_id': row.user_id, 'prompt': row.prompt, 'response': row.response})
+    return entries
+
+
+def index(connection, rows):
+    """Add the compressed rows among rows to the index, after they are written"""
+    entries = _compressed_entries(rows)
+    if not entries:
+        return
+
+    if connection.dialect.name == 'sqlite':
+        connection.execute(
+            text(
+                f"INSERT INTO {FTS_TABLE}(rowid, prompt, response, user_id) "
+                "VALUES (:id, :prompt, :response, :user_id)"
+            ),
+            entries
+        )
+    elif connection.dialect.name == 'postgresql':
+        connection.execute(
+            text(
+                f"UPDATE generated_texts SET {SEARCH_VECTOR_COLUMN} = "
+                f"to_tsvector('{SEARCH_CONFIG}', CAST(:prompt AS text) || ' ' || CAST(:response AS text)) "
+                "WHERE id = :id"
+            ),
+            entries
+        )
+
+
+def unindex(connection, rows):
+    """Remove the compressed rows among rows from the index
+
+    Call with the values the rows had when they were indexed, before or
+    after they are deleted or changed. On PostgreSQL the vector goes with the
+    row, so there is nothing to do.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+
+    entries = _compressed_entries(rows)
+    if entries:
+        connection.execute(
+            text(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, prompt, response, user_id) "
+                "VALUES ('delete', :id, :prompt, :response, :user_id)"
+            ),
+            entries
+        )
+
+
+def unindex_user(connection, user_id):
+    """Remove a user's compressed rows from the index before ON DELETE CASCADE drops them"""
+    if connection.dialect.name != 'sqlite':
+        return
+
+    rows = connection.execute(
+        select(*INDEXED_COLUMNS).where(
+            GeneratedText.user_id == user_id,
+            GeneratedText.response_codec.is_not(None)
+        )
+    ).all()
+    unindex(connection, rows)
+
+
+def include_name(name, type_, parent_names):
+    """Alembic filter that hides the search index objects from autogenerate"""
+    if type_ == 'table':
+        return not name.startswith(FTS_TABLE)
+    if type_ == 'column':
+        return name != SEARCH_VECTOR_COLUMN
+    if type_ == 'index':
+        return name != SEARCH_INDEX
+    return True
+
+
+def fts5_query(text):
+    """Turn free text into an FTS5 query that matches all of its words
+
+    Each word is quoted so user input can't inject FTS5 operators or cause
+    syntax errors.
+    """
+    terms = [word.replace('"', '""') for word in text.split()]
+    return ' '.join(f'"{term}"' for term in terms if term)
+
+
+def ranked_search(dialect_name, user_id, query_text):
+    """Return (join target, join condition, match criterion, rank expression)
+
+    The match is limited to user_id's texts. Lower rank sorts first on every
+    backend. Raises SearchNotSupportedError for other databases.
+    """
+    if dialect_name == 'sqlite':
+        fts = table(FTS_TABLE, column('rowid'))
+        query = f'user_id : "{int(user_id)}" AND ({fts5_query(query_text)})'
+        match = literal_column(FTS_TABLE).op('MATCH')(query)
+        # bm25() is negative, more negative for better matches; the owner
+        # token is in every hit, so its column gets no weight
+        rank = func.bm25(literal_column(FTS_TABLE), 1.0, 1.0, 0.0)
+        return fts, fts.c.rowid == GeneratedText.id, match, rank
+
+    if dialect_name == 'postgresql':
+        vector = literal_column(f'generated_texts.{SEARCH_VECTOR_COLUMN}')
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, query_text)
+        return None, None, vector.op('@@')(tsquery), -func.ts_rank(vector, tsquery)
+
+    raise SearchNotSupportedError(f"Full-text search is not supported on {dialect_name}")
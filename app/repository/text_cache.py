@@ -0,0 +1,320 @@
+import json
+import logging
+import random
+import threading
+import time
+from ..utils.cache import LRUCache
+
+
+class MemoryTextStore:
+    """Per-process LRU store for serialized texts, keyed by (user_id, text_id)"""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, ttl=60):
+        self.cache = LRUCache(max_bytes=max_bytes, ttl=ttl)
+        # One counter for the whole process, bumped by every invalidation
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id, text_id):
+        return self.cache.get((user_id, text_id))
+
+    def set(self, user_id, text_id, value):
+        self.cache.set((user_id, text_id), value)
+
+    def generation(self, user_id):
+        return self._generation
+
+    def set_if_generation(self, user_id, text_id, value, generation):
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self.cache.set((user_id, text_id), value)
+            return True
+
+    def delete(self, user_id, text_id):
+        with self._lock:
+            self._generation += 1
+            self.cache.delete((user_id, text_id))
+
+    def delete_user(self, user_id):
+        with self._lock:
+            self._generation += 1
+            # Linear in the number of entries; only runs when a user is deleted
+            self.cache.delete_matching(lambda key: key[0] == user_id)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        stats = self.cache.stats()
+        return {
+            'backend': 'memory',
+            'entries': stats['entries'],
+            'bytes': stats['bytes'],
+            'evictions': stats['evictions'],
+            'expirations': stats['expirations']
+        }
+
+
+class RedisTextStore:
+    """Store shared by every worker: one Redis hash per user, one field per text
+
+    Dropping a user's entries is a single DEL. The TTL applies to the whole
+    hash and is refreshed on every write, so entries of active users may
+    outlive it. Invalidation on writes keeps those entries correct.
+    Each user also has a generation counter that every invalidation bumps;
+    conditional fills compare it atomically in a Lua script.
+    Requires the redis package.
+    """
+
+    # Must outlast the slowest read between generation() and a fill
+    GENERATION_TTL = 3600
+
+    SET_IF_GENERATION = """
+        if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+            return 0
+        end
+        redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+        if tonumber(ARGV[4]) > 0 then
+            redis.call('EXPIRE', KEYS[1], ARGV[4])
+        end
+        return 1
+    """
+
+    def __init__(self, url, ttl=60, prefix='generated_texts:', client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError('TEXT_CACHE_BACKEND=redis requires the redis package') from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._set_if_generation = client.register_script(self.SET_IF_GENERATION)
+
+    def _key(self, user_id):
+        return f'{self.prefix}{user_id}'
+
+    def _generation_key(self, user_id):
+        return f'{self.prefix}{user_id}:generation'
+
+    def get(self, user_id, text_id):
+        value = self.client.hget(self._key(user_id), text_id)
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def set(self, user_id, text_id, value):
+        pipeline = self.client.pipeline()
+        pipeline.hset(self._key(user_id), text_id, value)
+        if self.ttl:
+            pipeline.expire(self._key(user_id), self.ttl)
+        pipeline.execute()
+
+    def generation(self, user_id):
+        value = self.client.get(self._generation_key(user_id))
+        if value is None:
+            return '0'
+        return value.decode('utf-8') if isinstance(value, bytes) else str(value)
+
+    def set_if_generation(self, user_id, text_id, value, generation):
+        keys = [self._key(user_id), self._generation_key(user_id)]
+        args = [generation, text_id, value, self.ttl or 0]
+        return bool(self._set_if_generation(keys=keys, args=args))
+
+    def _bump_generation(self, pipeline, user_id):
+        pipeline.incr(self._generation_key(user_id))
+        pipeline.expire(self._generation_key(user_id), self.GENERATION_TTL)
+
+    def delete(self, user_id, text_id):
+        pipeline = self.client.pipeline()
+        pipeline.hdel(self._key(user_id), text_id)
+        self._bump_generation(pipeline, user_id)
+        pipeline.execute()
+
+    def delete_user(self, user_id):
+        pipeline = self.client.pipeline()
+        pipeline.delete(self._key(user_id))
+        self._bump_generation(pipeline, user_id)
+        pipeline.execute()
+
+    def clear(self):
+        for key in self.client.scan_iter(match=f'{self.prefix}*'):
+            self.client.delete(key)
+
+    def stats(self):
+        return {'backend': 'redis'}
+
+
+class TextCache:
+    """Read-through cache of single generated texts for the detail endpoint
+
+    Entries hold the JSON-serialized to_dict() of a text together with the
+    time it was cached, never ORM instances, so they can be shared across
+    sessions and processes. Creates fill the cache; updates and deletes drop
+    the one affected entry; deleting a user drops all of theirs.
+
+    A read-through fill passes the generation() taken before its database
+    read, and is skipped if an invalidation happened in between; otherwise
+    a read that raced a write could put the old row back after the write
+    dropped it.
+
+    With the memory backend each worker invalidates only its own copy, so
+    another worker can serve a changed text until the TTL expires. Use the
+    redis backend when that matters. A sample of hits (verify_rate) is
+    re-read from the database to measure how often stale data is served.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = False
+        self.verify_rate = 0.0
+        self.store = MemoryTextStore()
+        self.clock = time.time
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.skipped_fills = 0
+        self.verified = 0
+        self.stale = 0
+        self.hit_age_total = 0.0
+        self.hit_age_max = 0.0
+
+    def init_app(self, app):
+        """Configure the cache backend from app config"""
+        self.enabled = app.config.get('TEXT_CACHE_ENABLED', False)
+        self.verify_rate = app.config.get('TEXT_CACHE_VERIFY_RATE', 0.0)
+        ttl = app.config.get('TEXT_CACHE_TTL', 60)
+
+        backend = app.config.get('TEXT_CACHE_BACKEND', 'memory')
+        if backend == 'redis':
+            self.store = RedisTextStore(app.config.get('TEXT_CACHE_REDIS_URL'), ttl=ttl)
+        elif backend == 'memory':
+            self.store = MemoryTextStore(
+                max_bytes=app.config.get('TEXT_CACHE_MAX_BYTES', 16 * 1024 * 1024),
+                ttl=ttl
+            )
+        else:
+            raise ValueError(f"Unknown TEXT_CACHE_BACKEND: {backend}")
+
+        self.reset_stats()
+        app.extensions['text_cache'] = self
+
+        if self.enabled:
+            self.logger.info(f"Text cache enabled: backend={backend}, ttl={ttl}s")
+
+    def get(self, user_id, text_id):
+        """Return the cached dict for a text, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        try:
+            value = self.store.get(user_id, text_id)
+        except Exception as e:
+            self.logger.warning(f"Text cache read failed: {str(e)}")
+            return None
+
+        if value is None:
+            self.misses += 1
+            return None
+
+        entry = json.loads(value)
+        age = max(self.clock() - entry['cached_at'], 0.0)
+        self.hits += 1
+        self.hit_age_total += age
+        self.hit_age_max = max(self.hit_age_max, age)
+        return entry['data']
+
+    def generation(self, user_id):
+        """Token for a fill from a read that starts now, or None if fills are off"""
+        if not self.enabled:
+            return None
+
+        try:
+            return self.store.generation(user_id)
+        except Exception as e:
+            self.logger.warning(f"Text cache read failed: {str(e)}")
+            return None
+
+    def set(self, user_id, text_id, data, generation=None):
+        """Cache the serialized dict of a text
+
+        With a generation, the entry is only written if no invalidation has
+        happened since that generation was taken.
+        """
+        if not self.enabled:
+            return
+
+        value = json.dumps({'cached_at': self.clock(), 'data': data})
+        try:
+            if generation is None:
+                self.store.set(user_id, text_id, value)
+            elif not self.store.set_if_generation(user_id, text_id, value, generation):
+                self.skipped_fills += 1
+        except Exception as e:
+            self.logger.warning(f"Text cache write failed: {str(e)}")
+
+    def invalidate(self, user_id, text_id):
+        """Drop the entry for one text"""
+        if not self.enabled:
+            return
+
+        self.invalidations += 1
+        try:
+            self.store.delete(user_id, text_id)
+        except Exception as e:
+            self.logger.error(f"Text cache invalidation failed for text {text_id}: {str(e)}")
+
+    def invalidate_user(self, user_id):
+        """Drop every entry belonging to a user"""
+        if not self.enabled:
+            return
+
+        self.invalidations += 1
+        try:
+            self.store.delete_user(user_id)
+        except Exception as e:
+            self.logger.error(f"Text cache invalidation failed for user {user_id}: {str(e)}")
+
+    def should_verify(self):
+        """Whether this hit should be checked against the database"""
+        return self.verify_rate > 0 and random.random() < self.verify_rate
+
+    def record_verification(self, cached, current):
+        """Count a verified hit, and whether the cached copy was out of date"""
+        self.verified += 1
+        if cached != current:
+            self.stale += 1
+
+    def clear(self):
+        self.store.clear()
+
+    def reset_stats(self):
+        self.hits = self.misses = self.invalidations = 0
+        self.skipped_fills = 0
+        self.verified = self.stale = 0
+        self.hit_age_total = self.hit_age_max = 0.0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        try:
+            store = self.store.stats()
+        except Exception as e:
+            store = {'error': str(e)}
+        return dict(
+            store,
+            enabled=self.enabled,
+            hits=self.hits,
+            misses=self.misses,
+            hit_ratio=round(self.hits / lookups, 4) if lookups else 0.0,
+            invalidations=self.invalidations,
+            skipped_fills=self.skipped_fills,
+            hit_age_avg_ms=round(self.hit_age_total / self.hits * 1000, 2) if self.hits else 0.0,
+            hit_age_max_ms=round(self.hit_age_max * 1000, 2),
+            verified=self.verified,
+            stale=self.stale,
+            stale_ratio=round(self.stale / self.verified, 4) if self.verified else 0.0
+        )
+
+
+text_cache = TextCache()
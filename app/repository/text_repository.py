@@ -1,46 +1,273 @@
-from ..models import db, GeneratedText
+from ..models import db, GeneratedText, User
+from .routing import replica_router
+from . import search as search_index
+from .text_cache import text_cache
+from .write_behind import write_behind
+from ..utils.compression import response_codec
+from sqlalchemy import and_, delete, func, or_, select, update
 import logging
 
 class TextRepository:
+    # Characters of the prompt returned by summary listings
+    SUMMARY_PREVIEW_LENGTH = 100
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
     
     def get_by_id(self, text_id):
         """Get a generated text by ID"""
         try:
-            return GeneratedText.query.get(text_id)
+            self._settle(text_id)
+            return db.session.get(GeneratedText, text_id, bind_arguments=replica_router.read_bind())
         except Exception as e:
             self.logger.error(f"Error retrieving text by ID {text_id}: {str(e)}")
             return None
     
-    def get_by_id_and_user(self, text_id, user_id):
-        """Get a text by ID and ensure it belongs to the specified user"""
+    def get_by_id_and_user(self, text_id, user_id, primary=False):
+        """Get a text by ID and ensure it belongs to the specified user
+        
+        Reads the replica when one is configured, unless primary is set.
+        """
         try:
-            return GeneratedText.query.filter_by(id=text_id, user_id=user_id).first()
+            # Rows still queued by the write-behind writer are served from memory
+            pending = write_behind.get_pending(text_id, user_id)
+            if pending is not None:
+                return pending
+            stmt = select(GeneratedText).filter_by(id=text_id, user_id=user_id)
+            bind_arguments = {} if primary else replica_router.read_bind(user_id)
+            return db.session.execute(stmt, bind_arguments=bind_arguments).scalar()
         except Exception as e:
             self.logger.error(f"Error retrieving text ID {text_id} for user {user_id}: {str(e)}")
             return None
     
+    def get_texts_version(self, user_id):
+        """Get the user's texts version, which changes whenever their texts do
+        
+        A single primary-key lookup that reads no text rows; returns None for
+        an unknown user.
+        """
+        try:
+            stmt = select(User.texts_version).where(User.id == user_id)
+            return db.session.execute(stmt, bind_arguments=replica_router.read_bind(user_id)).scalar()
+        except Exception as e:
+            self.logger.error(f"Error retrieving texts version for user {user_id}: {str(e)}")
+            return None
+    
+    def get_serialized(self, text_id, user_id):
+        """Get a text as a dict, through the read-through cache
+        
+        Returns None if the text doesn't exist or belongs to another user.
+        """
+        return response_codec.expand(self.get_stored(text_id, user_id))
+    
+    def get_stored(self, text_id, user_id):
+        """Get a text as stored, through the read-through cache
+        
+        Like get_serialized, but a compressed response is left compressed (see
+        GeneratedText.to_stored_dict), which is also the form the cache holds.
+        A sampled cache hit is compared with the database; if it turns out
+        stale the entry is dropped and the current row returned.
+        
+        With the cache enabled, misses read the primary: an entry filled from
+        a lagging replica would keep serving the old row long after the
+        replica caught up.
+        """
+        pending = write_behind.get_pending(text_id, user_id)
+        if pending is not None:
+            return pending.to_stored_dict()
+        
+        cached = text_cache.get(user_id, text_id)
+        if cached is not None and not text_cache.should_verify():
+            return cached
+        
+        generation = text_cache.generation(user_id)
+        text = self.get_by_id_and_user(text_id, user_id, primary=text_cache.enabled)
+        data = text.to_stored_dict() if text else None
+        
+        if cached is not None:
+            text_cache.record_verification(cached, data)
+            if cached == data:
+                return cached
+            # Dropped rather than replaced: the invalidation voids this
+            # read's generation, and the next miss fills the entry
+            text_cache.invalidate(user_id, text_id)
+            return data
+        
+        if data is not None and generation is not None:
+            text_cache.set(user_id, text_id, data, generation=generation)
+        return data
+    
     def get_all_by_user_id(self, user_id):
         """Get all texts for a user"""
         try:
-            return GeneratedText.query.filter_by(user_id=user_id).order_by(GeneratedText.timestamp.desc()).all()
+            stmt = select(GeneratedText).filter_by(user_id=user_id).order_by(GeneratedText.timestamp.desc(), GeneratedText.id.desc())
+            return db.session.execute(stmt, bind_arguments=replica_router.read_bind(user_id)).scalars().all()
         except Exception as e:
             self.logger.error(f"Error retrieving texts for user {user_id}: {str(e)}")
             return []
     
-    def create(self, user_id, prompt, response, provider=None):
+    def get_page_by_user_id(self, user_id, limit, after=None):
+        """Get one page of a user's texts, newest first
+        
+        Pages are keyed on (timestamp, id) rather than an offset, so every page
+        is a bounded range scan no matter how deep it is. `after` is the key of
+        the last row of the previous page. Returns (texts, next_key), where
+        next_key is None on the last page.
+        """
+        try:
+            stmt = select(GeneratedText).filter_by(user_id=user_id)
+            stmt = stmt.filter(*self._keyset_filter(after))
+            
+            # Fetch one extra row to learn whether another page exists
+            stmt = stmt.order_by(GeneratedText.timestamp.desc(), GeneratedText.id.desc()).limit(limit + 1)
+            texts = db.session.execute(stmt, bind_arguments=replica_router.read_bind(user_id)).scalars().all()
+            return self._split_page(texts, limit)
+        except Exception as e:
+            self.logger.error(f"Error retrieving page of texts for user {user_id}: {str(e)}")
+            return [], None
+    
+    def get_summaries_by_user_id(self, user_id, limit=None, after=None):
+        """Get lightweight summaries of a user's texts, newest first
+        
+        Only a prompt preview and column lengths are selected, so the full prompt
+        and response bodies never leave the database, and rows come back as plain
+        tuples without ORM identity-map bookkeeping. With a limit, paging works as
+        in get_page_by_user_id; returns (rows, next_key).
+        """
+        try:
+            stmt = select(
+                GeneratedText.id,
+                func.substr(GeneratedText.prompt, 1, self.SUMMARY_PREVIEW_LENGTH).label('prompt_preview'),
+                func.length(GeneratedText.prompt).label('prompt_length'),
+                func.coalesce(GeneratedText.response_length, func.length(GeneratedText.response_text)).label('response_length'),
+                GeneratedText.provider,
+                GeneratedText.cached,
+                GeneratedText.timestamp
+            ).where(
+                GeneratedText.user_id == user_id,
+                *self._keyset_filter(after)
+            ).order_by(GeneratedText.timestamp.desc(), GeneratedText.id.desc())
+            
+            bind_arguments = replica_router.read_bind(user_id)
+            if limit is None:
+                return db.session.execute(stmt, bind_arguments=bind_arguments).all(), None
+            
+            rows = db.session.execute(stmt.limit(limit + 1), bind_arguments=bind_arguments).all()
+            return self._split_page(rows, limit)
+        except Exception as e:
+            self.logger.error(f"Error retrieving text summaries for user {user_id}: {str(e)}")
+            return [], None
+    
+    def iter_export(self, user_id, batch_size=1000):
+        """Yield every text of a user, oldest first, for bulk export
+        
+        Rows are plain tuples read through a server-side cursor in batches of
+        batch_size, so memory stays flat however long the history is and the
+        session's identity map is never filled. Compressed responses stay
+        compressed; the export encoders decode them one row at a time. The
+        caller must exhaust or close the generator to release the connection.
+        """
+        stmt = select(
+            GeneratedText.id,
+            GeneratedText.prompt,
+            GeneratedText.response_text.label('response'),
+            GeneratedText.response_codec,
+            GeneratedText.response_compressed,
+            GeneratedText.provider,
+            GeneratedText.cached,
+            GeneratedText.timestamp
+        ).where(
+            GeneratedText.user_id == user_id
+        ).order_by(GeneratedText.timestamp, GeneratedText.id)
+        
+        result = db.session.execute(
+            stmt,
+            execution_options={'yield_per': batch_size},
+            bind_arguments=replica_router.read_bind(user_id)
+        )
+        try:
+            for partition in result.partitions():
+                yield from partition
+        finally:
+            result.close()
+    
+    def search(self, user_id, query_text, limit=20, offset=0):
+        """Full-text search over a user's prompts and responses, best match first
+        
+        Returns a list of (text, rank) pairs. The match runs against the search
+        index (see repository/search.py), which is partitioned by owner, so
+        cost grows with this user's hits rather than with every user's.
+        Raises SearchNotSupportedError if the database has no search index.
+        """
+        try:
+            bind_arguments = replica_router.read_bind(user_id)
+            dialect_name = db.session.get_bind(**bind_arguments).dialect.name
+            target, onclause, match, rank = search_index.ranked_search(dialect_name, user_id, query_text)
+            
+            stmt = select(GeneratedText, rank.label('rank'))
+            if target is not None:
+                stmt = stmt.join(target, onclause)
+            stmt = stmt.where(
+                match,
+                GeneratedText.user_id == user_id
+            ).order_by(rank, GeneratedText.id.desc()).limit(limit).offset(offset)
+            
+            rows = db.session.execute(stmt, bind_arguments=bind_arguments).all()
+            return [(text, rank) for text, rank in rows]
+        except search_index.SearchNotSupportedError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Error searching texts for user {user_id}: {str(e)}")
+            return []
+    
+    @staticmethod
+    def _settle(text_id):
+        """Wait for a queued write-behind row to reach the database before changing it"""
+        if write_behind.is_pending(text_id):
+            write_behind.flush()
+    
+    @staticmethod
+    def _keyset_filter(after):
+        """Criteria selecting rows that sort after the (timestamp, id) key"""
+        if after is None:
+            return ()
+        timestamp, text_id = after
+        return (or_(
+            GeneratedText.timestamp < timestamp,
+            and_(GeneratedText.timestamp == timestamp, GeneratedText.id < text_id)
+        ),)
+    
+    @staticmethod
+    def _split_page(rows, limit):
+        """Trim the look-ahead row and return (rows, key of the last row or None)"""
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, (rows[-1].timestamp, rows[-1].id)
+    
+    def create(self, user_id, prompt, response, provider=None, cached=False):
         """Create a new generated text"""
         try:
             new_text = GeneratedText(
                 user_id=user_id,
                 prompt=prompt,
                 response=response,
-                provider=provider
+                provider=provider,
+                cached=cached
             )
             
             db.session.add(new_text)
+            db.session.flush()
+            search_index.index(db.session.connection(), [new_text])
+            db.session.execute(User.bump_texts_version([user_id]))
+            
+            # Detach before commit so serializing the row needs no refresh SELECT
+            db.session.expunge(new_text)
             db.session.commit()
+            replica_router.record_write(user_id)
+            
+            # Clients usually fetch a text right after generating it
+            text_cache.set(user_id, new_text.id, new_text.to_stored_dict())
             
             self.logger.info(f"Created new text for user {user_id}, text ID: {new_text.id}")
             return new_text
@@ -50,43 +277,182 @@ class TextRepository:
             self.logger.error(f"Error creating text for user {user_id}: {str(e)}")
             raise
     
+    def create_deferred(self, user_id, prompt, response, provider=None, cached=False):
+        """Create a generated text without waiting for the commit when write-behind is on
+        
+        The returned text has its final id either way; with write-behind it is
+        written by a background batch insert shortly afterwards.
+        """
+        if not write_behind.enabled:
+            return self.create(user_id, prompt, response, provider=provider, cached=cached)
+        
+        new_text = write_behind.submit(user_id, prompt, response, provider=provider, cached=cached)
+        replica_router.record_write(user_id)
+        text_cache.set(user_id, new_text.id, new_text.to_stored_dict())
+        self.logger.info(f"Queued new text for user {user_id}, text ID: {new_text.id}")
+        return new_text
+    
+    def create_many(self, user_id, texts):
+        """Create several generated texts in a single bulk write"""
+        try:
+            new_texts = [GeneratedText(user_id=user_id, **text) for text in texts]
+            
+            db.session.add_all(new_texts)
+            db.session.flush()
+            if new_texts:
+                search_index.index(db.session.connection(), new_texts)
+                db.session.execute(User.bump_texts_version([user_id]))
+            
+            # Detach before commit so the caller can serialize the rows without
+            # a refresh SELECT per row
+            for new_text in new_texts:
+                db.session.expunge(new_text)
+            db.session.commit()
+            replica_router.record_write(user_id)
+            for new_text in new_texts:
+                text_cache.set(user_id, new_text.id, new_text.to_stored_dict())
+            
+            self.logger.info(f"Created {len(new_texts)} texts for user {user_id}")
+            return new_texts
+            
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error creating texts for user {user_id}: {str(e)}")
+            raise
+    
     def update(self, id, user_id, prompt=None, response=None):
         """Update a generated text"""
+        return self.update_returning(id, user_id, prompt=prompt, response=response) is not None
+    
+    def update_returning(self, id, user_id, prompt=None, response=None):
+        """Update a generated text in one statement and return it, or None if not found
+        
+        The owner check is part of the UPDATE's WHERE clause and RETURNING hands
+        back the new row, so there is no SELECT before or after the write.
+        Compressed rows are the exception: their search entry has to be
+        removed with the old values, which are read first.
+        """
         try:
-            text = self.get_by_id_and_user(id, user_id)
-            if not text:
-                return False
-                
+            self._settle(id)
+            
+            values = {}
             if prompt is not None:
-                text.prompt = prompt
-                
+                values['prompt'] = prompt
             if response is not None:
-                text.response = response
-                
+                stored = response_codec.encode(response)
+                values['response_text'] = stored.pop('response')
+                values.update(stored)
+            if not values:
+                return self.get_by_id_and_user(id, user_id)
+            
+            stmt = (
+                update(GeneratedText)
+                .where(GeneratedText.id == id, GeneratedText.user_id == user_id)
+                .values(**values)
+                .returning(GeneratedText)
+            )
+            connection = db.session.connection()
+            text = db.session.execute(stmt.where(GeneratedText.response_codec.is_(None))).scalar()
+            
+            if text is None:
+                old = db.session.execute(
+                    select(*search_index.INDEXED_COLUMNS)
+                    .where(GeneratedText.id == id, GeneratedText.user_id == user_id)
+                ).first()
+                if old is None:
+                    db.session.rollback()
+                    return None
+                search_index.unindex(connection, [old])
+                text = db.session.execute(stmt).scalar()
+            
+            search_index.index(connection, [text])
+            db.session.execute(User.bump_texts_version([user_id]))
+            db.session.expunge(text)
             db.session.commit()
+            replica_router.record_write(user_id)
+            text_cache.invalidate(user_id, id)
             
             self.logger.info(f"Updated text ID {id} for user {user_id}")
-            return True
+            return text
             
         except Exception as e:
             db.session.rollback()
             self.logger.error(f"Error updating text ID {id} for user {user_id}: {str(e)}")
-            return False
+            return None
+    
+    def compress_batch(self, after_id=0, batch_size=500):
+        """Store long uncompressed responses compressed, batch_size rows past after_id
+        
+        Uses the current codec settings. Returns (rows compressed, id to pass as
+        after_id next time, or None once every row has been seen).
+        """
+        try:
+            rows = db.session.execute(
+                select(GeneratedText.id, GeneratedText.user_id, GeneratedText.prompt, GeneratedText.response_text)
+                .where(
+                    GeneratedText.id > after_id,
+                    GeneratedText.response_codec.is_(None),
+                    func.length(GeneratedText.response_text) >= response_codec.min_length
+                )
+                .order_by(GeneratedText.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                db.session.rollback()
+                return 0, None
+            
+            compressed = []
+            for row in rows:
+                stored = response_codec.encode(row.response_text)
+                compressed.append(dict(stored, id=row.id, user_id=row.user_id, prompt=row.prompt))
+                stored['response_text'] = stored.pop('response')
+                db.session.execute(
+                    update(GeneratedText)
+                    .where(GeneratedText.id == row.id)
+                    .values(**stored)
+                    .execution_options(synchronize_session=False)
+                )
+            search_index.index(db.session.connection(), compressed)
+            user_ids = {row.user_id for row in rows}
+            db.session.execute(User.bump_texts_version(user_ids))
+            db.session.commit()
+            
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error compressing responses after text ID {after_id}: {str(e)}")
+            raise
+        
+        for row in rows:
+            text_cache.invalidate(row.user_id, row.id)
+        for user_id in user_ids:
+            replica_router.record_write(user_id)
+        return len(rows), rows[-1].id
     
     def delete(self, text_id, user_id):
-        """Delete a generated text"""
+        """Delete a generated text in one statement; the owner check is in the WHERE clause"""
         try:
-            text = self.get_by_id_and_user(text_id, user_id)
-            if not text:
-                return False
-                
-            db.session.delete(text)
+            self._settle(text_id)
+            
+            deleted = db.session.execute(
+                delete(GeneratedText)
+                .where(GeneratedText.id == text_id, GeneratedText.user_id == user_id)
+                .returning(*search_index.INDEXED_COLUMNS)
+            ).first()
+            if deleted is not None:
+                search_index.unindex(db.session.connection(), [deleted])
+                db.session.execute(User.bump_texts_version([user_id]))
             db.session.commit()
             
+            if deleted is None:
+                return False
+            
+            replica_router.record_write(user_id)
+            text_cache.invalidate(user_id, text_id)
+            
             self.logger.info(f"Deleted text ID {text_id} for user {user_id}")
             return True
             
         except Exception as e:
             db.session.rollback()
             self.logger.error(f"Error deleting text ID {text_id} for user {user_id}: {str(e)}")
-            return False
\ No newline at end of file
+            return False
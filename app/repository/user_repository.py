@@ -1,5 +1,12 @@
-from sqlalchemy import func
-from ..models import db, User
+from flask import current_app
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+from ..models import db, GeneratedText, User, normalize_username
+from . import search as search_index
+from .purge_repository import PurgeRepository
+from .routing import replica_router
+from .text_cache import text_cache
 import logging
 
 class UserRepository:
@@ -8,62 +15,110 @@ class UserRepository:
     
     def normalize_username(self, username):
         """Normalize username to lowercase for consistent comparisons"""
-        return username.lower() if username else None
+        return normalize_username(username)
     
     def get_by_id(self, user_id):
-        """Get a user by ID"""
+        """Get a user by ID; users awaiting a purge are not returned"""
         try:
-            return User.query.get(user_id)
+            return db.session.execute(
+                select(User).where(User.id == user_id, User.deleted_at.is_(None)),
+                bind_arguments=replica_router.read_bind(user_id)
+            ).scalar()
         except Exception as e:
             self.logger.error(f"Error retrieving user by ID {user_id}: {str(e)}")
             return None
     
+    def is_active(self, user_id):
+        """Whether the user exists and is not awaiting a purge
+        
+        Always reads the primary: a replica may not have the deletion yet, or
+        may not have the user yet if they just registered.
+        """
+        return db.session.execute(
+            select(User.id).where(User.id == user_id, User.deleted_at.is_(None))
+        ).first() is not None
+    
     def get_by_username(self, username):
-        """Get a user by username (case-insensitive)"""
+        """Get a user by username (case-insensitive)
+        
+        Reads from the replica when one is configured. A miss there is retried
+        on the primary, since a just-registered user may not have replicated yet.
+        """
         try:
             normalized_username = self.normalize_username(username)
-            return User.query.filter(func.lower(User.username) == normalized_username).first()
+            # Users awaiting a purge can no longer log in
+            stmt = select(User).where(User.username_normalized == normalized_username, User.deleted_at.is_(None))
+            
+            bind_arguments = replica_router.read_bind()
+            user = db.session.execute(stmt, bind_arguments=bind_arguments).scalar()
+            if user is None and bind_arguments:
+                replica_router.record_fallback()
+                user = db.session.execute(stmt).scalar()
+            return user
         except Exception as e:
             self.logger.error(f"Error retrieving user by username '{username}': {str(e)}")
             return None
     
     def create(self, username, password):
-        """Create a new user"""
+        """Create a new user, or return None if the username is taken
+        
+        Uniqueness (case-insensitive) is enforced by the unique index on
+        username_normalized, so the INSERT itself detects duplicates without a
+        lookup first.
+        """
         try:
-            # Normalize the username before checking for duplicates
-            normalized_username = self.normalize_username(username)
-            
-            # Check if user already exists (case-insensitive)
-            existing_user = self.get_by_username(normalized_username)
-            if existing_user:
-                self.logger.warning(f"Attempted to create duplicate user: {username}")
-                return None
-            
-            # Create new user with the original case but we'll query with normalized case
             new_user = User(username=username)
             new_user.set_password(password)
             
             db.session.add(new_user)
+            db.session.flush()
+            user_id = new_user.id
             db.session.commit()
+            replica_router.record_write(user_id)
             
             self.logger.info(f"Created new user: {username}")
             return new_user
             
+        except IntegrityError as e:
+            db.session.rollback()
+            if not self._is_duplicate_username(e):
+                self.logger.error(f"Error creating user '{username}': {str(e)}")
+                raise
+            self.logger.warning(f"Attempted to create duplicate user: {username}")
+            return None
+            
         except Exception as e:
             db.session.rollback()
             self.logger.error(f"Error creating user '{username}': {str(e)}")
             raise
     
+    @staticmethod
+    def _is_duplicate_username(error):
+        """Whether an IntegrityError is the unique violation on the username"""
+        # PostgreSQL names the violated constraint
+        constraint = getattr(getattr(error.orig, 'diag', None), 'constraint_name', None)
+        if constraint is not None:
+            return constraint in ('ix_users_username_normalized', 'uq_users_username')
+        
+        # SQLite names the columns: "UNIQUE constraint failed: users.username_normalized"
+        message = str(error.orig)
+        return message.startswith('UNIQUE constraint failed: users.username')
+    
     def update_password(self, user_id, new_password):
-        """Update a user's password"""
+        """Update a user's password in a single UPDATE"""
         try:
-            user = self.get_by_id(user_id)
-            if not user:
-                return False
-                
-            user.set_password(new_password)
+            result = db.session.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(password_hash=generate_password_hash(new_password))
+            )
             db.session.commit()
             
+            if not result.rowcount:
+                return False
+            
+            replica_router.record_write(user_id)
+            
             self.logger.info(f"Updated password for user ID {user_id}")
             return True
             
@@ -72,20 +127,50 @@ class UserRepository:
             self.logger.error(f"Error updating password for user ID {user_id}: {str(e)}")
             return False
     
-    def delete(self, user_id):
-        """Delete a user"""
+    def delete(self, user_id, purge_threshold=None):
+        """Delete a user together with their texts and jobs
+        
+        Small users go in a single DELETE; the database removes their rows
+        through ON DELETE CASCADE, so nothing is loaded. Users with more than
+        purge_threshold texts are marked deleted instead and their rows are
+        removed in batches by the background purge (see PurgeRepository), so
+        no single transaction holds locks for long. Returns True if the user
+        was deleted or queued for purging, False if they don't exist.
+        """
+        if purge_threshold is None:
+            purge_threshold = current_app.config.get('USER_PURGE_THRESHOLD', 1000)
+        
         try:
-            user = self.get_by_id(user_id)
-            if not user:
-                return False
-                
-            db.session.delete(user)
+            # Probes the (user_id, timestamp, id) index instead of counting every row
+            large = db.session.execute(
+                select(GeneratedText.id)
+                .where(GeneratedText.user_id == user_id)
+                .offset(purge_threshold)
+                .limit(1)
+            ).scalar() is not None
+            
+            if large:
+                db.session.rollback()
+                purge = PurgeRepository().schedule(user_id)
+                replica_router.record_write(user_id)
+                return purge is not None
+            
+            search_index.unindex_user(db.session.connection(), user_id)
+            deleted_id = db.session.execute(
+                delete(User).where(User.id == user_id).returning(User.id)
+            ).scalar()
             db.session.commit()
             
+            if deleted_id is None:
+                return False
+            
+            replica_router.record_write(user_id)
+            text_cache.invalidate_user(user_id)
+            
             self.logger.info(f"Deleted user ID {user_id}")
             return True
             
         except Exception as e:
             db.session.rollback()
             self.logger.error(f"Error deleting user ID {user_id}: {str(e)}")
-            return False
\ No newline at end of file
+            return False
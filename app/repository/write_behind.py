@@ -0,0 +1,473 @@
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+from datetime import datetime
+from sqlalchemy import select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, DisconnectionError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from ..models import db, GeneratedText, User
+from ..utils.compression import response_codec
+from . import search as search_index
+
+
+class WriteBehindConfigError(ValueError):
+    """Raised by init_app when write-behind cannot run with the app's configuration"""
+
+
+class IdAllocator:
+    """Hands out generated_texts ids before the rows are inserted
+
+    Ids are reserved from the database in blocks, so they never collide with
+    rows inserted by other processes or by synchronous writes:
+
+    - PostgreSQL: nextval() on the id column's sequence.
+    - SQLite: the table is AUTOINCREMENT, so bumping its sqlite_sequence
+      high-water mark reserves the ids in between.
+
+    Ids left in a block when the process exits are skipped, leaving gaps.
+    """
+
+    SUPPORTED_DIALECTS = ('postgresql', 'sqlite')
+
+    def __init__(self, block_size=100):
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._next = self._end = 0
+
+    def allocate(self):
+        """Return the next reserved id; must be called inside an app context"""
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = self._reserve(self.block_size)
+            text_id = self._next
+            self._next += 1
+            return text_id
+
+    def _reserve(self, count):
+        # Returns the half-open range [start, end) of newly reserved ids
+        table = GeneratedText.__tablename__
+        with db.engine.begin() as conn:
+            dialect = conn.dialect.name
+
+            if dialect == 'postgresql':
+                ids = conn.execute(
+                    text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+                    {'table': table, 'count': count}
+                ).scalars().all()
+                # Sequence values are consecutive unless another session interleaves
+                if ids == list(range(ids[0], ids[0] + count)):
+                    return ids[0], ids[0] + count
+                return ids[0], ids[0] + 1
+
+            if dialect == 'sqlite':
+                # Writing first takes the database write lock, so concurrent
+                # reservations from other processes are serialized
+                updated = conn.execute(
+                    text('UPDATE sqlite_sequence SET seq = seq + :count WHERE name = :table'),
+                    {'table': table, 'count': count}
+                ).rowcount
+                if not updated:
+                    conn.execute(
+                        text(f'INSERT INTO sqlite_sequence (name, seq) SELECT :table, COALESCE(MAX(id), 0) + :count FROM {table}'),
+                        {'table': table, 'count': count}
+                    )
+                end = conn.execute(
+                    text('SELECT seq FROM sqlite_sequence WHERE name = :table'),
+                    {'table': table}
+                ).scalar()
+                return end - count + 1, end + 1
+
+            # init_app refuses other dialects, so this means a misconfigured writer
+            raise WriteBehindConfigError(f"Id pre-allocation is not supported on {dialect}")
+
+
+class WriteBehindWriter:
+    """Persists generated texts in the background, off the request path
+
+    submit() assigns the row its final id, queues it and returns straight away.
+    A writer thread drains the queue in batches, one multi-row INSERT per batch.
+    Until a row is written it can be read by id through get_pending().
+
+    Durability:
+      none     queued rows live only in memory; a crash loses them
+      journal  each row is appended and fsynced to a journal file before
+               submit() returns; unwritten rows are replayed on startup
+
+    Each process journals to its own file, the configured path suffixed with
+    the hostname and pid, and holds an exclusive flock on it while running.
+    On startup a process replays the journals whose lock it can take: its
+    own, left by an earlier process with the same pid, and those of processes
+    that died. Journals of live processes stay locked and are left alone.
+
+    When the database is unavailable (lost connection, locked SQLite file),
+    rows stay pending, and journaled, and the writer retries them with
+    exponential backoff up to max_retry_interval seconds. Only rows that fail
+    on their own, e.g. because their user was deleted meanwhile, are dropped.
+
+    When the queue is full, submit() blocks for up to enqueue_timeout seconds
+    and then writes the row synchronously, so callers slow down rather than
+    lose data; if that write fails, submit() raises. Rows still queued at
+    interpreter exit are flushed.
+    """
+
+    NONE = 'none'
+    JOURNAL = 'journal'
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = False
+        self.batch_size = 100
+        self.flush_interval = 0.05
+        self.enqueue_timeout = 1.0
+        self.retry_interval = 0.5
+        self.max_retry_interval = 30.0
+        self.durability = self.NONE
+        self.journal_path = None
+        self.ids = IdAllocator()
+
+        self._app = None
+        self._journal = None
+        self._queue = queue.Queue(maxsize=1000)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._thread = None
+        self._stop = threading.Event()
+        self._atexit_registered = False
+
+        self.written = 0
+        self.batches = 0
+        self.sync_fallbacks = 0
+        self.retries = 0
+        self.failed = 0
+
+    def init_app(self, app):
+        """Configure the writer from app config and start it if enabled"""
+        self.enabled = app.config.get('WRITE_BEHIND_ENABLED', False)
+        self.batch_size = app.config.get('WRITE_BEHIND_BATCH_SIZE', 100)
+        self.flush_interval = app.config.get('WRITE_BEHIND_FLUSH_INTERVAL', 0.05)
+        self.enqueue_timeout = app.config.get('WRITE_BEHIND_ENQUEUE_TIMEOUT', 1.0)
+        self.retry_interval = app.config.get('WRITE_BEHIND_RETRY_INTERVAL', 0.5)
+        self.max_retry_interval = app.config.get('WRITE_BEHIND_MAX_RETRY_INTERVAL', 30.0)
+        self.durability = app.config.get('WRITE_BEHIND_DURABILITY', self.NONE)
+        self.journal_path = app.config.get('WRITE_BEHIND_JOURNAL_PATH')
+        self.ids = IdAllocator(app.config.get('WRITE_BEHIND_ID_BLOCK_SIZE', 100))
+        self._queue = queue.Queue(maxsize=app.config.get('WRITE_BEHIND_QUEUE_SIZE', 1000))
+        app.extensions['write_behind'] = self
+
+        if self.durability == self.JOURNAL and not self.journal_path:
+            raise WriteBehindConfigError('WRITE_BEHIND_JOURNAL_PATH is required for journal durability')
+
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+        dialect = make_url(uri).get_backend_name() if uri else None
+        if self.enabled and dialect not in IdAllocator.SUPPORTED_DIALECTS:
+            raise WriteBehindConfigError(f"Write-behind is not supported on {dialect}")
+
+        if self.enabled:
+            self.start(app)
+
+    def start(self, app):
+        """Replay the journal and start the writer thread"""
+        if self._thread:
+            return
+
+        self._app = app
+        with app.app_context():
+            self._replay_journal()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+
+        self.logger.info(f"Write-behind writer started (durability: {self.durability})")
+
+    def stop(self, timeout=30):
+        """Flush everything still queued and stop the writer thread"""
+        if not self._thread:
+            return
+        if not self.flush(timeout):
+            kept = 'kept in the journal' if self.durability == self.JOURNAL else 'lost'
+            self.logger.error(f"Stopping with {len(self._pending)} unwritten text(s), {kept}")
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+        if self._journal:
+            # Releases the lock; rows still unwritten are replayed by the next start
+            self._journal.close()
+            self._journal = None
+
+    def submit(self, user_id, prompt, response, provider=None, cached=False):
+        """Queue a generated text for writing; returns a transient GeneratedText
+
+        The returned object already has its final id and timestamp. Must be
+        called inside an app context.
+        """
+        row = {
+            'id': self.ids.allocate(),
+            'user_id': user_id,
+            'prompt': prompt,
+            'response': response,
+            'provider': provider,
+            'cached': cached,
+            'timestamp': datetime.utcnow()
+        }
+
+        with self._lock:
+            self._pending[row['id']] = row
+
+        try:
+            self._queue.put(row, timeout=self.enqueue_timeout)
+        except queue.Full:
+            # Backpressure: the caller pays for the write instead of dropping it
+            self.logger.warning('Write-behind queue is full; writing synchronously')
+            self.sync_fallbacks += 1
+            self._write_sync(row)
+            return GeneratedText(**row)
+
+        if self.durability == self.JOURNAL:
+            # The writer may already have inserted the row; replay skips it then
+            with self._lock:
+                self._journal_append(row)
+
+        return GeneratedText(**row)
+
+    def get_pending(self, text_id, user_id):
+        """Return a not-yet-written text as a transient GeneratedText, or None"""
+        with self._lock:
+            row = self._pending.get(text_id)
+        if row is None or row['user_id'] != user_id:
+            return None
+        return GeneratedText(**row)
+
+    def is_pending(self, text_id):
+        with self._lock:
+            return text_id in self._pending
+
+    def flush(self, timeout=30):
+        """Block until every queued row has been written; returns False on timeout"""
+        with self._drained:
+            return self._drained.wait_for(lambda: not self._pending, timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                retry = self._write(batch)
+            except Exception as e:
+                self.logger.error(f"Write-behind writer error: {str(e)}")
+                continue
+
+            # The database is unavailable: keep the rows and try again later
+            delay = self.retry_interval
+            while retry and not self._stop.wait(delay):
+                self.retries += 1
+                retry = self._write(retry)
+                delay = min(delay * 2, self.max_retry_interval)
+
+    @staticmethod
+    def _is_transient(error):
+        """Whether an insert failed because the database is unavailable, not the row"""
+        if isinstance(error, DBAPIError) and error.connection_invalidated:
+            return True
+        return isinstance(error, (OperationalError, InterfaceError, DisconnectionError, PoolTimeoutError))
+
+    def _insert(self, rows):
+        stored = [response_codec.encode_row(row) for row in rows]
+        with db.engine.begin() as conn:
+            conn.execute(GeneratedText.__table__.insert(), stored)
+            search_index.index(conn, stored)
+            # Versions change only once the rows are visible, so an
+            # ETag never covers a listing that lacks them
+            conn.execute(User.bump_texts_version({row['user_id'] for row in rows}))
+
+    def _write(self, rows):
+        """Insert rows in one statement, isolating bad rows if the batch fails
+
+        Returns the rows that could not be written because the database is
+        unavailable; they stay pending, and journaled, for a retry.
+        """
+        retry = []
+        with self._app.app_context():
+            try:
+                self._insert(rows)
+                self.batches += 1
+                written = rows
+            except Exception as e:
+                if self._is_transient(e):
+                    self.logger.warning(f"Batch insert of {len(rows)} texts failed, will retry: {str(e)}")
+                    return rows
+
+                self.logger.error(f"Batch insert of {len(rows)} texts failed, retrying one by one: {str(e)}")
+                written = []
+                for row in rows:
+                    try:
+                        self._insert([row])
+                        written.append(row)
+                    except Exception as row_error:
+                        if self._is_transient(row_error):
+                            retry.append(row)
+                            continue
+                        self.failed += 1
+                        self.logger.error(f"Dropping text {row['id']} for user {row['user_id']}: {str(row_error)}")
+
+        self.written += len(written)
+        retry_ids = {row['id'] for row in retry}
+        self._done([row for row in rows if row['id'] not in retry_ids])
+        return retry
+
+    def _write_sync(self, row):
+        """Write one row on the caller's thread, raising if it cannot be written"""
+        try:
+            with self._app.app_context():
+                self._insert([row])
+        except Exception:
+            # The caller gets the error instead of an id that will never exist
+            self._done([row])
+            raise
+
+        self.written += 1
+        self._done([row])
+
+    def _done(self, rows):
+        with self._drained:
+            for row in rows:
+                self._pending.pop(row['id'], None)
+            if not self._pending:
+                if self._journal:
+                    # Everything this process journaled is in the database,
+                    # or was dropped because the row itself can't be written
+                    self._journal.truncate(0)
+                self._drained.notify_all()
+
+    def _journal_append(self, row):
+        # Caller holds self._lock, which also guards truncation
+        self._journal.write(json.dumps(dict(row, timestamp=row['timestamp'].isoformat())) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _own_journal_path(self):
+        return f"{self.journal_path}.{socket.gethostname()}-{os.getpid()}"
+
+    @staticmethod
+    def _lock_journal(path):
+        """Open and exclusively lock a journal; None if a live process holds it
+
+        The path is checked again once locked, in case the previous holder
+        replayed and removed the file in between.
+        """
+        try:
+            journal = open(path, 'a+', encoding='utf-8')
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            journal.close()
+            return None
+
+        try:
+            unchanged = os.stat(path).st_ino == os.fstat(journal.fileno()).st_ino
+        except FileNotFoundError:
+            unchanged = False
+        if not unchanged:
+            journal.close()
+            return None
+        return journal
+
+    def _replay_journal(self):
+        """Insert journaled rows that did not reach the database before a crash
+
+        Opens and locks this process's journal, replays it, then replays every
+        orphaned journal next to it and removes them.
+        """
+        if self.durability != self.JOURNAL:
+            return
+
+        own_path = self._own_journal_path()
+        self._journal = self._lock_journal(own_path)
+        if self._journal is None:
+            raise RuntimeError(f"Write-behind journal {own_path} is locked by another process")
+        self._replay_rows(self._journal, own_path)
+        self._journal.truncate(0)
+
+        # The journal_path itself is where single-file journals used to live
+        candidates = glob.glob(glob.escape(self.journal_path) + '.*') + [self.journal_path]
+        for path in sorted(set(candidates) - {own_path}):
+            if not os.path.isfile(path):
+                continue
+            journal = self._lock_journal(path)
+            if journal is None:
+                continue
+            try:
+                self._replay_rows(journal, path)
+                os.remove(path)
+            finally:
+                journal.close()
+
+    def _replay_rows(self, journal, path):
+        journal.seek(0)
+        rows = []
+        for line in journal:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # A torn final line from a crash mid-append
+                continue
+            row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+            rows.append(row)
+
+        if not rows:
+            return
+
+        existing = set(db.session.execute(
+            select(GeneratedText.id).where(GeneratedText.id.in_([row['id'] for row in rows]))
+        ).scalars())
+        db.session.rollback()
+        missing = [row for row in rows if row['id'] not in existing]
+        if missing:
+            self._insert(missing)
+        self.logger.info(f"Replayed {len(missing)} journaled text(s) from {path}")
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'durability': self.durability,
+            'queued': self._queue.qsize(),
+            'pending': len(self._pending),
+            'written': self.written,
+            'batches': self.batches,
+            'sync_fallbacks': self.sync_fallbacks,
+            'retries': self.retries,
+            'failed': self.failed
+        }
+
+
+write_behind = WriteBehindWriter()
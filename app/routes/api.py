@@ -1,14 +1,139 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, make_response, current_app, stream_with_context, url_for
+import hashlib
+import itertools
+import json
 import logging
 from ..middleware.auth_middleware import auth_middleware
 from ..repository.text_repository import TextRepository
+from ..repository.job_repository import JobRepository
+from ..repository.routing import replica_router
+from ..repository.search import SearchNotSupportedError
+from ..repository.text_cache import text_cache
+from ..repository.write_behind import write_behind
 from ..service.ai_service import AIService
+from ..service.factory import AIProviderFactory
+from ..service.cache import response_cache
+from ..service.coalescing import single_flight, CoalescedTimeout
+from ..service.providers.http_pool import http_pool
+from ..service.providers.base import ProviderError
+from ..service.circuit_breaker import circuit_breakers, CircuitOpenError
+from ..service.rate_limiter import rate_limiters, RateLimitExceeded
+from ..service.retry import retry_policy
 from ..validation.text_validator import TextValidator
-from ..validation.base import validate_request
+from ..validation.base import validate_request, ValidationError
+from ..utils.compression import ResponseCodec
+from ..utils.export import EXPORT_FORMATS, gzip_chunks
+from ..utils.pagination import encode_cursor
 
 api_bp = Blueprint('api', __name__)
 logger = logging.getLogger(__name__)
 
+
+def _sse_event(data, event=None):
+    """Format a Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+def _stream_generated_text(current_user_id, ai_service, data):
+    """Stream a generation as SSE events and persist it once complete"""
+    text_repo = TextRepository()
+    tokens = ai_service.stream_text(prompt=data['prompt'], options=data.get('options'))
+    
+    # Wait for the first chunk before committing to a 200, so failures before
+    # any output reach the caller's error mapping (503, 429, 502)
+    first = next(tokens, None)
+    pending = [] if first is None else [first]
+    
+    def events():
+        chunks = []
+        try:
+            for token in itertools.chain(pending, tokens):
+                chunks.append(token)
+                yield _sse_event({'token': token})
+        except Exception as e:
+            logger.error(f"Error streaming generate-text: {str(e)}")
+            yield _sse_event({'error': str(e)}, event='error')
+            return
+        finally:
+            # Runs on client disconnect too, which cancels the upstream call
+            tokens.close()
+        
+        try:
+            new_generated_text = text_repo.create_deferred(
+                user_id=current_user_id,
+                prompt=data['prompt'],
+                response=''.join(chunks),
+                provider=ai_service.get_provider_name(),
+                cached=ai_service.last_from_cache
+            )
+        except Exception as e:
+            logger.error(f"Error saving streamed text: {str(e)}")
+            yield _sse_event({'error': str(e)}, event='error')
+            return
+        
+        yield _sse_event(new_generated_text.to_dict(), event='done')
+    
+    response = Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # The upstream call is open already; close it even if the body is never read
+    response.call_on_close(tokens.close)
+    return response
+
+
+def _texts_etag(user_id, version, *parts):
+    """Strong ETag for a view of a user's texts at a given texts version
+    
+    The version changes on every write to the user's texts, so the tag can be
+    computed without reading or serializing any rows.
+    """
+    key = json.dumps([user_id, version, *parts], default=str)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def _conditional(etag, build_response):
+    """Return 304 if the client holds etag, else build_response() tagged with it"""
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = build_response()
+        if response.status_code != 200:
+            return response
+    
+    response.set_etag(etag)
+    # Clients may keep the body but must revalidate before reusing it
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _summary_to_dict(row):
+    """Serialize a summary row from TextRepository.get_summaries_by_user_id"""
+    summary = row._asdict()
+    summary['cached'] = bool(summary['cached'])
+    summary['timestamp'] = summary['timestamp'].isoformat()
+    return summary
+
+
+def _enqueue_generation(current_user_id, provider_name, data):
+    """Queue a generation job and return 202 with its status URL"""
+    if provider_name.lower() not in AIProviderFactory.providers:
+        return jsonify({'error': f'Unknown AI provider: {provider_name}'}), 400
+    
+    job = JobRepository().enqueue(
+        user_id=current_user_id,
+        prompt=data['prompt'],
+        provider=provider_name.lower(),
+        options=data.get('options'),
+        max_attempts=current_app.config.get('JOB_MAX_ATTEMPTS', 3)
+    )
+    
+    status_url = url_for('api.get_job', job_id=job.id)
+    return jsonify({'job_id': job.id, 'status': job.status, 'status_url': status_url}), 202, {'Location': status_url}
+
+
 @api_bp.route('/generate-text', methods=['POST'])
 @auth_middleware()
 @validate_request(TextValidator.validate_generate_text)
@@ -21,46 +146,161 @@ def generate_text(current_user_id):
         # Get AI provider from query parameter or default
         provider_name = request.args.get('provider') or current_app.config.get('DEFAULT_AI_PROVIDER', 'openai')
         
-        # Initialize AI service with provider
+        # Queue the generation for a background worker if requested
+        if request.args.get('async', '').lower() == 'true':
+            return _enqueue_generation(current_user_id, provider_name, data)
+        
+        # Initialize AI service with the pooled provider
         ai_service = AIService(
             provider_name=provider_name,
-            api_key=current_app.config.get(f'{provider_name.upper()}_API_KEY'),
-            model=current_app.config.get(f'{provider_name.upper()}_MODEL')
+            **AIProviderFactory.provider_options(current_app.config, provider_name)
         )
         
+        # Stream tokens as Server-Sent Events if requested
+        if request.args.get('stream', '').lower() == 'true':
+            logger.info(f"Streaming text with provider: {provider_name}")
+            return _stream_generated_text(current_user_id, ai_service, data)
+        
         # Generate text
         logger.info(f"Generating text with provider: {provider_name}")
-        response_text = ai_service.generate_text(prompt=data['prompt'])
+        response_text = ai_service.generate_text(prompt=data['prompt'], options=data.get('options'))
         
         # Store the generated text in the database
-        new_generated_text = text_repo.create(
+        new_generated_text = text_repo.create_deferred(
             user_id=current_user_id,
             prompt=data['prompt'],
             response=response_text,
-            provider=ai_service.get_provider_name()
+            provider=ai_service.get_provider_name(),
+            cached=ai_service.last_from_cache
         )
         
         return jsonify(new_generated_text.to_dict()), 201
     
+    except CoalescedTimeout as e:
+        logger.warning(f"Coalesced generate-text request timed out: {str(e)}")
+        return jsonify({'error': str(e)}), 504
+    
+    except CircuitOpenError as e:
+        logger.warning(f"Failing fast in generate-text: {str(e)}")
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(int(e.retry_after) + 1)}
+    
+    except RateLimitExceeded as e:
+        logger.warning(f"Shedding generate-text: {str(e)}")
+        return jsonify({'error': str(e)}), 429, {'Retry-After': str(int(e.retry_after) + 1)}
+    
+    except ProviderError as e:
+        logger.error(f"Provider error in generate-text: {str(e)}")
+        return jsonify({'error': str(e)}), 502
+    
     except Exception as e:
         logger.error(f"Error in generate-text: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/generate-texts', methods=['POST'])
+@auth_middleware()
+@validate_request(TextValidator.validate_generate_texts)
+def generate_texts(current_user_id):
+    """Generate text for a batch of prompts"""
+    data = request.get_json()
+    items = data['items']
+    text_repo = TextRepository()
+    
+    try:
+        provider_name = request.args.get('provider') or current_app.config.get('DEFAULT_AI_PROVIDER', 'openai')
+        
+        ai_service = AIService(
+            provider_name=provider_name,
+            **AIProviderFactory.provider_options(current_app.config, provider_name)
+        )
+        
+        # Fan the prompts out to the provider with bounded concurrency
+        logger.info(f"Generating {len(items)} texts with provider: {provider_name}")
+        outcomes = ai_service.generate_many(
+            items, concurrency=current_app.config.get('BATCH_CONCURRENCY', 8)
+        )
+        
+        results = [None] * len(items)
+        succeeded = []
+        for index, (item, outcome) in enumerate(zip(items, outcomes)):
+            if isinstance(outcome, Exception):
+                results[index] = {'index': index, 'status': 'error', 'error': str(outcome)}
+                continue
+            
+            response_text, from_cache, served_by = outcome
+            succeeded.append((index, {
+                'prompt': item['prompt'],
+                'response': response_text,
+                'provider': served_by,
+                'cached': from_cache
+            }))
+        
+        # Store all successful generations in one bulk write
+        new_texts = text_repo.create_many(current_user_id, [text for _, text in succeeded])
+        for (index, _), new_text in zip(succeeded, new_texts):
+            results[index] = {'index': index, 'status': 'success', 'data': new_text.to_dict()}
+        
+        return jsonify({
+            'results': results,
+            'succeeded': len(new_texts),
+            'failed': len(items) - len(new_texts)
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Error in generate-texts: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+@auth_middleware()
+def get_job(current_user_id, job_id):
+    """Get the status of a generation job"""
+    job_repo = JobRepository()
+    
+    try:
+        job = job_repo.get_by_id_and_user(job_id, current_user_id)
+        
+        if not job:
+            return jsonify({'error': 'Job not found or not authorized'}), 404
+        
+        return jsonify(job.to_dict()), 200
+        
+    except Exception as e:
+        logger.error(f"Error retrieving job {job_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
 @api_bp.route('/generated-text/<int:id>', methods=['GET'])
 @auth_middleware()
 def get_generated_text(current_user_id, id):
     """Get a generated text by ID"""
     text_repo = TextRepository()
     
+    # Responses stored compressed go out as stored when the client takes gzip,
+    # so the gzip and identity bodies need their own ETags
+    accepts_gzip = request.accept_encodings['gzip'] > 0
+    
     try:
-        # Retrieve the generated text by ID
-        generated_text = text_repo.get_by_id_and_user(id, current_user_id)
+        def build_response():
+            # Served from the text cache when possible
+            stored = text_repo.get_stored(id, current_user_id)
+            
+            if not stored:
+                return make_response(jsonify({'error': 'Generated text not found or not authorized'}), 404)
+            
+            body = ResponseCodec.gzip_json(stored) if accepts_gzip else None
+            if body is not None:
+                response = Response(body, mimetype='application/json')
+                response.headers['Content-Encoding'] = 'gzip'
+                return response
+            
+            return jsonify(ResponseCodec.expand(stored))
         
-        if not generated_text:
-            return jsonify({'error': 'Generated text not found or not authorized'}), 404
-        
-        return jsonify(generated_text.to_dict()), 200
+        version = text_repo.get_texts_version(current_user_id)
+        etag = _texts_etag(current_user_id, version, 'text', id, 'gzip' if accepts_gzip else 'identity')
+        response = _conditional(etag, build_response)
+        response.vary.add('Accept-Encoding')
+        return response
         
     except Exception as e:
         logger.error(f"Error retrieving generated text ID {id}: {str(e)}")
@@ -76,17 +316,16 @@ def update_generated_text(current_user_id, id):
     text_repo = TextRepository()
     
     try:
-        updated = text_repo.update(
+        updated_text = text_repo.update_returning(
             id=id,
             user_id=current_user_id,
             prompt=data.get('prompt'),
             response=data.get('response')
         )
         
-        if not updated:
+        if not updated_text:
             return jsonify({'error': 'Generated text not found or not authorized'}), 404
         
-        updated_text = text_repo.get_by_id(id)
         return jsonify(updated_text.to_dict()), 200
         
     except Exception as e:
@@ -116,20 +355,132 @@ def delete_generated_text(current_user_id, id):
 @api_bp.route('/generated-texts', methods=['GET'])
 @auth_middleware()
 def get_all_generated_texts(current_user_id):
-    """Get all generated texts for a user"""
+    """Get all generated texts for a user
+    
+    With ?limit= or ?cursor= the result is paginated and returned as
+    {'items': [...], 'next_cursor': ...}; pass next_cursor back to get the next page.
+    With ?fields=summary each item carries a prompt preview and lengths instead
+    of the full prompt and response.
+    """
     text_repo = TextRepository()
     
     try:
-        # Retrieve all generated texts for the current user
-        generated_texts = text_repo.get_all_by_user_id(current_user_id)
+        limit, after = TextValidator.validate_list_params(request.args)
+        paginated = 'limit' in request.args or 'cursor' in request.args
         
-        return jsonify([text.to_dict() for text in generated_texts]), 200
+        def build_response():
+            if request.args.get('fields') == 'summary':
+                rows, next_key = text_repo.get_summaries_by_user_id(
+                    current_user_id, limit if paginated else None, after
+                )
+                items = [_summary_to_dict(row) for row in rows]
+            elif paginated:
+                generated_texts, next_key = text_repo.get_page_by_user_id(current_user_id, limit, after)
+                items = [text.to_dict() for text in generated_texts]
+            else:
+                generated_texts = text_repo.get_all_by_user_id(current_user_id)
+                items = [text.to_dict() for text in generated_texts]
+            
+            # Unpaginated listing keeps the plain list shape for existing clients
+            if not paginated:
+                return jsonify(items)
+            
+            return jsonify({
+                'items': items,
+                'next_cursor': encode_cursor(*next_key) if next_key else None
+            })
+        
+        version = text_repo.get_texts_version(current_user_id)
+        etag = _texts_etag(current_user_id, version, 'list', sorted(request.args.items(multi=True)))
+        return _conditional(etag, build_response)
+        
+    except ValidationError as e:
+        logger.warning(f"Invalid listing parameters: {e.errors}")
+        return jsonify({'error': 'Validation error', 'details': e.errors}), 422
         
     except Exception as e:
         logger.error(f"Error retrieving all texts for user {current_user_id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/generated-texts/export', methods=['GET'])
+@auth_middleware()
+def export_generated_texts(current_user_id):
+    """Stream all of the user's texts as NDJSON or CSV, optionally gzipped
+    
+    Rows are read in batches and encoded as they are sent, so the export
+    never holds the whole history in memory.
+    """
+    text_repo = TextRepository()
+    
+    try:
+        export_format, compress = TextValidator.validate_export_params(request.args)
+    except ValidationError as e:
+        logger.warning(f"Invalid export parameters: {e.errors}")
+        return jsonify({'error': 'Validation error', 'details': e.errors}), 422
+    
+    encode, mimetype = EXPORT_FORMATS[export_format]
+    filename = f'generated-texts.{export_format}'
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    
+    def chunks():
+        try:
+            body = encode(text_repo.iter_export(current_user_id, batch_size=batch_size))
+            if compress:
+                body = gzip_chunks(body)
+            yield from body
+        except Exception as e:
+            # Headers are already sent; re-raising makes the server abort the
+            # connection without the final chunk, so clients see a failed
+            # download rather than a complete-looking truncated file
+            logger.error(f"Error exporting texts for user {current_user_id}: {str(e)}")
+            raise
+    
+    if compress:
+        mimetype = 'application/gzip'
+        filename += '.gz'
+    
+    logger.info(f"Exporting texts for user {current_user_id} as {export_format}")
+    return Response(
+        stream_with_context(chunks()),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+@api_bp.route('/generated-texts/search', methods=['GET'])
+@auth_middleware()
+def search_generated_texts(current_user_id):
+    """Full-text search over the user's prompts and responses, best match first"""
+    text_repo = TextRepository()
+    
+    try:
+        query, limit, offset = TextValidator.validate_search_params(request.args)
+        
+        # Fetch one extra hit to learn whether another page exists
+        results = text_repo.search(current_user_id, query, limit=limit + 1, offset=offset)
+        has_more = len(results) > limit
+        
+        return jsonify({
+            'items': [dict(text.to_dict(), rank=rank) for text, rank in results[:limit]],
+            'next_offset': offset + limit if has_more else None
+        }), 200
+        
+    except ValidationError as e:
+        logger.warning(f"Invalid search parameters: {e.errors}")
+        return jsonify({'error': 'Validation error', 'details': e.errors}), 422
+        
+    except SearchNotSupportedError as e:
+        return jsonify({'error': str(e)}), 501
+        
+    except Exception as e:
+        logger.error(f"Error searching texts for user {current_user_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
 @api_bp.route('/providers', methods=['GET'])
 @auth_middleware()
 def get_available_providers(current_user_id):
@@ -140,6 +491,10 @@ def get_available_providers(current_user_id):
             'openai': {
                 'name': 'OpenAI',
                 'models': ['gpt-3.5-turbo', 'gpt-4-turbo']
+            },
+            'mock': {
+                'name': 'Mock',
+                'models': ['mock-1']
             }
             # Additional providers would be listed here
         }
@@ -148,4 +503,38 @@ def get_available_providers(current_user_id):
         
     except Exception as e:
         logger.error(f"Error retrieving providers: {str(e)}")
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/providers/status', methods=['GET'])
+@auth_middleware()
+def get_provider_status(current_user_id):
+    """Get circuit breaker state for each AI provider"""
+    try:
+        return jsonify(circuit_breakers.snapshot()), 200
+        
+    except Exception as e:
+        logger.error(f"Error retrieving provider status: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/metrics', methods=['GET'])
+@auth_middleware()
+def get_metrics(current_user_id):
+    """Get runtime counters for the generation pipeline"""
+    try:
+        return jsonify({
+            'response_cache': response_cache.stats(),
+            'request_coalescing': single_flight.stats(),
+            'http_pool': http_pool.stats(),
+            'circuit_breakers': circuit_breakers.snapshot(),
+            'rate_limiters': rate_limiters.stats(),
+            'retries': retry_policy.stats(),
+            'write_behind': write_behind.stats(),
+            'replica': replica_router.stats(),
+            'text_cache': text_cache.stats()
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error retrieving metrics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
@@ -16,15 +16,12 @@ def register():
     user_repo = UserRepository()
     
     try:
-        # Check if user already exists
-        existing_user = user_repo.get_by_username(data['username'])
-        if existing_user:
+        # The unique index on the username rejects duplicates at insert time
+        new_user = user_repo.create(data['username'], data['password'])
+        if new_user is None:
             logger.warning(f"Registration attempt with existing username: {data['username']}")
             return jsonify({'error': 'Username already exists'}), 409
         
-        # Create new user
-        new_user = user_repo.create(data['username'], data['password'])
-        
         logger.info(f"User registered successfully: {data['username']}")
         return jsonify({'message': 'User registered successfully'}), 201
         
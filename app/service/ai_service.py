@@ -1,31 +1,267 @@
 import os
+import time
+import asyncio
 import logging
 from .factory import AIProviderFactory
+from .cache import response_cache
+from .coalescing import single_flight
+from .circuit_breaker import CircuitOpenError, circuit_breakers
+from .rate_limiter import RateLimitExceeded
+from .providers.http_pool import http_pool
 
 
 class AIService:
     """Service for generating text using AI providers"""
 
-    def __init__(self, provider_name=None, **provider_options):
+    def __init__(
+        self,
+        provider_name=None,
+        cache=None,
+        coalescer=None,
+        breakers=None,
+        **provider_options,
+    ):
 
         self.logger = logging.getLogger(__name__)
 
         # Default to environment variable or 'openai'
         self.provider_name = provider_name or os.environ.get("AI_PROVIDER", "openai")
 
-        # Get the provider from the factory
+        # Get the pooled provider from the factory
         self.provider = AIProviderFactory.get_provider(
             self.provider_name, **provider_options
         )
 
-        self.logger.info(
+        # Process-wide response cache unless one is supplied
+        self.cache = cache if cache is not None else response_cache
+
+        # Process-wide coalescing of identical in-flight requests
+        self.coalescer = coalescer if coalescer is not None else single_flight
+
+        # Process-wide circuit breakers and failover settings
+        self.breakers = breakers if breakers is not None else circuit_breakers
+
+        # How the last generate_text call was answered
+        self.last_from_cache = False
+        self.last_coalesced = False
+        self.served_by = self.provider
+
+        self.logger.debug(
             f"AI Service initialized with provider: {self.provider.get_provider_name()}"
         )
 
+    def _request_key(self, prompt, options):
+        model = options.get("model") or getattr(self.provider, "model", None)
+        return self.cache.make_key(self.provider_name, model, prompt, options)
+
+    def _admit(self):
+        """Pick the provider to call, failing over if the requested circuit is open
+
+        Returns (provider, breaker); breaker is None when breakers are disabled.
+        """
+        if not self.breakers.enabled:
+            return self.provider, None
+
+        breaker = self.breakers.get(self.provider_name)
+        if breaker.allow_request():
+            return self.provider, breaker
+
+        fallback = self.breakers.fallback_for(self.provider_name)
+        if fallback is not None:
+            fallback_name, fallback_options = fallback
+            fallback_breaker = self.breakers.get(fallback_name)
+            if fallback_breaker.allow_request():
+                self.logger.warning(
+                    f"Circuit for {self.provider_name} is open, failing over to {fallback_name}"
+                )
+                provider = AIProviderFactory.get_provider(
+                    fallback_name, **fallback_options
+                )
+                return provider, fallback_breaker
+
+        raise CircuitOpenError(self.provider_name, breaker.retry_after())
+
+    def _call_provider(self, call):
+        """Run call(provider) through the circuit breaker; returns (provider, result)"""
+        provider, breaker = self._admit()
+        started = time.monotonic()
+
+        try:
+            result = call(provider)
+        except RateLimitExceeded:
+            # Shed locally; says nothing about the provider's health
+            if breaker:
+                breaker.release()
+            raise
+        except Exception:
+            if breaker:
+                breaker.record_failure(time.monotonic() - started)
+            raise
+
+        if breaker:
+            breaker.record_success(time.monotonic() - started)
+        return provider, result
+
+    async def _acall_provider(self, call):
+        """Async variant of _call_provider for coroutine-returning calls"""
+        provider, breaker = self._admit()
+        started = time.monotonic()
+
+        try:
+            result = await call(provider)
+        except RateLimitExceeded:
+            # Shed locally; says nothing about the provider's health
+            if breaker:
+                breaker.release()
+            raise
+        except Exception:
+            if breaker:
+                breaker.record_failure(time.monotonic() - started)
+            raise
+
+        if breaker:
+            breaker.record_success(time.monotonic() - started)
+        return provider, result
+
     def generate_text(self, prompt, options=None):
 
-        return self.provider.generate_with_logging(prompt, options)
+        options = dict(options or {})
+        cache_opt_in = options.pop("cache", None)
+        self.last_from_cache = False
+        self.last_coalesced = False
+        self.served_by = self.provider
 
-    def get_provider_name(self):
+        def generate():
+            return self._call_provider(
+                lambda provider: provider.generate_with_logging(prompt, options)
+            )
+
+        cacheable = self.cache.is_cacheable(options, cache_opt_in)
+        if not cacheable and not self.coalescer.enabled:
+            self.served_by, response = generate()
+            return response
+
+        key = self._request_key(prompt, options)
+
+        if cacheable:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.logger.info(f"Serving {self.provider_name} response from cache")
+                self.last_from_cache = True
+                return cached
+
+        # Identical requests already in flight share a single upstream call
+        (self.served_by, response), self.last_coalesced = self.coalescer.do(
+            key, generate
+        )
 
-        return self.provider.get_provider_name()
+        # Responses from a fallback provider are not cached under this key
+        if cacheable and not self.last_coalesced and self.served_by is self.provider:
+            self.cache.set(key, response)
+        return response
+
+    async def agenerate_text(self, prompt, options=None):
+        """Generate text without blocking the event loop on network I/O"""
+        response, _, _ = await self._agenerate(prompt, options)
+        return response
+
+    async def _agenerate(self, prompt, options=None):
+        # Returns (response, from_cache, provider_name) so concurrent calls
+        # don't share state
+        options = dict(options or {})
+        cache_opt_in = options.pop("cache", None)
+
+        cacheable = self.cache.is_cacheable(options, cache_opt_in)
+        key = self._request_key(prompt, options) if cacheable else None
+
+        if cacheable:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached, True, self.provider.get_provider_name()
+
+        provider, response = await self._acall_provider(
+            lambda provider: provider.agenerate_with_logging(prompt, options)
+        )
+
+        if cacheable and provider is self.provider:
+            self.cache.set(key, response)
+        return response, False, provider.get_provider_name()
+
+    def generate_many(self, items, concurrency=8):
+        """Generate a batch of prompts with at most `concurrency` in flight
+
+        Each item is a dict with a prompt and optional options. Returns one
+        outcome per item, in order: a (response, from_cache, provider_name)
+        tuple on success or the exception raised for that item.
+        """
+        return http_pool.run(self._agenerate_many(items, concurrency))
+
+    async def _agenerate_many(self, items, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def generate_one(item):
+            async with semaphore:
+                return await self._agenerate(item["prompt"], item.get("options"))
+
+        return await asyncio.gather(
+            *(generate_one(item) for item in items), return_exceptions=True
+        )
+
+    def stream_text(self, prompt, options=None):
+        """Yield the response in chunks as the provider produces them"""
+
+        options = dict(options or {})
+        cache_opt_in = options.pop("cache", None)
+        self.last_from_cache = False
+        self.last_coalesced = False
+        self.served_by = self.provider
+
+        cacheable = self.cache.is_cacheable(options, cache_opt_in)
+        key = self._request_key(prompt, options) if cacheable else None
+
+        if cacheable:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.logger.info(f"Serving {self.provider_name} response from cache")
+                self.last_from_cache = True
+                yield cached
+                return
+
+        self.served_by, breaker = self._admit()
+        started = time.monotonic()
+        chunks = []
+        failed = False
+        shed = False
+        abandoned = False
+        stream = self.served_by.stream_with_logging(prompt, options)
+        try:
+            for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+        except RateLimitExceeded:
+            shed = True
+            raise
+        except GeneratorExit:
+            abandoned = True
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            stream.close()
+            # A client disconnect says nothing about the provider either way
+            if breaker and (shed or abandoned):
+                breaker.release()
+            elif breaker:
+                elapsed = time.monotonic() - started
+                if failed:
+                    breaker.record_failure(elapsed)
+                else:
+                    breaker.record_success(elapsed)
+
+        if cacheable and self.served_by is self.provider:
+            self.cache.set(key, "".join(chunks))
+
+    def get_provider_name(self):
+        """Name of the provider that answered the last call"""
+        return self.served_by.get_provider_name()
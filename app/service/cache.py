@@ -0,0 +1,80 @@
+import hashlib
+import json
+import logging
+from ..utils.cache import LRUCache
+
+
+class ResponseCache:
+    """In-process cache of provider responses for repeated prompts
+
+    Responses are keyed on the normalized prompt, provider, model, system prompt
+    and generation options. By default only deterministic requests
+    (temperature 0) are served from cache; callers can opt in per request with
+    ``options["cache"] = True`` or opt out with ``False``.
+    """
+
+    def __init__(
+        self, enabled=False, max_bytes=64 * 1024 * 1024, ttl=3600, allow_sampled=False
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = enabled
+        self.allow_sampled = allow_sampled
+        self.store = LRUCache(max_bytes=max_bytes, ttl=ttl)
+
+    def init_app(self, app):
+        """Configure the cache from app config"""
+        self.enabled = app.config.get("RESPONSE_CACHE_ENABLED", False)
+        self.allow_sampled = app.config.get("RESPONSE_CACHE_ALLOW_SAMPLED", False)
+        self.store = LRUCache(
+            max_bytes=app.config.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+            ttl=app.config.get("RESPONSE_CACHE_TTL", 3600),
+        )
+        app.extensions["response_cache"] = self
+
+        if self.enabled:
+            self.logger.info(
+                f"Response cache enabled: max_bytes={self.store.max_bytes}, ttl={self.store.ttl}s"
+            )
+
+    @staticmethod
+    def normalize_prompt(prompt):
+        """Collapse whitespace so trivially different prompts share an entry"""
+        return " ".join(prompt.split())
+
+    @classmethod
+    def make_key(cls, provider_name, model, prompt, options=None):
+        """Build a stable cache key for a generation request"""
+        payload = {
+            "provider": provider_name.lower(),
+            "model": model,
+            "prompt": cls.normalize_prompt(prompt),
+            "options": options or {},
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, options, opt_in=None):
+        """Decide whether a request may be served from or stored in the cache"""
+        if not self.enabled or opt_in is False:
+            return False
+
+        if opt_in or self.allow_sampled:
+            return True
+
+        # Sampled generations are expected to vary, so only cache them on request
+        return options.get("temperature") == 0
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, response):
+        return self.store.set(key, response)
+
+    def clear(self):
+        self.store.clear()
+
+    def stats(self):
+        return dict(self.store.stats(), enabled=self.enabled)
+
+
+response_cache = ResponseCache()
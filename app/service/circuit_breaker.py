@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+from collections import deque
+
+
+class CircuitOpenError(Exception):
+    """Raised when a provider's circuit is open and calls fail fast"""
+
+    def __init__(self, name, retry_after):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(
+            f"Provider {name} is unavailable (circuit open); retry in {retry_after:.0f}s"
+        )
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker driven by error rate and latency
+
+    Outcomes of the last `window_size` calls are kept. Once at least
+    `minimum_calls` have been recorded, the circuit opens if the failure rate or
+    the slow-call rate crosses its threshold. After `open_duration` seconds a
+    limited number of trial calls are let through (half-open); a failed or slow
+    trial re-opens the circuit, successful trials close it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name,
+        window_size=20,
+        minimum_calls=10,
+        failure_rate_threshold=0.5,
+        slow_call_duration=10.0,
+        slow_call_rate_threshold=0.8,
+        open_duration=30.0,
+        half_open_max_calls=1,
+        clock=time.monotonic,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.minimum_calls = minimum_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self.state = self.CLOSED
+        self._window = deque(maxlen=window_size)
+        self._opened_at = None
+        self._half_open_calls = 0
+        self._half_open_successes = 0
+        self.rejected = 0
+
+    def _transition(self, state):
+        self.logger.warning(f"Circuit for {self.name} is now {state} (was {self.state})")
+        self.state = state
+        self._half_open_calls = 0
+        self._half_open_successes = 0
+        if state == self.OPEN:
+            self._opened_at = self._clock()
+        else:
+            self._opened_at = None
+            self._window.clear()
+
+    def retry_after(self):
+        """Seconds until an open circuit lets a trial call through"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.open_duration - self._clock())
+
+    def allow_request(self):
+        """Return True if a call may proceed, reserving a half-open trial slot"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.retry_after() > 0:
+                    self.rejected += 1
+                    return False
+                self._transition(self.HALF_OPEN)
+
+            if self.state == self.HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    self.rejected += 1
+                    return False
+                self._half_open_calls += 1
+
+            return True
+
+    def release(self):
+        """Give back an admitted call that never reached the provider"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self, duration):
+        self._record(False, duration)
+
+    def record_failure(self, duration):
+        self._record(True, duration)
+
+    def _record(self, failed, duration):
+        slow = duration >= self.slow_call_duration
+
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if failed or slow:
+                    self._transition(self.OPEN)
+                else:
+                    self._half_open_successes += 1
+                    if self._half_open_successes >= self.half_open_max_calls:
+                        self._transition(self.CLOSED)
+                return
+
+            if self.state == self.OPEN:
+                # A call admitted before the circuit opened finished late
+                return
+
+            self._window.append((failed, slow))
+            if len(self._window) < self.minimum_calls:
+                return
+
+            failure_rate, slow_rate = self._rates()
+            if (
+                failure_rate >= self.failure_rate_threshold
+                or slow_rate >= self.slow_call_rate_threshold
+            ):
+                self._transition(self.OPEN)
+
+    def _rates(self):
+        if not self._window:
+            return 0.0, 0.0
+        calls = len(self._window)
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow = sum(1 for _, is_slow in self._window if is_slow)
+        return failures / calls, slow / calls
+
+    def snapshot(self):
+        """Return the breaker state for monitoring"""
+        with self._lock:
+            failure_rate, slow_rate = self._rates()
+            return {
+                "state": self.state,
+                "calls_in_window": len(self._window),
+                "failure_rate": round(failure_rate, 4),
+                "slow_call_rate": round(slow_rate, 4),
+                "retry_after": round(self.retry_after(), 2),
+                "rejected": self.rejected,
+            }
+
+
+class CircuitBreakerRegistry:
+    """Per-provider circuit breakers plus the configured fallback provider"""
+
+    def __init__(self):
+        self.enabled = True
+        self.settings = {}
+        self.fallback_provider = None
+        self.fallback_options = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure breakers and failover from app config"""
+        from .factory import AIProviderFactory
+
+        self.enabled = app.config.get("CIRCUIT_BREAKER_ENABLED", True)
+        self.settings = {
+            "window_size": app.config.get("CIRCUIT_BREAKER_WINDOW_SIZE", 20),
+            "minimum_calls": app.config.get("CIRCUIT_BREAKER_MINIMUM_CALLS", 10),
+            "failure_rate_threshold": app.config.get("CIRCUIT_BREAKER_FAILURE_RATE", 0.5),
+            "slow_call_duration": app.config.get("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", 10.0),
+            "slow_call_rate_threshold": app.config.get("CIRCUIT_BREAKER_SLOW_CALL_RATE", 0.8),
+            "open_duration": app.config.get("CIRCUIT_BREAKER_OPEN_SECONDS", 30.0),
+        }
+
+        self.fallback_provider = app.config.get("AI_FALLBACK_PROVIDER")
+        if self.fallback_provider:
+            self.fallback_provider = self.fallback_provider.lower()
+            self.fallback_options = AIProviderFactory.provider_options(
+                app.config, self.fallback_provider
+            )
+
+        with self._lock:
+            self._breakers.clear()
+        app.extensions["circuit_breakers"] = self
+
+    def get(self, provider_name):
+        """Return the breaker for a provider, creating it on first use"""
+        name = provider_name.lower()
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, **self.settings)
+                self._breakers[name] = breaker
+            return breaker
+
+    def fallback_for(self, provider_name):
+        """Return the (name, options) of the backup for a provider, if any"""
+        if not self.fallback_provider or self.fallback_provider == provider_name.lower():
+            return None
+        return self.fallback_provider, self.fallback_options
+
+    def snapshot(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            "enabled": self.enabled,
+            "fallback_provider": self.fallback_provider,
+            "providers": {name: breaker.snapshot() for name, breaker in breakers.items()},
+        }
+
+
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,112 @@
+import logging
+import threading
+
+
+class CoalescedTimeout(Exception):
+    """Raised when a waiter gives up on an in-flight generation"""
+
+
+class _Call:
+    """A single in-flight call shared by its leader and waiters"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls into one upstream call
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight wait for the leader's result instead of making
+    their own call. Errors raised by the leader are re-raised to every waiter.
+    """
+
+    def __init__(self, enabled=False, wait_timeout=120):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = enabled
+        self.wait_timeout = wait_timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def init_app(self, app):
+        """Configure coalescing from app config"""
+        self.enabled = app.config.get("REQUEST_COALESCING_ENABLED", False)
+        self.wait_timeout = app.config.get("REQUEST_COALESCING_TIMEOUT", 120)
+        app.extensions["single_flight"] = self
+
+    def do(self, key, fn, timeout=None):
+        """Run fn for key, or wait for the in-flight call with the same key
+
+        Returns a (result, shared) tuple where shared is True for waiters.
+        """
+        if not self.enabled:
+            return fn(), False
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            return self._wait(call, timeout), True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Remove the key before waking waiters so later arrivals start fresh
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+        return call.result, False
+
+    def _wait(self, call, timeout):
+        timeout = self.wait_timeout if timeout is None else timeout
+
+        if not call.done.wait(timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise CoalescedTimeout(
+                f"Timed out after {timeout}s waiting for an identical in-flight request"
+            )
+
+        if call.error is not None:
+            raise call.error
+
+        return call.result
+
+    def in_flight(self):
+        """Return the number of distinct keys currently in flight"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        """Return a snapshot of the coalescing counters"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "timeouts": self.timeouts,
+                "in_flight": len(self._calls),
+            }
+
+
+single_flight = SingleFlight()
@@ -1,27 +1,49 @@
 import logging
+import threading
 from .providers.openai_provider import OpenAIProvider
+from .providers.mock_provider import MockProvider
 
 # Add imports for other providers here as they are implemented
 # from .providers.claude_provider import ClaudeProvider
 
 
 class AIProviderFactory:
-    """Factory for creating AI providers"""
+    """Factory for creating AI providers
+
+    Providers are pooled: instances are built once per (provider, model, api key)
+    and reused across requests until they are explicitly invalidated.
+    """
+
+    # Map of available providers
+    providers = {
+        "openai": OpenAIProvider,
+        "mock": MockProvider,
+        # Add more providers here as they are implemented
+        # 'claude': DeepSeekProvider,
+    }
+
+    _instances = {}
+    _lock = threading.Lock()
 
     @staticmethod
-    def get_provider(provider_name, **kwargs):
+    def _pool_key(provider_name, kwargs):
+        """Build the registry key for a provider configuration"""
+        extra = tuple(
+            sorted(
+                (key, repr(value))
+                for key, value in kwargs.items()
+                if key not in ("model", "api_key")
+            )
+        )
+        return (provider_name, kwargs.get("model"), kwargs.get("api_key"), extra)
 
+    @classmethod
+    def create_provider(cls, provider_name, **kwargs):
+        """Build a new, unpooled provider instance"""
         logger = logging.getLogger(__name__)
 
-        # Map of available providers
-        providers = {
-            "openai": OpenAIProvider,
-            # Add more providers here as they are implemented
-            # 'claude': DeepSeekProvider,
-        }
-
         provider_name = provider_name.lower()
-        provider_class = providers.get(provider_name)
+        provider_class = cls.providers.get(provider_name)
 
         if not provider_class:
             logger.error(f"Unknown AI provider requested: {provider_name}")
@@ -29,3 +51,84 @@ class AIProviderFactory:
 
         logger.info(f"Creating {provider_name} provider")
         return provider_class(**kwargs)
+
+    @classmethod
+    def get_provider(cls, provider_name, **kwargs):
+        """Return the pooled provider instance for this configuration"""
+        provider_name = provider_name.lower()
+        key = cls._pool_key(provider_name, kwargs)
+
+        provider = cls._instances.get(key)
+        if provider is not None:
+            return provider
+
+        with cls._lock:
+            # Another thread may have built it while we waited for the lock
+            provider = cls._instances.get(key)
+            if provider is None:
+                provider = cls.create_provider(provider_name, **kwargs)
+                cls._instances[key] = provider
+
+        return provider
+
+    @classmethod
+    def invalidate(cls, provider_name=None, **kwargs):
+        """Drop pooled providers so the next lookup builds fresh instances
+
+        With no arguments the whole pool is cleared. With a provider name only,
+        every pooled instance of that provider is dropped. With options, only the
+        instance matching that exact configuration is dropped.
+        """
+        logger = logging.getLogger(__name__)
+
+        with cls._lock:
+            if provider_name is None:
+                removed = len(cls._instances)
+                cls._instances.clear()
+            elif kwargs:
+                key = cls._pool_key(provider_name.lower(), kwargs)
+                removed = 1 if cls._instances.pop(key, None) is not None else 0
+            else:
+                name = provider_name.lower()
+                stale = [key for key in cls._instances if key[0] == name]
+                for key in stale:
+                    del cls._instances[key]
+                removed = len(stale)
+
+        logger.info(f"Invalidated {removed} pooled AI provider(s)")
+        return removed
+
+    @classmethod
+    def provider_options(cls, config, provider_name):
+        """Read the constructor options for a provider from app config
+
+        Besides NAME_API_KEY and NAME_MODEL, a provider class can map further
+        constructor options to config keys in its `config_options`.
+        """
+        prefix = provider_name.upper()
+        options = {
+            "api_key": config.get(f"{prefix}_API_KEY"),
+            "model": config.get(f"{prefix}_MODEL"),
+        }
+
+        provider_class = cls.providers.get(provider_name.lower())
+        for option, key in getattr(provider_class, "config_options", {}).items():
+            if config.get(key) is not None:
+                options[option] = config[key]
+        return options
+
+    @classmethod
+    def init_app(cls, app):
+        """Build the configured providers when the worker boots"""
+        logger = logging.getLogger(__name__)
+
+        names = app.config.get("AI_PROVIDER_PRELOAD")
+        if names is None:
+            names = [app.config.get("DEFAULT_AI_PROVIDER", "openai")]
+
+        for name in names:
+            try:
+                cls.get_provider(name, **cls.provider_options(app.config, name))
+            except Exception as e:
+                # A bad provider config should not stop the app from booting
+                logger.warning(f"Could not preload AI provider {name}: {str(e)}")
@@ -0,0 +1,118 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from .ai_service import AIService
+from .factory import AIProviderFactory
+from ..repository.job_repository import JobRepository
+from ..repository.text_repository import TextRepository
+
+
+class JobWorkerPool:
+    """Pool of worker threads that run queued generation jobs
+
+    Jobs live in the database, so any process pointed at the same database can
+    pick them up and they survive restarts. A claimed job is hidden from other
+    workers until its visibility timeout lapses; if the worker dies before
+    finishing, the job becomes claimable again (at-least-once delivery).
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.size = 2
+        self.poll_interval = 1.0
+        self.visibility_timeout = 300
+        self._threads = []
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        """Configure the pool from app config and start it if enabled"""
+        self.size = app.config.get("JOB_WORKER_COUNT", 2)
+        self.poll_interval = app.config.get("JOB_POLL_INTERVAL", 1.0)
+        self.visibility_timeout = app.config.get("JOB_VISIBILITY_TIMEOUT", 300)
+        app.extensions["job_workers"] = self
+
+        if app.config.get("JOB_WORKERS_ENABLED", False):
+            self.start(app)
+
+    @staticmethod
+    def make_worker_id(index=0):
+        return f"{socket.gethostname()}-{os.getpid()}-{index}-{uuid.uuid4().hex[:6]}"
+
+    def start(self, app, size=None):
+        """Start the worker threads"""
+        if self._threads:
+            return
+
+        self._stop.clear()
+        for index in range(size or self.size):
+            thread = threading.Thread(
+                target=self._run,
+                args=(app, self.make_worker_id(index)),
+                name=f"job-worker-{index}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        self.logger.info(f"Started {len(self._threads)} job worker thread(s)")
+
+    def stop(self, timeout=10):
+        """Signal the workers to stop and wait for in-flight jobs to finish"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self, app, worker_id):
+        while not self._stop.is_set():
+            try:
+                with app.app_context():
+                    processed = self.run_once(app, worker_id)
+            except Exception as e:
+                self.logger.error(f"Job worker {worker_id} error: {str(e)}")
+                processed = False
+
+            if not processed:
+                self._stop.wait(self.poll_interval)
+
+    def run_once(self, app, worker_id=None):
+        """Claim and run a single job; returns False if the queue was empty
+
+        Must be called inside an app context.
+        """
+        worker_id = worker_id or self.make_worker_id()
+        job_repo = JobRepository()
+
+        job_repo.fail_expired()
+        job = job_repo.claim_next(worker_id, self.visibility_timeout)
+        if job is None:
+            return False
+
+        try:
+            ai_service = AIService(
+                provider_name=job.provider,
+                **AIProviderFactory.provider_options(app.config, job.provider),
+            )
+            response_text = ai_service.generate_text(
+                prompt=job.prompt, options=job.get_options()
+            )
+
+            new_generated_text = TextRepository().create(
+                user_id=job.user_id,
+                prompt=job.prompt,
+                response=response_text,
+                provider=ai_service.get_provider_name(),
+                cached=ai_service.last_from_cache,
+            )
+            job_repo.complete(job.id, worker_id, new_generated_text.id)
+
+        except Exception as e:
+            self.logger.error(f"Job {job.id} failed: {str(e)}")
+            job_repo.fail(job.id, worker_id, str(e))
+
+        return True
+
+
+job_workers = JobWorkerPool()
@@ -1,7 +1,12 @@
 from abc import ABC, abstractmethod
+import asyncio
 import logging
 
 
+class ProviderError(Exception):
+    """Raised when a provider fails to generate text"""
+
+
 class AIProvider(ABC):
     """Base class for AI text generation providers"""
 
@@ -36,6 +41,82 @@ class AIProvider(ABC):
             )
             return response
 
+        except ProviderError:
+            raise
+
         except Exception as e:
             self.logger.error(f"{provider_name} API error: {str(e)}")
-            raise Exception(f"Failed to generate text with {provider_name}: {str(e)}")
+            raise ProviderError(
+                f"Failed to generate text with {provider_name}: {str(e)}"
+            )
+
+    async def agenerate_text(self, prompt, options=None):
+        # Providers without a native async client run the blocking call in a thread
+        return await asyncio.to_thread(self.generate_text, prompt, options)
+
+    async def agenerate_with_logging(self, prompt, options=None):
+
+        options = options or {}
+        provider_name = self.get_provider_name()
+
+        truncated_prompt = prompt[:50] + "..." if len(prompt) > 50 else prompt
+        self.logger.info(
+            f"Generating text with {provider_name} (async). Prompt: {truncated_prompt}"
+        )
+
+        try:
+            response = await self.agenerate_text(prompt, options)
+            response_length = len(response)
+
+            self.logger.info(
+                f"{provider_name} text generation successful. Response length: {response_length}"
+            )
+            return response
+
+        except ProviderError:
+            raise
+
+        except Exception as e:
+            self.logger.error(f"{provider_name} API error: {str(e)}")
+            raise ProviderError(
+                f"Failed to generate text with {provider_name}: {str(e)}"
+            )
+
+    def stream_text(self, prompt, options=None):
+        # Providers without native streaming yield the whole response at once
+        yield self.generate_text(prompt, options)
+
+    def stream_with_logging(self, prompt, options=None):
+
+        options = options or {}
+        provider_name = self.get_provider_name()
+
+        truncated_prompt = prompt[:50] + "..." if len(prompt) > 50 else prompt
+        self.logger.info(
+            f"Streaming text with {provider_name}. Prompt: {truncated_prompt}"
+        )
+
+        stream = self.stream_text(prompt, options)
+        response_length = 0
+
+        try:
+            for chunk in stream:
+                response_length += len(chunk)
+                yield chunk
+
+        except ProviderError:
+            raise
+
+        except Exception as e:
+            self.logger.error(f"{provider_name} API error: {str(e)}")
+            raise ProviderError(
+                f"Failed to generate text with {provider_name}: {str(e)}"
+            )
+
+        finally:
+            # Closing our stream closes the provider's, cancelling the upstream call
+            stream.close()
+
+        self.logger.info(
+            f"{provider_name} text streaming successful. Response length: {response_length}"
+        )
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import threading
+import weakref
+import httpx
+
+
+class AsyncHTTPPool:
+    """Shared keep-alive HTTP connection pool for async providers
+
+    One httpx.AsyncClient is kept per event loop, all built with the same
+    connection limits. Synchronous callers (Flask views, worker threads) run
+    coroutines on a background event loop owned by the pool, so its connections
+    stay warm across requests and many generations can be in flight at once.
+    """
+
+    def __init__(
+        self,
+        max_connections=100,
+        max_keepalive_connections=20,
+        keepalive_expiry=30.0,
+        timeout=60.0,
+        transport=None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        # Custom transport, mainly so tests can avoid the network
+        self.transport = transport
+
+        self._clients = weakref.WeakKeyDictionary()
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure pool limits from app config"""
+        self.max_connections = app.config.get("HTTP_POOL_MAX_CONNECTIONS", 100)
+        self.max_keepalive_connections = app.config.get("HTTP_POOL_MAX_KEEPALIVE", 20)
+        self.keepalive_expiry = app.config.get("HTTP_POOL_KEEPALIVE_EXPIRY", 30.0)
+        self.timeout = app.config.get("HTTP_POOL_TIMEOUT", 60.0)
+        app.extensions["http_pool"] = self
+
+    def _build_client(self):
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        return httpx.AsyncClient(
+            limits=limits, timeout=self.timeout, transport=self.transport
+        )
+
+    def get_client(self):
+        """Return the shared client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = self._build_client()
+            self._clients[loop] = client
+        return client
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="async-http-pool", daemon=True
+                )
+                self._thread.start()
+                self.logger.info(
+                    f"Started async HTTP pool loop (max_connections={self.max_connections})"
+                )
+            return self._loop
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the pool's background loop and wait for it"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        return future.result(timeout)
+
+    def close(self):
+        """Close the background loop's client and stop the loop"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+            thread, self._thread = self._thread, None
+
+        if loop is None:
+            return
+
+        client = self._clients.pop(loop, None)
+        if client is not None:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(5)
+
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+
+    def stats(self):
+        """Return the configured limits and number of live clients"""
+        return {
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "keepalive_expiry": self.keepalive_expiry,
+            "clients": len(self._clients),
+        }
+
+
+http_pool = AsyncHTTPPool()
@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import math
+import random
+import time
+from .base import AIProvider, ProviderError
+from ..rate_limiter import RateLimitExceeded, rate_limiters
+from ..retry import retry_policy
+
+WORDS = (
+    "the quick model answers every prompt with plausible text about systems "
+    "latency throughput cache queue request response token stream batch worker "
+    "database index query provider retry limit circuit window budget deadline "
+    "benchmark load test result metric sample tail median percentile error rate "
+    "service client server network pool connection replica primary write read"
+).split()
+
+
+class MockUpstreamError(Exception):
+    """Simulated upstream API error, shaped like an HTTP error response"""
+
+    def __init__(self, http_status, message, retry_after=None):
+        self.http_status = http_status
+        self.retry_after = retry_after
+        super().__init__(f"{http_status} {message}")
+
+
+class MockProvider(AIProvider):
+    """Offline provider with deterministic text and simulated upstream behavior
+
+    The same model, prompt and options always produce the same text. Latency,
+    time-to-first-token, streaming speed, 5xx errors and 429s are simulated so
+    the whole stack can be load tested without network access or quota.
+
+    Latency distributions:
+      fixed      every call takes latency_ms
+      normal     gaussian around latency_ms with latency_stddev_ms
+      long_tail  log-normal with median latency_ms; tail_sigma widens the tail
+    """
+
+    # Constructor options read from app config by AIProviderFactory.provider_options
+    config_options = {
+        "latency": "MOCK_LATENCY_DISTRIBUTION",
+        "latency_ms": "MOCK_LATENCY_MS",
+        "latency_stddev_ms": "MOCK_LATENCY_STDDEV_MS",
+        "tail_sigma": "MOCK_LATENCY_TAIL_SIGMA",
+        "ttft_ms": "MOCK_TTFT_MS",
+        "tokens_per_second": "MOCK_TOKENS_PER_SECOND",
+        "response_tokens": "MOCK_RESPONSE_TOKENS",
+        "error_rate": "MOCK_ERROR_RATE",
+        "rate_limit_rate": "MOCK_RATE_LIMIT_RATE",
+        "seed": "MOCK_SEED",
+    }
+
+    LATENCY_DISTRIBUTIONS = ("fixed", "normal", "long_tail")
+
+    def __init__(
+        self,
+        api_key=None,
+        model=None,
+        latency="fixed",
+        latency_ms=0.0,
+        latency_stddev_ms=0.0,
+        tail_sigma=1.0,
+        ttft_ms=0.0,
+        tokens_per_second=None,
+        response_tokens=64,
+        error_rate=0.0,
+        rate_limit_rate=0.0,
+        seed=None,
+    ):
+        super().__init__()
+        if latency not in self.LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown mock latency distribution: {latency}")
+
+        self.api_key = api_key
+        self.model = model or "mock-1"
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_stddev_ms = latency_stddev_ms
+        self.tail_sigma = tail_sigma
+        self.ttft_ms = ttft_ms
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._random = random.Random(seed)
+
+        self.logger.info(
+            f"Initialized mock provider with {latency} latency of {latency_ms}ms"
+        )
+
+    def _words(self, prompt, options):
+        # Seed from the request alone so the text never depends on timing or order
+        model = options.get("model", self.model)
+        max_tokens = options.get("max_tokens", self.response_tokens)
+        digest = hashlib.sha256(
+            f"{model}\n{options.get('system_prompt', '')}\n{prompt}".encode("utf-8")
+        ).digest()
+        rng = random.Random(digest)
+        count = max(1, min(max_tokens, self.response_tokens))
+        return [rng.choice(WORDS) for _ in range(count)]
+
+    def _sample_latency(self):
+        # Seconds of simulated end-to-end latency for one call
+        if self.latency == "normal":
+            latency_ms = self._random.gauss(self.latency_ms, self.latency_stddev_ms)
+        elif self.latency == "long_tail":
+            median = max(self.latency_ms, 1e-3)
+            latency_ms = self._random.lognormvariate(math.log(median), self.tail_sigma)
+        else:
+            latency_ms = self.latency_ms
+        return max(0.0, latency_ms) / 1000.0
+
+    def _maybe_fail(self):
+        roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            raise MockUpstreamError(429, "Rate limit reached for mock", retry_after=1.0)
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise MockUpstreamError(500, "Mock upstream error")
+
+    @staticmethod
+    def _is_retryable(error):
+        return isinstance(error, MockUpstreamError)
+
+    @staticmethod
+    def _retry_after(error):
+        return error.retry_after
+
+    def _call(self, prompt, options, wait):
+        """Simulate one upstream call through the limiter and retry policy"""
+        words = self._words(prompt, options)
+        limiter = rate_limiters.get(options.get("model", self.model), self.api_key)
+        tokens = len(prompt) // 4 + len(words)
+        deadline = retry_policy.start()
+
+        def attempt():
+            limiter.acquire(tokens, deadline)
+            wait(self._sample_latency())
+            self._maybe_fail()
+            return words
+
+        return retry_policy.call(
+            attempt, self._is_retryable, deadline, retry_after=self._retry_after
+        )
+
+    def generate_text(self, prompt, options=None):
+
+        options = options or {}
+
+        try:
+            return " ".join(self._call(prompt, options, time.sleep))
+
+        except RateLimitExceeded:
+            raise
+
+        except MockUpstreamError as e:
+            self.logger.error(f"Mock API error: {str(e)}")
+            raise ProviderError(f"Failed to generate text with Mock: {str(e)}")
+
+    async def agenerate_text(self, prompt, options=None):
+
+        options = options or {}
+        words = self._words(prompt, options)
+        limiter = rate_limiters.get(options.get("model", self.model), self.api_key)
+        tokens = len(prompt) // 4 + len(words)
+        deadline = retry_policy.start()
+
+        async def attempt():
+            await limiter.aacquire(tokens, deadline)
+            await asyncio.sleep(self._sample_latency())
+            self._maybe_fail()
+            return words
+
+        try:
+            words = await retry_policy.acall(
+                attempt, self._is_retryable, deadline, retry_after=self._retry_after
+            )
+            return " ".join(words)
+
+        except RateLimitExceeded:
+            raise
+
+        except MockUpstreamError as e:
+            self.logger.error(f"Mock API error: {str(e)}")
+            raise ProviderError(f"Failed to generate text with Mock: {str(e)}")
+
+    def stream_text(self, prompt, options=None):
+
+        options = options or {}
+
+        try:
+            # Time to first token stands in for the request latency when streaming
+            words = self._call(
+                prompt, options, lambda _: time.sleep(self.ttft_ms / 1000.0)
+            )
+        except MockUpstreamError as e:
+            self.logger.error(f"Mock API error: {str(e)}")
+            raise ProviderError(f"Failed to generate text with Mock: {str(e)}")
+
+        interval = 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+        for index, word in enumerate(words):
+            if index and interval:
+                time.sleep(interval)
+            yield word if index == 0 else f" {word}"
+
+    def get_provider_name(self):
+        """Return the provider name"""
+        return "Mock"
@@ -1,18 +1,33 @@
 import os
+import httpx
 import openai
-from .base import AIProvider
+from openai import error as openai_error
+from .base import AIProvider, ProviderError
+from .http_pool import http_pool
+from ..rate_limiter import RateLimitExceeded, rate_limiters
+from ..retry import retry_policy
+
+# Upstream errors worth another attempt: throttling, timeouts and 5xx
+RETRYABLE_ERRORS = (
+    openai_error.RateLimitError,
+    openai_error.Timeout,
+    openai_error.TryAgain,
+    openai_error.APIConnectionError,
+    openai_error.ServiceUnavailableError,
+)
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
 
 
 class OpenAIProvider(AIProvider):
     """OpenAI implementation of AIProvider"""
 
-    def __init__(self, api_key=None, model=None):
+    def __init__(self, api_key=None, model=None, api_base=None):
         super().__init__()
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
         self.model = model or os.environ.get("OPENAI_MODEL", "gpt-3.5-turbo")
-
-        # Set the API key for the openai library
-        openai.api_key = self.api_key
+        self.api_base = (
+            api_base or os.environ.get("OPENAI_API_BASE", "https://api.openai.com/v1")
+        ).rstrip("/")
 
         # Clear any proxy environment variables that might interfere
         os.environ.pop("HTTP_PROXY", None)
@@ -22,32 +37,148 @@ class OpenAIProvider(AIProvider):
 
         self.logger.info(f"Initialized OpenAI provider with model: {self.model}")
 
+    def _request_params(self, prompt, options):
+        return dict(
+            # Passed per call rather than set on the global openai module, so
+            # pooled providers with different keys don't clobber each other
+            api_key=self.api_key,
+            model=options.get("model", self.model),
+            messages=[
+                {
+                    "role": "system",
+                    "content": options.get(
+                        "system_prompt", "You are a helpful assistant."
+                    ),
+                },
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=options.get("max_tokens", 1000),
+            temperature=options.get("temperature", 0.7),
+        )
+
+    @staticmethod
+    def _estimate_tokens(params):
+        # Rough prompt size (~4 characters per token) plus the completion budget,
+        # which is how the upstream tokens-per-minute quota is charged
+        prompt_chars = sum(len(message["content"]) for message in params["messages"])
+        return prompt_chars // 4 + params["max_tokens"]
+
+    @staticmethod
+    def _is_retryable(error):
+        if isinstance(error, RETRYABLE_ERRORS):
+            return True
+        if isinstance(error, openai_error.APIError):
+            return error.http_status in RETRYABLE_STATUS
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS
+        return isinstance(error, httpx.TransportError)
+
+    @staticmethod
+    def _retry_after(error):
+        if isinstance(error, httpx.HTTPStatusError):
+            headers = error.response.headers
+        else:
+            headers = getattr(error, "headers", None) or {}
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    def _create(self, params):
+        """Call the chat completions API through the rate limiter, with retries"""
+        limiter = rate_limiters.get(params["model"], self.api_key)
+        tokens = self._estimate_tokens(params)
+        deadline = retry_policy.start()
+
+        def attempt():
+            limiter.acquire(tokens, deadline)
+            return openai.ChatCompletion.create(**params)
+
+        return retry_policy.call(
+            attempt, self._is_retryable, deadline, retry_after=self._retry_after
+        )
+
     def generate_text(self, prompt, options=None):
 
         options = options or {}
 
         try:
-            response = openai.ChatCompletion.create(
-                model=options.get("model", self.model),
-                messages=[
-                    {
-                        "role": "system",
-                        "content": options.get(
-                            "system_prompt", "You are a helpful assistant."
-                        ),
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=options.get("max_tokens", 1000),
-                temperature=options.get("temperature", 0.7),
-            )
+            response = self._create(self._request_params(prompt, options))
 
             # Extract the text from the response
             return response["choices"][0]["message"]["content"]
 
+        except RateLimitExceeded:
+            raise
+
         except Exception as e:
             self.logger.error(f"OpenAI API error: {str(e)}")
-            raise Exception(f"Failed to generate text with OpenAI: {str(e)}")
+            raise ProviderError(f"Failed to generate text with OpenAI: {str(e)}")
+
+    async def agenerate_text(self, prompt, options=None):
+
+        options = options or {}
+        payload = self._request_params(prompt, options)
+        api_key = payload.pop("api_key")
+
+        limiter = rate_limiters.get(payload["model"], api_key)
+        tokens = self._estimate_tokens(payload)
+        deadline = retry_policy.start()
+
+        async def attempt():
+            await limiter.aacquire(tokens, deadline)
+
+            # Shared keep-alive pool for the running event loop
+            client = http_pool.get_client()
+            response = await client.post(
+                f"{self.api_base}/chat/completions",
+                json=payload,
+                headers={"Authorization": f"Bearer {api_key}"},
+            )
+            response.raise_for_status()
+            return response
+
+        try:
+            response = await retry_policy.acall(
+                attempt, self._is_retryable, deadline, retry_after=self._retry_after
+            )
+
+            # Extract the text from the response
+            return response.json()["choices"][0]["message"]["content"]
+
+        except RateLimitExceeded:
+            raise
+
+        except Exception as e:
+            self.logger.error(f"OpenAI API error: {str(e)}")
+            raise ProviderError(f"Failed to generate text with OpenAI: {str(e)}")
+
+    def stream_text(self, prompt, options=None):
+
+        options = options or {}
+
+        try:
+            # Only opening the stream is retried; a broken stream is not replayed
+            response = self._create(
+                dict(self._request_params(prompt, options), stream=True)
+            )
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            self.logger.error(f"OpenAI API error: {str(e)}")
+            raise ProviderError(f"Failed to generate text with OpenAI: {str(e)}")
+
+        try:
+            for chunk in response:
+                content = chunk["choices"][0]["delta"].get("content")
+                if content:
+                    yield content
+
+        finally:
+            # Stop reading the upstream stream if our consumer went away
+            close = getattr(response, "close", None)
+            if close:
+                close()
 
     def get_provider_name(self):
         """Return the provider name"""
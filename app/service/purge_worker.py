@@ -0,0 +1,97 @@
+import logging
+import threading
+from .job_worker import JobWorkerPool
+from ..repository.purge_repository import PurgeRepository
+
+
+class UserPurgeWorker:
+    """Background thread that removes the rows of deleted users in batches
+
+    Each batch is its own short transaction, with an optional pause between
+    batches so other writers get the database in between. Progress is kept in
+    the user_purges table, so a purge survives restarts and can be followed
+    with `flask purge-status`.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.batch_size = 1000
+        self.batch_pause = 0.05
+        self.poll_interval = 5.0
+        self.visibility_timeout = 300
+        self._thread = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        """Configure the worker from app config and start it if enabled"""
+        self.batch_size = app.config.get("USER_PURGE_BATCH_SIZE", 1000)
+        self.batch_pause = app.config.get("USER_PURGE_BATCH_PAUSE", 0.05)
+        self.poll_interval = app.config.get("USER_PURGE_POLL_INTERVAL", 5.0)
+        self.visibility_timeout = app.config.get("JOB_VISIBILITY_TIMEOUT", 300)
+        app.extensions["purge_worker"] = self
+
+        if app.config.get("USER_PURGE_WORKER_ENABLED", False):
+            self.start(app)
+
+    def start(self, app):
+        """Start the purge thread"""
+        if self._thread:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(app,), name="user-purge", daemon=True
+        )
+        self._thread.start()
+        self.logger.info("Started user purge worker")
+
+    def stop(self, timeout=10):
+        """Stop after the current batch"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self, app):
+        worker_id = JobWorkerPool.make_worker_id()
+        while not self._stop.is_set():
+            try:
+                with app.app_context():
+                    processed = self.run_once(worker_id)
+            except Exception as e:
+                self.logger.error(f"User purge worker error: {str(e)}")
+                processed = False
+
+            if not processed:
+                self._stop.wait(self.poll_interval)
+
+    def run_once(self, worker_id=None, on_progress=None):
+        """Claim one purge and run it to completion; returns False if none was pending
+
+        on_progress, if given, is called with the purge after every batch. Must
+        be called inside an app context.
+        """
+        worker_id = worker_id or JobWorkerPool.make_worker_id()
+        purge_repo = PurgeRepository()
+
+        purge = purge_repo.claim_next(worker_id, self.visibility_timeout)
+        if purge is None:
+            return False
+
+        while purge_repo.delete_batch(purge, self.batch_size, self.visibility_timeout):
+            if on_progress:
+                on_progress(purge)
+            self.logger.debug(
+                f"Purge {purge.id}: {purge.texts_deleted}/{purge.texts_total} texts deleted"
+            )
+            if self._stop.wait(self.batch_pause):
+                # Claim lapses and the purge resumes in whichever worker takes it next
+                return True
+
+        purge_repo.complete(purge)
+        if on_progress:
+            on_progress(purge)
+        return True
+
+
+purge_worker = UserPurgeWorker()
@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from .providers.base import ProviderError
+
+
+class RateLimitExceeded(ProviderError):
+    """Raised when a call is shed because the local rate limit queue is too long"""
+
+    def __init__(self, message, retry_after):
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of blocking
+
+    Reserving more tokens than are available puts the bucket into debt; the
+    caller is told how long to wait for the debt to be paid off. This queues
+    callers fairly in arrival order without holding a lock while they sleep.
+    """
+
+    def __init__(self, capacity, refill_per_second, clock=time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._clock = clock
+        self._tokens = capacity
+        self._updated_at = clock()
+
+    def _refill(self):
+        now = self._clock()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+
+    def reserve(self, amount):
+        """Take amount tokens and return the seconds to wait before using them"""
+        amount = min(amount, self.capacity)
+        self._refill()
+        self._tokens -= amount
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.refill_per_second
+
+    def refund(self, amount):
+        """Give back a reservation that will not be used"""
+        self._tokens = min(self.capacity, self._tokens + min(amount, self.capacity))
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one model/key"""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_wait=30.0, clock=time.monotonic):
+        self.max_wait = max_wait
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._requests = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60.0, clock)
+            if requests_per_minute
+            else None
+        )
+        self._tokens = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60.0, clock)
+            if tokens_per_minute
+            else None
+        )
+
+        self.requests = 0
+        self.shed = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def reserve(self, tokens, deadline=None):
+        """Reserve capacity for one request; returns the seconds to wait
+
+        Raises RateLimitExceeded instead of queueing past max_wait or the
+        caller's deadline.
+        """
+        with self._lock:
+            wait = 0.0
+            if self._requests:
+                wait = max(wait, self._requests.reserve(1))
+            if self._tokens:
+                wait = max(wait, self._tokens.reserve(tokens))
+
+            allowed = self.max_wait
+            if deadline is not None:
+                allowed = min(allowed, deadline - self._clock())
+
+            if wait > allowed:
+                if self._requests:
+                    self._requests.refund(1)
+                if self._tokens:
+                    self._tokens.refund(tokens)
+                self.shed += 1
+                raise RateLimitExceeded(
+                    f"Local rate limit reached; {wait:.1f}s queue exceeds {max(allowed, 0):.1f}s budget",
+                    retry_after=wait,
+                )
+
+            self.requests += 1
+            if wait > 0:
+                self.waits += 1
+                self.wait_seconds += wait
+            return wait
+
+    def acquire(self, tokens, deadline=None):
+        """Reserve capacity and sleep until it is available"""
+        wait = self.reserve(tokens, deadline)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens, deadline=None):
+        """Reserve capacity and wait without blocking the event loop"""
+        wait = self.reserve(tokens, deadline)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "shed": self.shed,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+class RateLimiterRegistry:
+    """Client-side rate limiters keyed by (model, api key)"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.requests_per_minute = None
+        self.tokens_per_minute = None
+        self.max_wait = 30.0
+        self.overrides = {}
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure default and per-model limits from app config"""
+        self.requests_per_minute = app.config.get("RATE_LIMIT_REQUESTS_PER_MINUTE")
+        self.tokens_per_minute = app.config.get("RATE_LIMIT_TOKENS_PER_MINUTE")
+        self.max_wait = app.config.get("RATE_LIMIT_MAX_WAIT", 30.0)
+        self.overrides = app.config.get("RATE_LIMIT_OVERRIDES") or {}
+        with self._lock:
+            self._limiters.clear()
+        app.extensions["rate_limiters"] = self
+
+    @staticmethod
+    def _key_id(api_key):
+        # Never keep or report raw API keys in stats
+        return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:8]
+
+    def get(self, model, api_key):
+        """Return the limiter for a model and API key"""
+        key = (model, self._key_id(api_key))
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limits = self.overrides.get(model, {})
+                limiter = RateLimiter(
+                    requests_per_minute=limits.get("requests_per_minute", self.requests_per_minute),
+                    tokens_per_minute=limits.get("tokens_per_minute", self.tokens_per_minute),
+                    max_wait=self.max_wait,
+                )
+                self._limiters[key] = limiter
+            return limiter
+
+    def stats(self):
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {
+            f"{model}:{key_id}": limiter.stats()
+            for (model, key_id), limiter in limiters.items()
+        }
+
+
+rate_limiters = RateLimiterRegistry()
@@ -0,0 +1,117 @@
+import logging
+import threading
+from datetime import datetime
+from .job_worker import JobWorkerPool
+from ..repository.retention_repository import RetentionRepository
+from ..utils.archive import write_archive
+
+
+class RetentionWorker:
+    """Moves expired texts into compressed archive files, then deletes them
+
+    Each batch is written and fsynced to the archive before its rows are
+    deleted by primary key, so a crash between the two leaves the rows in both
+    places and re-importing the archive stays harmless. Runs from the
+    `flask apply-retention` command or, if enabled, on an interval in a
+    background thread. Enable the scheduler in one process only.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.max_age_days = None
+        self.max_texts = None
+        self.archive_dir = "archive"
+        self.batch_size = 500
+        self.batch_pause = 0.05
+        self.interval = 86400.0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        """Configure the worker from app config and start the scheduler if enabled"""
+        self.max_age_days = app.config.get("RETENTION_MAX_AGE_DAYS")
+        self.max_texts = app.config.get("RETENTION_MAX_TEXTS")
+        self.archive_dir = app.config.get("RETENTION_ARCHIVE_DIR", "archive")
+        self.batch_size = app.config.get("RETENTION_BATCH_SIZE", 500)
+        self.batch_pause = app.config.get("RETENTION_BATCH_PAUSE", 0.05)
+        self.interval = app.config.get("RETENTION_INTERVAL", 86400.0)
+        app.extensions["retention_worker"] = self
+
+        if app.config.get("RETENTION_SCHEDULER_ENABLED", False):
+            self.start(app)
+
+    def start(self, app):
+        """Start the scheduler thread"""
+        if self._thread:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(app,), name="retention", daemon=True
+        )
+        self._thread.start()
+        self.logger.info(f"Started retention scheduler, every {self.interval}s")
+
+    def stop(self, timeout=10):
+        """Stop after the current batch"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self, app):
+        while not self._stop.wait(self.interval):
+            try:
+                with app.app_context():
+                    self.run_once()
+            except Exception as e:
+                self.logger.error(f"Retention run failed: {str(e)}")
+
+    def run_once(self, user_id=None, on_progress=None):
+        """Archive and delete every expired text, or only those of user_id
+
+        on_progress, if given, is called with (user_id, archived, paths) after
+        every batch. Must be called inside an app context. Returns the totals
+        of the run.
+        """
+        repo = RetentionRepository()
+        run_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{JobWorkerPool.make_worker_id()}"
+        now = datetime.utcnow()
+        totals = {"users": 0, "archived": 0, "deleted": 0, "files": set()}
+
+        for policy_user_id, max_age_days, max_texts in repo.iter_policies(
+            self.max_age_days, self.max_texts, user_id=user_id
+        ):
+            if self._stop.is_set():
+                break
+
+            condition = repo.expired_condition(policy_user_id, max_age_days, max_texts, now=now)
+            if condition is None:
+                continue
+
+            archived = 0
+            while True:
+                rows = repo.get_expired_batch(policy_user_id, condition, self.batch_size)
+                if not rows:
+                    break
+
+                paths = write_archive(self.archive_dir, rows, run_id)
+                totals["deleted"] += repo.delete_batch(policy_user_id, [row.id for row in rows])
+                totals["files"].update(paths)
+                archived += len(rows)
+                if on_progress:
+                    on_progress(policy_user_id, archived, paths)
+
+                if len(rows) < self.batch_size or self._stop.wait(self.batch_pause):
+                    break
+
+            if archived:
+                totals["users"] += 1
+                totals["archived"] += archived
+                self.logger.info(f"Archived {archived} expired text(s) of user {policy_user_id}")
+
+        totals["files"] = sorted(totals["files"])
+        return totals
+
+
+retention_worker = RetentionWorker()
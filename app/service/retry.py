@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, bounded by a total deadline
+
+    Attempt n waits a random time between 0 and min(max_delay, base_delay * 2**n),
+    or longer if the server sent a Retry-After hint. No retry is started if its
+    delay would run past the deadline.
+    """
+
+    def __init__(
+        self,
+        max_attempts=4,
+        base_delay=0.5,
+        max_delay=8.0,
+        deadline=60.0,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+        self.retries = 0
+        self.exhausted = 0
+        self.backoff_seconds = 0.0
+
+    def init_app(self, app):
+        """Configure the policy from app config"""
+        self.max_attempts = app.config.get("PROVIDER_RETRY_MAX_ATTEMPTS", 4)
+        self.base_delay = app.config.get("PROVIDER_RETRY_BASE_DELAY", 0.5)
+        self.max_delay = app.config.get("PROVIDER_RETRY_MAX_DELAY", 8.0)
+        self.deadline = app.config.get("PROVIDER_RETRY_DEADLINE", 60.0)
+        app.extensions["retry_policy"] = self
+
+    def start(self):
+        """Return the absolute deadline for a call starting now"""
+        return self._clock() + self.deadline
+
+    def _next_delay(self, attempt, error, deadline, retry_after):
+        # Returns the delay before the next attempt, or None to give up
+        if attempt + 1 >= self.max_attempts:
+            return None
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        retry_after = retry_after(error) if retry_after else None
+        if retry_after:
+            delay = max(delay, retry_after)
+
+        if self._clock() + delay >= deadline:
+            return None
+
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+        return delay
+
+    def _give_up(self, attempt, error):
+        if attempt > 0:
+            with self._lock:
+                self.exhausted += 1
+        self.logger.warning(f"Giving up after {attempt + 1} attempt(s): {str(error)}")
+
+    def call(self, fn, is_retryable, deadline=None, retry_after=None):
+        """Call fn(), retrying errors for which is_retryable(error) is true
+
+        retry_after(error) may return the server's requested delay in seconds.
+        """
+        deadline = deadline if deadline is not None else self.start()
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                delay = self._next_delay(attempt, e, deadline, retry_after)
+                if delay is None:
+                    self._give_up(attempt, e)
+                    raise
+                self.logger.info(f"Retrying in {delay:.2f}s after: {str(e)}")
+                self._sleep(delay)
+                attempt += 1
+
+    async def acall(self, fn, is_retryable, deadline=None, retry_after=None):
+        """Async variant of call; fn returns a coroutine"""
+        deadline = deadline if deadline is not None else self.start()
+        attempt = 0
+        while True:
+            try:
+                return await fn()
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                delay = self._next_delay(attempt, e, deadline, retry_after)
+                if delay is None:
+                    self._give_up(attempt, e)
+                    raise
+                self.logger.info(f"Retrying in {delay:.2f}s after: {str(e)}")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "retries": self.retries,
+                "exhausted": self.exhausted,
+                "backoff_seconds": round(self.backoff_seconds, 3),
+            }
+
+
+retry_policy = RetryPolicy()
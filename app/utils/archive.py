@@ -0,0 +1,89 @@
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from .compression import ResponseCodec
+
+logger = logging.getLogger(__name__)
+
+# Columns of an archived text; enough to restore the row exactly
+ARCHIVE_COLUMNS = ("id", "user_id", "prompt", "response", "provider", "cached", "timestamp")
+
+ARCHIVE_SUFFIX = ".ndjson.gz"
+
+
+def _archive_row(row):
+    mapping = row._mapping if hasattr(row, "_mapping") else row
+    return {
+        "id": mapping["id"],
+        "user_id": mapping["user_id"],
+        "prompt": mapping["prompt"],
+        "response": ResponseCodec.decode_mapping(mapping),
+        "provider": mapping["provider"],
+        "cached": bool(mapping["cached"]),
+        "timestamp": mapping["timestamp"].isoformat(),
+    }
+
+
+def partition_dir(root, day):
+    """Directory holding the archived texts created on a given date"""
+    return os.path.join(root, "generated_texts", f"date={day.isoformat()}")
+
+
+def write_archive(root, rows, run_id):
+    """Append rows to gzip NDJSON files partitioned by the date of each text
+
+    Each call appends one gzip member per partition to {run_id}.ndjson.gz, so
+    a run produces one file per date however many batches it writes. Files are
+    fsynced before returning; callers delete the rows only afterwards. Returns
+    the paths written.
+    """
+    partitions = {}
+    for row in rows:
+        exported = _archive_row(row)
+        day = datetime.fromisoformat(exported["timestamp"]).date()
+        partitions.setdefault(day, []).append(exported)
+
+    paths = []
+    for day, exported_rows in sorted(partitions.items()):
+        directory = partition_dir(root, day)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{run_id}{ARCHIVE_SUFFIX}")
+
+        data = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in exported_rows)
+        with open(path, "ab") as archive:
+            archive.write(gzip.compress(data.encode("utf-8")))
+            archive.flush()
+            os.fsync(archive.fileno())
+        paths.append(path)
+
+    return paths
+
+
+def archive_files(path):
+    """List the archive files under path, or path itself if it is a file"""
+    if os.path.isfile(path):
+        return [path]
+
+    files = []
+    for directory, _, names in os.walk(path):
+        files.extend(os.path.join(directory, name) for name in names if name.endswith(ARCHIVE_SUFFIX))
+    return sorted(files)
+
+
+def iter_archive(path):
+    """Yield archived rows from a file or directory, timestamps parsed back
+
+    A member torn by a crash mid-append ends its file early; the rows in it
+    were never deleted from the database, so nothing is lost.
+    """
+    for file_path in archive_files(path):
+        try:
+            with gzip.open(file_path, "rt", encoding="utf-8") as archive:
+                for line in archive:
+                    row = json.loads(line)
+                    row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+                    yield row
+        except (EOFError, gzip.BadGzipFile, ValueError) as e:
+            logger.warning(f"Stopped reading truncated archive {file_path}: {str(e)}")
@@ -0,0 +1,153 @@
+import base64
+import gzip
+import json
+import struct
+import zlib
+
+# Deflate data that ends in a sync flush followed by an empty final block
+EMPTY_FINAL_BLOCK = b"\x03\x00"
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+
+def compress_member(data, level=6):
+    """Compress bytes into one gzip member that can be spliced into a larger stream
+
+    The deflate data is sync-flushed before it is finished, so it ends on a
+    byte boundary followed by an empty final block. splice_gzip() drops that
+    block to continue the stream. The result is an ordinary gzip file.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return (
+        compressor.compress(data)
+        + compressor.flush(zlib.Z_SYNC_FLUSH)
+        + compressor.flush(zlib.Z_FINISH)
+    )
+
+
+def _crc32_combine(crc_a, crc_b, length_b):
+    # CRC-32 is affine, so crc(A + B) = crc(A + zeros) ^ crc(B) ^ crc(zeros)
+    zeros = bytes(length_b)
+    return zlib.crc32(zeros, crc_a) ^ crc_b ^ zlib.crc32(zeros)
+
+
+def splice_gzip(prefix, member, suffix, level=6):
+    """One gzip member of prefix + the content of member + suffix
+
+    member must come from compress_member(); its deflate data is copied as is,
+    so it is never inflated. Returns None if member has another layout.
+    """
+    if (
+        len(member) < 20
+        or member[:4] != GZIP_HEADER[:4]
+        or member[-10:-8] != EMPTY_FINAL_BLOCK
+    ):
+        return None
+    member_crc, member_size = struct.unpack("<II", member[-8:])
+
+    head = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    tail = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    crc = _crc32_combine(zlib.crc32(prefix), member_crc, member_size)
+    crc = _crc32_combine(crc, zlib.crc32(suffix), len(suffix))
+    size = len(prefix) + member_size + len(suffix)
+
+    return b"".join((
+        GZIP_HEADER,
+        head.compress(prefix) + head.flush(zlib.Z_SYNC_FLUSH),
+        member[10:-10],
+        tail.compress(suffix) + tail.flush(zlib.Z_FINISH),
+        struct.pack("<II", crc & 0xFFFFFFFF, size & 0xFFFFFFFF),
+    ))
+
+
+class ResponseCodec:
+    """Storage codec for the response column of generated_texts
+
+    Responses of at least min_length characters are stored compressed:
+    response holds '' and response_compressed a gzip member (see
+    compress_member) of the response encoded as a JSON string. Storing the
+    JSON form lets the detail endpoint splice it into a gzip-encoded body
+    without inflating it. Reading compressed rows works whether or not
+    compression is enabled for writes.
+    """
+
+    GZIP = "gzip"
+
+    def __init__(self):
+        self.enabled = False
+        self.min_length = 4096
+        self.level = 6
+
+    def init_app(self, app):
+        """Configure compression of new responses from app config"""
+        self.enabled = app.config.get("RESPONSE_COMPRESSION_ENABLED", False)
+        self.min_length = app.config.get("RESPONSE_COMPRESSION_MIN_LENGTH", 4096)
+        self.level = app.config.get("RESPONSE_COMPRESSION_LEVEL", 6)
+        app.extensions["response_codec"] = self
+
+    def encode(self, response):
+        """Column values storing response, keyed by column name"""
+        if not self.enabled or response is None or len(response) < self.min_length:
+            return {
+                "response": response,
+                "response_compressed": None,
+                "response_codec": None,
+                "response_length": None,
+            }
+
+        literal = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        return {
+            "response": "",
+            "response_compressed": compress_member(literal, self.level),
+            "response_codec": self.GZIP,
+            "response_length": len(response),
+        }
+
+    def encode_row(self, row):
+        """A row dict with its plain 'response' replaced by the stored columns"""
+        return dict(row, **self.encode(row["response"]))
+
+    @classmethod
+    def decode(cls, response, codec, payload):
+        """The plain response from its stored columns"""
+        if codec is None:
+            return response
+        if codec == cls.GZIP:
+            return json.loads(gzip.decompress(payload))
+        raise ValueError(f"Unknown response codec: {codec}")
+
+    @classmethod
+    def decode_mapping(cls, mapping):
+        """The plain response of a row selected with the stored columns"""
+        return cls.decode(
+            mapping["response"], mapping.get("response_codec"), mapping.get("response_compressed")
+        )
+
+    @classmethod
+    def expand(cls, data):
+        """Turn a dict from GeneratedText.to_stored_dict() into its to_dict() form"""
+        if data is None or data.get("response_codec") is None:
+            return data
+
+        expanded = {key: value for key, value in data.items() if key not in ("response_codec", "response_compressed")}
+        expanded["response"] = cls.decode(None, data["response_codec"], base64.b64decode(data["response_compressed"]))
+        return expanded
+
+    @classmethod
+    def gzip_json(cls, data, level=6):
+        """gzip-encoded JSON body for a to_stored_dict() dict, or None
+
+        Only gzip-coded responses can be served this way; their stored member
+        is copied into the body without being inflated.
+        """
+        if data is None or data.get("response_codec") != cls.GZIP:
+            return None
+
+        fields = {key: value for key, value in data.items() if key not in ("response_codec", "response_compressed")}
+        prefix = json.dumps(fields, ensure_ascii=False)[:-1] + ', "response": '
+        return splice_gzip(
+            prefix.encode("utf-8"), base64.b64decode(data["response_compressed"]), b"}", level
+        )
+
+
+response_codec = ResponseCodec()
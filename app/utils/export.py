@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+import zlib
+from .compression import ResponseCodec
+
+# Column order of exported rows, shared by every format
+EXPORT_COLUMNS = ("id", "prompt", "response", "provider", "cached", "timestamp")
+
+# Encoded bytes buffered before a chunk is handed to the WSGI server
+CHUNK_SIZE = 64 * 1024
+
+
+def _export_row(row):
+    mapping = row._mapping
+    return {
+        "id": mapping["id"],
+        "prompt": mapping["prompt"],
+        "response": ResponseCodec.decode_mapping(mapping),
+        "provider": mapping["provider"],
+        "cached": bool(mapping["cached"]),
+        "timestamp": mapping["timestamp"].isoformat(),
+    }
+
+
+def _chunked(pieces):
+    """Join small strings into chunks of roughly CHUNK_SIZE encoded bytes"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        data = piece.encode("utf-8")
+        buffer.append(data)
+        size += len(data)
+        if size >= CHUNK_SIZE:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def ndjson_chunks(rows):
+    """Encode rows as newline-delimited JSON, one object per line"""
+    return _chunked(
+        json.dumps(_export_row(row), ensure_ascii=False) + "\n" for row in rows
+    )
+
+
+def csv_chunks(rows):
+    """Encode rows as CSV with a header line"""
+
+    def lines():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            exported = _export_row(row)
+            writer.writerow([exported[column] for column in EXPORT_COLUMNS])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    return _chunked(lines())
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a byte stream incrementally into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+EXPORT_FORMATS = {
+    "ndjson": (ndjson_chunks, "application/x-ndjson"),
+    "csv": (csv_chunks, "text/csv; charset=utf-8"),
+}
@@ -0,0 +1,21 @@
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(timestamp, id):
+    """Encode a (timestamp, id) sort key as an opaque URL-safe token"""
+    raw = json.dumps([timestamp.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Decode a token from encode_cursor; raises ValueError if it is malformed"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        timestamp, id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(id, int) or isinstance(id, bool):
+            raise ValueError("cursor id must be an integer")
+        return datetime.fromisoformat(timestamp), id
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
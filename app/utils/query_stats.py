@@ -0,0 +1,147 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Stats objects collecting queries in the current context, innermost last
+_active = ContextVar("query_stats", default=())
+
+
+def parameters_shape(parameters):
+    """Describe bound parameters by type only, so values never reach the logs"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: one parameter set per row
+            return f"{len(parameters)} x {parameters_shape(parameters[0])}"
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    # The start time lives on the statement's execution context, so a
+    # statement that fails leaves nothing behind on the connection
+    if _active.get() and context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    active = _active.get()
+    start = getattr(context, "_query_start_time", None)
+    if not active or start is None:
+        return
+    duration = time.perf_counter() - start
+    for stats in active:
+        stats.record(statement, parameters, duration)
+
+
+class QueryStats:
+    """SQL statements executed within one request (or one tracked block)"""
+
+    def __init__(self, slow_threshold=0.1, repeat_threshold=5):
+        self.slow_threshold = slow_threshold
+        self.repeat_threshold = repeat_threshold
+        self.count = 0
+        self.total_time = 0.0
+        self.slow = []
+        self.statements = Counter()
+
+    def record(self, statement, parameters, duration):
+        self.count += 1
+        self.total_time += duration
+        self.statements[statement] += 1
+        if duration >= self.slow_threshold:
+            self.slow.append(
+                {
+                    "statement": statement,
+                    "parameters": parameters_shape(parameters),
+                    "duration_ms": round(duration * 1000, 2),
+                }
+            )
+
+    def repeated(self):
+        """SELECTs run repeatedly with the same SQL: likely N+1 query patterns"""
+        return {
+            statement: count
+            for statement, count in self.statements.items()
+            if count >= self.repeat_threshold
+            and statement.lstrip().upper().startswith("SELECT")
+        }
+
+    def summary(self):
+        return {
+            "db_queries": self.count,
+            "db_time_ms": round(self.total_time * 1000, 2),
+        }
+
+    def describe(self):
+        """Multi-line listing of the statements run, for assertion messages"""
+        lines = [f"{self.count} queries in {self.total_time * 1000:.1f}ms:"]
+        for statement, count in self.statements.most_common():
+            lines.append(f"  {count}x {' '.join(statement.split())}")
+        return "\n".join(lines)
+
+
+class QueryInstrumentation:
+    """Counts and times SQL statements per request via SQLAlchemy engine events"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = True
+        self.slow_threshold = 0.1
+        self.repeat_threshold = 5
+
+    def init_app(self, app):
+        """Configure thresholds from app config and hook every engine"""
+        self.enabled = app.config.get("QUERY_STATS_ENABLED", True)
+        self.slow_threshold = app.config.get("QUERY_SLOW_MS", 100) / 1000.0
+        self.repeat_threshold = app.config.get("QUERY_REPEAT_THRESHOLD", 5)
+        app.extensions["query_instrumentation"] = self
+
+        # Listening on the Engine class covers every bind, including ones
+        # created after this point; the hooks are shared by all instances
+        if not event.contains(Engine, "before_cursor_execute", _before_execute):
+            event.listen(Engine, "before_cursor_execute", _before_execute)
+            event.listen(Engine, "after_cursor_execute", _after_execute)
+
+    def activate(self):
+        """Start collecting into a new QueryStats; returns (stats, token)"""
+        stats = QueryStats(self.slow_threshold, self.repeat_threshold)
+        if not self.enabled:
+            return stats, None
+        return stats, _active.set(_active.get() + (stats,))
+
+    def deactivate(self, token):
+        if token is None:
+            return
+        try:
+            _active.reset(token)
+        except ValueError:
+            # Called from another context, e.g. a server closing the response
+            # body in a different thread; that context never saw the stats
+            pass
+
+    @contextmanager
+    def track(self):
+        """Collect the queries run inside the block; nests inside requests"""
+        stats, token = self.activate()
+        try:
+            yield stats
+        finally:
+            self.deactivate(token)
+
+    def log(self, stats, label):
+        """Warn about slow statements and probable N+1 patterns"""
+        for slow in stats.slow:
+            self.logger.warning(f"Slow query in {label}: {slow}")
+        for statement, count in stats.repeated().items():
+            self.logger.warning(
+                f"Possible N+1 in {label}: {count}x {' '.join(statement.split())}"
+            )
+
+
+query_instrumentation = QueryInstrumentation()
@@ -1,8 +1,22 @@
 from .base import Validator, ValidationError
+from ..utils.pagination import decode_cursor
 
 
 class TextValidator(Validator):
 
+    # Upper bound on the number of prompts in one batch request
+    MAX_BATCH_SIZE = 100
+
+    # Projections supported by ?fields= on listings
+    LIST_FIELDS = ("full", "summary")
+
+    # Page sizes for cursor-paginated listings
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+
+    # Formats served by the bulk export
+    EXPORT_FORMATS = ("ndjson", "csv")
+
     @classmethod
     def validate_generate_text(cls, data):
 
@@ -32,6 +46,10 @@ class TextValidator(Validator):
                         }
                     )
 
+            # Validate cache opt-in/opt-out if present
+            if "cache" in options and not isinstance(options["cache"], bool):
+                raise ValidationError({"options.cache": "Cache must be a boolean"})
+
             # Validate max_tokens if present
             if "max_tokens" in options:
                 max_tokens = options["max_tokens"]
@@ -43,6 +61,36 @@ class TextValidator(Validator):
 
         return True
 
+    @classmethod
+    def validate_generate_texts(cls, data):
+
+        cls.validate_required(data, ["items"])
+        cls.validate_type(data, "items", list, field_name="Items")
+
+        items = data["items"]
+        if len(items) > cls.MAX_BATCH_SIZE:
+            raise ValidationError(
+                {"items": f"A batch may contain at most {cls.MAX_BATCH_SIZE} items"}
+            )
+
+        # Validate every item up front so a bad entry rejects the batch early
+        errors = {}
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors[f"items[{index}]"] = "Item must be an object"
+                continue
+
+            try:
+                cls.validate_generate_text(item)
+            except ValidationError as e:
+                for field, message in e.errors.items():
+                    errors[f"items[{index}].{field}"] = message
+
+        if errors:
+            raise ValidationError(errors)
+
+        return True
+
     @classmethod
     def validate_update_text(cls, data):
 
@@ -65,3 +113,87 @@ class TextValidator(Validator):
             cls.validate_length(data, "response", min_length=1, field_name="Response")
 
         return True
+
+    @classmethod
+    def validate_list_params(cls, args):
+        """Validate listing query parameters; returns (limit, cursor key or None)"""
+
+        errors = {}
+        limit = cls.DEFAULT_PAGE_SIZE
+        after = None
+
+        if args.get("limit") is not None:
+            try:
+                limit = int(args["limit"])
+            except ValueError:
+                limit = 0
+            if not 1 <= limit <= cls.MAX_PAGE_SIZE:
+                errors["limit"] = (
+                    f"Limit must be an integer between 1 and {cls.MAX_PAGE_SIZE}"
+                )
+
+        if args.get("cursor"):
+            try:
+                after = decode_cursor(args["cursor"])
+            except ValueError:
+                errors["cursor"] = "Cursor is invalid"
+
+        if args.get("fields", "full") not in cls.LIST_FIELDS:
+            errors["fields"] = f"Fields must be one of: {', '.join(cls.LIST_FIELDS)}"
+
+        if errors:
+            raise ValidationError(errors)
+
+        return limit, after
+
+    @classmethod
+    def validate_search_params(cls, args):
+        """Validate search query parameters; returns (query, limit, offset)"""
+
+        errors = {}
+        query = (args.get("q") or "").strip()
+        limit = cls.DEFAULT_PAGE_SIZE
+        offset = 0
+
+        if not query:
+            errors["q"] = "q is required"
+        elif len(query) > 200:
+            errors["q"] = "Search query must be no more than 200 characters"
+
+        try:
+            limit = int(args.get("limit", limit))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= cls.MAX_PAGE_SIZE:
+            errors["limit"] = f"Limit must be an integer between 1 and {cls.MAX_PAGE_SIZE}"
+
+        try:
+            offset = int(args.get("offset", offset))
+        except ValueError:
+            offset = -1
+        if offset < 0:
+            errors["offset"] = "Offset must be a non-negative integer"
+
+        if errors:
+            raise ValidationError(errors)
+
+        return query, limit, offset
+
+    @classmethod
+    def validate_export_params(cls, args):
+        """Validate export query parameters; returns (format, gzip)"""
+
+        errors = {}
+        export_format = args.get("format", "ndjson")
+        compress = args.get("gzip", "false").lower()
+
+        if export_format not in cls.EXPORT_FORMATS:
+            errors["format"] = f"Format must be one of: {', '.join(cls.EXPORT_FORMATS)}"
+
+        if compress not in ("true", "false"):
+            errors["gzip"] = "gzip must be true or false"
+
+        if errors:
+            raise ValidationError(errors)
+
+        return export_format, compress == "true"
@@ -0,0 +1,26 @@
+"""flag texts served from the response cache
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-17 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001a'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing texts all came from a provider, so the server default backfills them
+    op.add_column('generated_texts', sa.Column('cached', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('generated_texts', schema=None) as batch_op:
+        batch_op.drop_column('cached')
@@ -0,0 +1,42 @@
+"""generation jobs queue
+
+Revision ID: 0001b
+Revises: 0001a
+Create Date: 2026-10-17 09:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001b'
+down_revision = '0001a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('generation_jobs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('prompt', sa.Text(), nullable=False),
+    sa.Column('options', sa.Text(), nullable=True),
+    sa.Column('provider', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('worker_id', sa.String(length=64), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('result_text_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['result_text_id'], ['generated_texts.id'], name=op.f('fk_generation_jobs_result_text_id_generated_texts'), ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_generation_jobs_user_id_users')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_generation_jobs'))
+    )
+
+
+def downgrade():
+    op.drop_table('generation_jobs')
@@ -0,0 +1,29 @@
+"""require generated_texts.timestamp
+
+Revision ID: 0001c
+Revises: 0001b
+Create Date: 2026-10-17 09:25:00.000000
+
+Keyset pagination orders by (timestamp, id) and cannot page past NULLs.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001c'
+down_revision = '0001b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("UPDATE generated_texts SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL")
+    with op.batch_alter_table('generated_texts', schema=None) as batch_op:
+        batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('generated_texts', schema=None) as batch_op:
+        batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,38 @@
+"""indexes for hot repository queries
+
+Revision ID: 0002
+Revises: 0001c
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Per-user listings newest first, including keyset pagination; id is the
+    # tie-breaker and must be descending too or the planner adds a sort step
+    op.create_index('ix_generated_texts_user_id_timestamp_id', 'generated_texts', ['user_id', sa.text('timestamp DESC'), sa.text('id DESC')], unique=False)
+
+    # Job claiming and the expired-claim sweep
+    op.create_index('ix_generation_jobs_status_created_at', 'generation_jobs', ['status', 'created_at'], unique=False)
+    op.create_index('ix_generation_jobs_status_locked_until', 'generation_jobs', ['status', 'locked_until'], unique=False)
+    op.create_index('ix_generation_jobs_user_id', 'generation_jobs', ['user_id'], unique=False)
+
+    # Case-insensitive username lookups
+    op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_users_username_lower', table_name='users')
+    op.drop_index('ix_generation_jobs_user_id', table_name='generation_jobs')
+    op.drop_index('ix_generation_jobs_status_locked_until', table_name='generation_jobs')
+    op.drop_index('ix_generation_jobs_status_created_at', table_name='generation_jobs')
+    op.drop_index('ix_generated_texts_user_id_timestamp_id', table_name='generated_texts')
@@ -0,0 +1,64 @@
+"""full-text search index on generated_texts
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        # External-content FTS5 table kept in sync by triggers
+        op.execute(
+            "CREATE VIRTUAL TABLE generated_texts_fts USING fts5("
+            "prompt, response, content='generated_texts', content_rowid='id', "
+            "tokenize='porter unicode61')"
+        )
+        op.execute(
+            "CREATE TRIGGER generated_texts_fts_insert AFTER INSERT ON generated_texts BEGIN "
+            "INSERT INTO generated_texts_fts(rowid, prompt, response) VALUES (new.id, new.prompt, new.response); END"
+        )
+        op.execute(
+            "CREATE TRIGGER generated_texts_fts_delete AFTER DELETE ON generated_texts BEGIN "
+            "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response) VALUES ('delete', old.id, old.prompt, old.response); END"
+        )
+        op.execute(
+            "CREATE TRIGGER generated_texts_fts_update AFTER UPDATE OF prompt, response ON generated_texts BEGIN "
+            "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response) VALUES ('delete', old.id, old.prompt, old.response); "
+            "INSERT INTO generated_texts_fts(rowid, prompt, response) VALUES (new.id, new.prompt, new.response); END"
+        )
+        # Index the rows that already exist
+        op.execute("INSERT INTO generated_texts_fts(generated_texts_fts) VALUES ('rebuild')")
+
+    elif dialect == 'postgresql':
+        # Stored generated column, so existing rows are indexed by the ALTER itself
+        op.execute(
+            "ALTER TABLE generated_texts ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('english', coalesce(prompt, '') || ' ' || coalesce(response, ''))) STORED"
+        )
+        op.create_index('ix_generated_texts_search_vector', 'generated_texts', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS generated_texts_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS generated_texts_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS generated_texts_fts_insert")
+        op.execute("DROP TABLE IF EXISTS generated_texts_fts")
+
+    elif dialect == 'postgresql':
+        op.drop_index('ix_generated_texts_search_vector', table_name='generated_texts')
+        op.drop_column('generated_texts', 'search_vector')
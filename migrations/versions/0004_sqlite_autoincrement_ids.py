@@ -0,0 +1,71 @@
+"""never reuse generated_texts ids on SQLite
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 10:30:00.000000
+
+The write-behind writer reserves ids before inserting rows. On SQLite that
+needs an AUTOINCREMENT primary key, whose high-water mark in sqlite_sequence
+can be bumped to reserve a block. SQLite can't alter a primary key, so the
+table is rebuilt; ids are preserved. PostgreSQL already draws ids from a
+sequence and is unchanged.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+FTS_TRIGGERS = [
+    "CREATE TRIGGER generated_texts_fts_insert AFTER INSERT ON generated_texts BEGIN "
+    "INSERT INTO generated_texts_fts(rowid, prompt, response) VALUES (new.id, new.prompt, new.response); END",
+    "CREATE TRIGGER generated_texts_fts_delete AFTER DELETE ON generated_texts BEGIN "
+    "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response) VALUES ('delete', old.id, old.prompt, old.response); END",
+    "CREATE TRIGGER generated_texts_fts_update AFTER UPDATE OF prompt, response ON generated_texts BEGIN "
+    "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response) VALUES ('delete', old.id, old.prompt, old.response); "
+    "INSERT INTO generated_texts_fts(rowid, prompt, response) VALUES (new.id, new.prompt, new.response); END",
+]
+
+COLUMNS = 'id, user_id, prompt, response, provider, cached, timestamp'
+
+
+def _rebuild(autoincrement):
+    primary_key = 'INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT' if autoincrement else 'INTEGER NOT NULL'
+    table_pk = '' if autoincrement else ',\n\tCONSTRAINT pk_generated_texts PRIMARY KEY (id)'
+
+    op.execute(
+        f"CREATE TABLE _generated_texts_new (\n"
+        f"\tid {primary_key},\n"
+        "\tuser_id INTEGER NOT NULL,\n"
+        "\tprompt TEXT NOT NULL,\n"
+        "\tresponse TEXT NOT NULL,\n"
+        "\tprovider VARCHAR(50),\n"
+        "\tcached BOOLEAN DEFAULT (0) NOT NULL,\n"
+        "\ttimestamp DATETIME NOT NULL,\n"
+        "\tCONSTRAINT fk_generated_texts_user_id_users FOREIGN KEY(user_id) REFERENCES users (id)"
+        f"{table_pk}\n)"
+    )
+    op.execute(f"INSERT INTO _generated_texts_new ({COLUMNS}) SELECT {COLUMNS} FROM generated_texts")
+    op.execute("DROP TABLE generated_texts")
+    op.execute("ALTER TABLE _generated_texts_new RENAME TO generated_texts")
+
+    # Dropping the old table took its indexes and triggers with it
+    op.create_index('ix_generated_texts_user_id_timestamp_id', 'generated_texts', ['user_id', sa.text('timestamp DESC'), sa.text('id DESC')], unique=False)
+    for statement in FTS_TRIGGERS:
+        op.execute(statement)
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        _rebuild(autoincrement=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        _rebuild(autoincrement=False)
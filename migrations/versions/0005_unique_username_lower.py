@@ -0,0 +1,29 @@
+"""unique case-insensitive usernames
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Registration relies on this index to reject duplicates at insert time
+    # instead of looking the username up first. Fails if case-variant
+    # duplicates already exist; those must be merged or renamed beforehand.
+    op.drop_index('ix_users_username_lower', table_name='users')
+    op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username)')], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_users_username_lower', table_name='users')
+    op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username)')], unique=False)
@@ -0,0 +1,46 @@
+"""stored, indexed normalized usernames
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 15:00:00.000000
+
+Login and registration look users up by username_normalized, kept equal to
+lower(username) by the User model. Its unique index replaces the
+expression index on lower(username).
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Dropped first: SQLite's batch table rebuild can't carry expression indexes over
+    op.drop_index('ix_users_username_lower', table_name='users')
+
+    op.add_column('users', sa.Column('username_normalized', sa.String(length=80), nullable=True))
+
+    # Usernames are ASCII-only (see UserValidator), so SQL lower() matches
+    # normalize_username() on every backend. 0005 already guarantees there
+    # are no case-variant duplicates, so the unique index below can be built.
+    op.execute("UPDATE users SET username_normalized = lower(username)")
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('username_normalized', existing_type=sa.String(length=80), nullable=False)
+
+    op.create_index('ix_users_username_normalized', 'users', ['username_normalized'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_users_username_normalized', table_name='users')
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('username_normalized')
+
+    op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username)')], unique=True)
@@ -0,0 +1,26 @@
+"""per-user texts version for ETags
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing users start at 0; clients holding no ETag are unaffected
+    op.add_column('users', sa.Column('texts_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('texts_version')
@@ -0,0 +1,118 @@
+"""cascade user deletion in the database; background purges
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 17:00:00.000000
+
+generated_texts.user_id and generation_jobs.user_id become ON DELETE
+CASCADE, so deleting a user no longer loads their rows. Large users are
+instead purged in batches, tracked in user_purges, with users.deleted_at set
+meanwhile.
+
+On SQLite generated_texts is rebuilt with raw SQL, as in 0004, to keep its
+AUTOINCREMENT key and sqlite_sequence high-water mark; generation_jobs goes
+through a batch rebuild.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+FTS_TRIGGERS = [
+    "CREATE TRIGGER generated_texts_fts_insert AFTER INSERT ON generated_texts BEGIN "
+    "INSERT INTO generated_texts_fts(rowid, prompt, response) VALUES (new.id, new.prompt, new.response); END",
+    "CREATE TRIGGER generated_texts_fts_delete AFTER DELETE ON generated_texts BEGIN "
+    "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response) VALUES ('delete', old.id, old.prompt, old.response); END",
+    "CREATE TRIGGER generated_texts_fts_update AFTER UPDATE OF prompt, response ON generated_texts BEGIN "
+    "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response) VALUES ('delete', old.id, old.prompt, old.response); "
+    "INSERT INTO generated_texts_fts(rowid, prompt, response) VALUES (new.id, new.prompt, new.response); END",
+]
+
+COLUMNS = 'id, user_id, prompt, response, provider, cached, timestamp'
+
+
+def _rebuild_generated_texts(ondelete):
+    on_delete = f' ON DELETE {ondelete}' if ondelete else ''
+    high_water = op.get_bind().execute(
+        sa.text("SELECT seq FROM sqlite_sequence WHERE name = 'generated_texts'")
+    ).scalar()
+
+    op.execute(
+        "CREATE TABLE _generated_texts_new (\n"
+        "\tid INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,\n"
+        "\tuser_id INTEGER NOT NULL,\n"
+        "\tprompt TEXT NOT NULL,\n"
+        "\tresponse TEXT NOT NULL,\n"
+        "\tprovider VARCHAR(50),\n"
+        "\tcached BOOLEAN DEFAULT (0) NOT NULL,\n"
+        "\ttimestamp DATETIME NOT NULL,\n"
+        f"\tCONSTRAINT fk_generated_texts_user_id_users FOREIGN KEY(user_id) REFERENCES users (id){on_delete}\n)"
+    )
+    op.execute(f"INSERT INTO _generated_texts_new ({COLUMNS}) SELECT {COLUMNS} FROM generated_texts")
+    op.execute("DROP TABLE generated_texts")
+    op.execute("ALTER TABLE _generated_texts_new RENAME TO generated_texts")
+
+    # Ids reserved by write-behind writers may lie above the current maximum
+    if high_water is not None:
+        op.execute(
+            sa.text("UPDATE sqlite_sequence SET seq = max(seq, :seq) WHERE name = 'generated_texts'")
+            .bindparams(seq=high_water)
+        )
+
+    op.create_index('ix_generated_texts_user_id_timestamp_id', 'generated_texts', ['user_id', sa.text('timestamp DESC'), sa.text('id DESC')], unique=False)
+    for statement in FTS_TRIGGERS:
+        op.execute(statement)
+
+
+def _set_user_fks(ondelete):
+    if op.get_bind().dialect.name == 'sqlite':
+        _rebuild_generated_texts(ondelete)
+    else:
+        op.drop_constraint('fk_generated_texts_user_id_users', 'generated_texts', type_='foreignkey')
+        op.create_foreign_key('fk_generated_texts_user_id_users', 'generated_texts', 'users', ['user_id'], ['id'], ondelete=ondelete)
+
+    with op.batch_alter_table('generation_jobs') as batch_op:
+        batch_op.drop_constraint('fk_generation_jobs_user_id_users', type_='foreignkey')
+        batch_op.create_foreign_key('fk_generation_jobs_user_id_users', 'users', ['user_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    op.add_column('users', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    op.create_table('user_purges',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('texts_total', sa.Integer(), nullable=True),
+    sa.Column('texts_deleted', sa.Integer(), nullable=False),
+    sa.Column('jobs_deleted', sa.Integer(), nullable=False),
+    sa.Column('batches', sa.Integer(), nullable=False),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('worker_id', sa.String(length=64), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_user_purges'))
+    )
+    op.create_index('ix_user_purges_status_created_at', 'user_purges', ['status', 'created_at'], unique=False)
+    op.create_index('ix_user_purges_user_id', 'user_purges', ['user_id'], unique=False)
+
+    _set_user_fks('CASCADE')
+
+
+def downgrade():
+    _set_user_fks(None)
+
+    op.drop_index('ix_user_purges_user_id', table_name='user_purges')
+    op.drop_index('ix_user_purges_status_created_at', table_name='user_purges')
+    op.drop_table('user_purges')
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('deleted_at')
@@ -0,0 +1,28 @@
+"""per-user retention policy overrides
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NULL follows the global policy, so existing users are unaffected
+    op.add_column('users', sa.Column('retention_max_age_days', sa.Integer(), nullable=True))
+    op.add_column('users', sa.Column('retention_max_texts', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('retention_max_texts')
+        batch_op.drop_column('retention_max_age_days')
@@ -0,0 +1,223 @@
+"""compressed storage for long responses
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 19:00:00.000000
+
+Long responses move to generated_texts.response_compressed, a gzip member of
+the response encoded as a JSON string, and response becomes ''. The database
+can't read those, so the search index stops being maintained for them by the
+database: the SQLite triggers are recreated to skip compressed rows, and on
+PostgreSQL search_vector becomes a plain column that a trigger fills for
+uncompressed rows only. The app indexes compressed rows (see
+app/repository/search.py).
+
+Existing rows are compressed when RESPONSE_COMPRESSION_ENABLED is set and
+indexed as they are; the codec is inlined so this migration keeps working if
+the app's codec changes.
+
+"""
+import gzip
+import json
+import zlib
+from alembic import op
+from flask import current_app
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+BATCH_SIZE = 500
+
+TRIGGER_NAMES = ['generated_texts_fts_insert', 'generated_texts_fts_delete', 'generated_texts_fts_update']
+
+PLAIN_TRIGGERS = [
+    "CREATE TRIGGER generated_texts_fts_insert AFTER INSERT ON generated_texts BEGIN "
+    "INSERT INTO generated_texts_fts(rowid, prompt, response) VALUES (new.id, new.prompt, new.response); END",
+    "CREATE TRIGGER generated_texts_fts_delete AFTER DELETE ON generated_texts BEGIN "
+    "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response) VALUES ('delete', old.id, old.prompt, old.response); END",
+    "CREATE TRIGGER generated_texts_fts_update AFTER UPDATE OF prompt, response ON generated_texts BEGIN "
+    "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response) VALUES ('delete', old.id, old.prompt, old.response); "
+    "INSERT INTO generated_texts_fts(rowid, prompt, response) VALUES (new.id, new.prompt, new.response); END",
+]
+
+GUARDED_TRIGGERS = [
+    "CREATE TRIGGER generated_texts_fts_insert AFTER INSERT ON generated_texts "
+    "WHEN new.response_codec IS NULL BEGIN "
+    "INSERT INTO generated_texts_fts(rowid, prompt, response) VALUES (new.id, new.prompt, new.response); END",
+    "CREATE TRIGGER generated_texts_fts_delete AFTER DELETE ON generated_texts "
+    "WHEN old.response_codec IS NULL BEGIN "
+    "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response) VALUES ('delete', old.id, old.prompt, old.response); END",
+    "CREATE TRIGGER generated_texts_fts_update AFTER UPDATE OF prompt, response, response_codec ON generated_texts BEGIN "
+    "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response) "
+    "SELECT 'delete', old.id, old.prompt, old.response WHERE old.response_codec IS NULL; "
+    "INSERT INTO generated_texts_fts(rowid, prompt, response) "
+    "SELECT new.id, new.prompt, new.response WHERE new.response_codec IS NULL; END",
+]
+
+SEARCH_VECTOR = "to_tsvector('english', coalesce(prompt, '') || ' ' || coalesce(response, ''))"
+
+POSTGRESQL_TRIGGER = [
+    "CREATE OR REPLACE FUNCTION generated_texts_search_vector() RETURNS trigger AS $$ "
+    "BEGIN "
+    "IF NEW.response_codec IS NULL THEN "
+    "NEW.search_vector := to_tsvector('english', coalesce(NEW.prompt, '') || ' ' || coalesce(NEW.response, '')); "
+    "END IF; "
+    "RETURN NEW; "
+    "END $$ LANGUAGE plpgsql",
+    "CREATE TRIGGER generated_texts_search_vector BEFORE INSERT OR UPDATE OF prompt, response, response_codec "
+    "ON generated_texts FOR EACH ROW EXECUTE FUNCTION generated_texts_search_vector()",
+]
+
+FTS_INSERT = sa.text("INSERT INTO generated_texts_fts(rowid, prompt, response) VALUES (:id, :prompt, :response)")
+FTS_DELETE = sa.text(
+    "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response) "
+    "VALUES ('delete', :id, :prompt, :response)"
+)
+
+texts = sa.table(
+    'generated_texts',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+    sa.column('prompt', sa.Text),
+    sa.column('response', sa.Text),
+    sa.column('response_compressed', sa.LargeBinary),
+    sa.column('response_codec', sa.String),
+    sa.column('response_length', sa.Integer),
+    sa.column('search_vector'),  # PostgreSQL only
+)
+users = sa.table('users', sa.column('id', sa.Integer), sa.column('texts_version', sa.Integer))
+
+
+def _compress(response, level):
+    literal = json.dumps(response, ensure_ascii=False).encode('utf-8')
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(literal) + compressor.flush(zlib.Z_SYNC_FLUSH) + compressor.flush(zlib.Z_FINISH)
+
+
+def _replace_triggers(statements):
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for name in TRIGGER_NAMES:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for statement in statements:
+        op.execute(statement)
+
+
+def _rewrite(select_rows, values_for, before=None, after=None):
+    """Rewrite rows a batch at a time, bumping the versions of their users
+
+    before and after, if given, run with each row around its update.
+    """
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(select_rows.where(texts.c.id > last_id).order_by(texts.c.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            return
+        for row in rows:
+            if before is not None:
+                before(bind, row)
+            bind.execute(texts.update().where(texts.c.id == row.id).values(**values_for(row)))
+            if after is not None:
+                after(bind, row)
+        bind.execute(
+            users.update()
+            .where(users.c.id.in_({row.user_id for row in rows}))
+            .values(texts_version=users.c.texts_version + 1)
+        )
+        last_id = rows[-1].id
+
+
+def _index_decoded(bind, row):
+    # The trigger has dropped the plain entry; index the text it held
+    bind.execute(FTS_INSERT, {'id': row.id, 'prompt': row.prompt, 'response': row.response})
+
+
+def _unindex_compressed(bind, row):
+    # The trigger indexes the row once it is plain again
+    response = json.loads(gzip.decompress(row.response_compressed))
+    bind.execute(FTS_DELETE, {'id': row.id, 'prompt': row.prompt, 'response': response})
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    op.add_column('generated_texts', sa.Column('response_compressed', sa.LargeBinary(), nullable=True))
+    op.add_column('generated_texts', sa.Column('response_codec', sa.String(length=16), nullable=True))
+    op.add_column('generated_texts', sa.Column('response_length', sa.Integer(), nullable=True))
+    _replace_triggers(GUARDED_TRIGGERS)
+    if dialect == 'postgresql':
+        # Existing rows keep the vectors the generated column computed, so
+        # there is nothing to backfill, and the GIN index stays valid
+        op.execute("ALTER TABLE generated_texts ALTER COLUMN search_vector DROP EXPRESSION")
+        for statement in POSTGRESQL_TRIGGER:
+            op.execute(statement)
+
+    config = current_app.config
+    if not config.get('RESPONSE_COMPRESSION_ENABLED', False):
+        return
+
+    min_length = config.get('RESPONSE_COMPRESSION_MIN_LENGTH', 4096)
+    level = config.get('RESPONSE_COMPRESSION_LEVEL', 6)
+
+    def values_for(row):
+        values = {
+            'response': '',
+            'response_compressed': _compress(row.response, level),
+            'response_codec': 'gzip',
+            'response_length': len(row.response),
+        }
+        if dialect == 'postgresql':
+            # Computed from the old values by the same UPDATE; the trigger
+            # leaves compressed rows alone
+            values['search_vector'] = sa.literal_column(SEARCH_VECTOR)
+        return values
+
+    _rewrite(
+        sa.select(texts.c.id, texts.c.user_id, texts.c.prompt, texts.c.response)
+        .where(texts.c.response_codec.is_(None), sa.func.length(texts.c.response) >= min_length),
+        values_for,
+        after=_index_decoded if dialect == 'sqlite' else None
+    )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    _rewrite(
+        sa.select(texts.c.id, texts.c.user_id, texts.c.prompt, texts.c.response_compressed)
+        .where(texts.c.response_codec == 'gzip'),
+        lambda row: {
+            'response': json.loads(gzip.decompress(row.response_compressed)),
+            'response_compressed': None,
+            'response_codec': None,
+            'response_length': None,
+        },
+        before=_unindex_compressed if dialect == 'sqlite' else None
+    )
+    _replace_triggers(PLAIN_TRIGGERS)
+    if dialect == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS generated_texts_search_vector ON generated_texts")
+        op.execute("DROP FUNCTION IF EXISTS generated_texts_search_vector()")
+        # A column can't become generated again; recreate it as 0003 did
+        op.drop_index('ix_generated_texts_search_vector', table_name='generated_texts')
+        op.drop_column('generated_texts', 'search_vector')
+        op.execute(
+            "ALTER TABLE generated_texts ADD COLUMN search_vector tsvector "
+            f"GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED"
+        )
+        op.create_index('ix_generated_texts_search_vector', 'generated_texts', ['search_vector'], unique=False, postgresql_using='gin')
+
+    if op.get_bind().dialect.name == 'sqlite':
+        # A batch rebuild would lose the AUTOINCREMENT sequence; SQLite >= 3.35
+        # drops columns in place
+        for name in ('response_length', 'response_codec', 'response_compressed'):
+            op.execute(f"ALTER TABLE generated_texts DROP COLUMN {name}")
+    else:
+        op.drop_column('generated_texts', 'response_length')
+        op.drop_column('generated_texts', 'response_codec')
+        op.drop_column('generated_texts', 'response_compressed')
@@ -0,0 +1,153 @@
+"""partition the full-text search index by user
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 20:00:00.000000
+
+Every search is limited to one user's texts, but the index had no user
+dimension, so a match walked every user's postings before the user_id filter
+dropped most of them. On SQLite the FTS5 table gets a user_id column that
+queries match on; it is recreated and refilled, plain rows from the table and
+compressed rows decoded here. On PostgreSQL the GIN index becomes
+(user_id, search_vector), which needs the btree_gin extension.
+
+"""
+import gzip
+import json
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+BATCH_SIZE = 500
+
+TRIGGER_NAMES = ['generated_texts_fts_insert', 'generated_texts_fts_delete', 'generated_texts_fts_update']
+
+PARTITIONED_TABLE = (
+    "CREATE VIRTUAL TABLE generated_texts_fts USING fts5("
+    "prompt, response, user_id, content='generated_texts', content_rowid='id', "
+    "tokenize='porter unicode61')"
+)
+
+PARTITIONED_TRIGGERS = [
+    "CREATE TRIGGER generated_texts_fts_insert AFTER INSERT ON generated_texts "
+    "WHEN new.response_codec IS NULL BEGIN "
+    "INSERT INTO generated_texts_fts(rowid, prompt, response, user_id) VALUES (new.id, new.prompt, new.response, new.user_id); END",
+    "CREATE TRIGGER generated_texts_fts_delete AFTER DELETE ON generated_texts "
+    "WHEN old.response_codec IS NULL BEGIN "
+    "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response, user_id) "
+    "VALUES ('delete', old.id, old.prompt, old.response, old.user_id); END",
+    "CREATE TRIGGER generated_texts_fts_update AFTER UPDATE OF user_id, prompt, response, response_codec ON generated_texts BEGIN "
+    "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response, user_id) "
+    "SELECT 'delete', old.id, old.prompt, old.response, old.user_id WHERE old.response_codec IS NULL; "
+    "INSERT INTO generated_texts_fts(rowid, prompt, response, user_id) "
+    "SELECT new.id, new.prompt, new.response, new.user_id WHERE new.response_codec IS NULL; END",
+]
+
+UNPARTITIONED_TABLE = (
+    "CREATE VIRTUAL TABLE generated_texts_fts USING fts5("
+    "prompt, response, content='generated_texts', content_rowid='id', "
+    "tokenize='porter unicode61')"
+)
+
+UNPARTITIONED_TRIGGERS = [
+    "CREATE TRIGGER generated_texts_fts_insert AFTER INSERT ON generated_texts "
+    "WHEN new.response_codec IS NULL BEGIN "
+    "INSERT INTO generated_texts_fts(rowid, prompt, response) VALUES (new.id, new.prompt, new.response); END",
+    "CREATE TRIGGER generated_texts_fts_delete AFTER DELETE ON generated_texts "
+    "WHEN old.response_codec IS NULL BEGIN "
+    "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response) VALUES ('delete', old.id, old.prompt, old.response); END",
+    "CREATE TRIGGER generated_texts_fts_update AFTER UPDATE OF prompt, response, response_codec ON generated_texts BEGIN "
+    "INSERT INTO generated_texts_fts(generated_texts_fts, rowid, prompt, response) "
+    "SELECT 'delete', old.id, old.prompt, old.response WHERE old.response_codec IS NULL; "
+    "INSERT INTO generated_texts_fts(rowid, prompt, response) "
+    "SELECT new.id, new.prompt, new.response WHERE new.response_codec IS NULL; END",
+]
+
+texts = sa.table(
+    'generated_texts',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+    sa.column('prompt', sa.Text),
+    sa.column('response_compressed', sa.LargeBinary),
+    sa.column('response_codec', sa.String),
+)
+
+
+def _rebuild_fts(create_table, triggers, columns):
+    """Recreate the FTS5 table and its triggers, then index every row
+
+    FTS5's 'rebuild' would index compressed rows by their empty response
+    column, so rows are copied in explicitly.
+    """
+    for name in TRIGGER_NAMES:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS generated_texts_fts")
+    op.execute(create_table)
+    for statement in triggers:
+        op.execute(statement)
+
+    column_list = ', '.join(columns)
+    op.execute(
+        f"INSERT INTO generated_texts_fts(rowid, {column_list}) "
+        f"SELECT id, {column_list} FROM generated_texts WHERE response_codec IS NULL"
+    )
+
+    bind = op.get_bind()
+    insert = sa.text(
+        f"INSERT INTO generated_texts_fts(rowid, {column_list}) "
+        f"VALUES (:id, {', '.join(':' + name for name in columns)})"
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(texts.c.id, texts.c.user_id, texts.c.prompt, texts.c.response_compressed)
+            .where(texts.c.id > last_id, texts.c.response_codec == 'gzip')
+            .order_by(texts.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        bind.execute(insert, [
+            {
+                'id': row.id,
+                'user_id': row.user_id,
+                'prompt': row.prompt,
+                'response': json.loads(gzip.decompress(row.response_compressed)),
+            }
+            for row in rows
+        ])
+        last_id = rows[-1].id
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        _rebuild_fts(PARTITIONED_TABLE, PARTITIONED_TRIGGERS, ['prompt', 'response', 'user_id'])
+
+    elif dialect == 'postgresql':
+        # GIN operator classes for plain columns such as user_id
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+        op.create_index(
+            'ix_generated_texts_user_id_search_vector', 'generated_texts', ['user_id', 'search_vector'],
+            unique=False, postgresql_using='gin'
+        )
+        op.drop_index('ix_generated_texts_search_vector', table_name='generated_texts')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        _rebuild_fts(UNPARTITIONED_TABLE, UNPARTITIONED_TRIGGERS, ['prompt', 'response'])
+
+    elif dialect == 'postgresql':
+        op.create_index('ix_generated_texts_search_vector', 'generated_texts', ['search_vector'], unique=False, postgresql_using='gin')
+        op.drop_index('ix_generated_texts_user_id_search_vector', table_name='generated_texts')
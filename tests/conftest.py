@@ -1,6 +1,7 @@
 import os
 import pytest
 import uuid
+from contextlib import contextmanager
 from app import create_app
 from app.models import db as _db
 from app.config import TestingConfig
@@ -92,6 +93,25 @@ def auth_headers(auth_token):
     return {"Authorization": f"Bearer {auth_token}"}
 
 
+@pytest.fixture
+def query_budget():
+    """Assert that a block runs at most a given number of SQL statements
+
+    Usage: with query_budget(2): client.get(...)
+    """
+    from app.utils.query_stats import query_instrumentation
+
+    @contextmanager
+    def budget(max_queries):
+        with query_instrumentation.track() as stats:
+            yield stats
+        assert (
+            stats.count <= max_queries
+        ), f"Query budget of {max_queries} exceeded. {stats.describe()}"
+
+    return budget
+
+
 @pytest.fixture(autouse=True)
 def mock_openai(monkeypatch):
     """Mock OpenAI API calls to avoid quota issues"""
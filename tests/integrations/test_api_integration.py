@@ -1,4 +1,8 @@
 import pytest
+import ast
+import csv
+import gzip
+import io
 import json
 from unittest.mock import patch
 from app.models import GeneratedText
@@ -29,7 +33,7 @@ class TestApiEndpoints:
         assert response_data['response'] == 'AI generated response'
         
         # Verify AI service was called
-        mock_generate.assert_called_once_with(prompt='Test prompt')
+        mock_generate.assert_called_once_with(prompt='Test prompt', options=None)
     
     def test_generate_text_unauthorized(self, client):
         """Test generating text without authentication"""
@@ -197,3 +201,666 @@ class TestApiEndpoints:
         assert isinstance(response_data, list)
         assert len(response_data) == 3
         assert all(text['user_id'] == test_user.id for text in response_data)
+    
+    def test_get_texts_paginated(self, client, session, test_user, auth_headers):
+        """Test walking the text listing with cursors"""
+        texts = [
+            GeneratedText(user_id=test_user.id, prompt=f"Prompt {i}", response=f"Response {i}")
+            for i in range(5)
+        ]
+        session.add_all(texts)
+        session.commit()
+        
+        ids = []
+        url = '/api/generated-texts?limit=2'
+        while url:
+            response = client.get(url, headers=auth_headers)
+            assert response.status_code == 200
+            page = json.loads(response.data)
+            assert len(page['items']) <= 2
+            ids.extend(text['id'] for text in page['items'])
+            url = f"/api/generated-texts?limit=2&cursor={page['next_cursor']}" if page['next_cursor'] else None
+        
+        assert sorted(ids) == sorted(text.id for text in texts)
+        assert len(set(ids)) == 5
+        
+        response = client.get('/api/generated-texts?cursor=bogus', headers=auth_headers)
+        assert response.status_code == 422
+    
+    def test_search_texts(self, client, session, test_user, auth_headers):
+        """Test searching a user's history"""
+        session.add_all([
+            GeneratedText(user_id=test_user.id, prompt=f'Haiku about autumn {i}', response='Leaves fall')
+            for i in range(3)
+        ] + [GeneratedText(user_id=test_user.id, prompt='Recipe', response='Bread')])
+        session.commit()
+        
+        response = client.get('/api/generated-texts/search?q=autumn&limit=2', headers=auth_headers)
+        assert response.status_code == 200
+        page = json.loads(response.data)
+        assert len(page['items']) == 2
+        assert page['next_offset'] == 2
+        assert 'rank' in page['items'][0]
+        
+        response = client.get('/api/generated-texts/search?q=autumn&limit=2&offset=2', headers=auth_headers)
+        page = json.loads(response.data)
+        assert len(page['items']) == 1
+        assert page['next_offset'] is None
+        
+        response = client.get('/api/generated-texts/search', headers=auth_headers)
+        assert response.status_code == 422
+    
+    def test_get_texts_summary(self, client, session, test_user, auth_headers):
+        """Test the summary projection of the text listing"""
+        session.add(GeneratedText(user_id=test_user.id, prompt='Short prompt', response='A long response'))
+        session.commit()
+        
+        response = client.get('/api/generated-texts?fields=summary', headers=auth_headers)
+        assert response.status_code == 200
+        summaries = json.loads(response.data)
+        assert summaries[0]['prompt_preview'] == 'Short prompt'
+        assert summaries[0]['response_length'] == len('A long response')
+        assert 'response' not in summaries[0]
+        
+        response = client.get('/api/generated-texts?fields=summary&limit=1', headers=auth_headers)
+        assert response.status_code == 200
+        assert json.loads(response.data)['items'][0]['cached'] is False
+        
+        response = client.get('/api/generated-texts?fields=everything', headers=auth_headers)
+        assert response.status_code == 422
+    
+    def test_generate_text_cached_response(self, client, auth_headers, monkeypatch):
+        """Test that a repeated deterministic prompt is stored as a cache hit"""
+        from app.service.cache import response_cache
+        
+        monkeypatch.setattr(response_cache, 'enabled', True)
+        response_cache.clear()
+        
+        data = {'prompt': 'Cache me', 'options': {'temperature': 0}}
+        first = client.post(
+            '/api/generate-text',
+            data=json.dumps(data),
+            content_type='application/json',
+            headers=auth_headers
+        )
+        second = client.post(
+            '/api/generate-text',
+            data=json.dumps(data),
+            content_type='application/json',
+            headers=auth_headers
+        )
+        response_cache.clear()
+        
+        assert first.status_code == 201
+        assert second.status_code == 201
+        assert json.loads(first.data)['cached'] is False
+        assert json.loads(second.data)['cached'] is True
+        assert json.loads(second.data)['response'] == json.loads(first.data)['response']
+        
+        metrics = client.get('/api/metrics', headers=auth_headers)
+        assert metrics.status_code == 200
+        assert 'response_cache' in json.loads(metrics.data)
+    
+    def test_generate_text_stream(self, client, session, auth_headers):
+        """Test streaming a generation as Server-Sent Events"""
+        def fake_stream(self, prompt, options=None):
+            yield 'Hello'
+            yield ' world'
+        
+        with patch('app.service.ai_service.AIService.stream_text', fake_stream):
+            response = client.post(
+                '/api/generate-text?stream=true',
+                data=json.dumps({'prompt': 'Stream me'}),
+                content_type='application/json',
+                headers=auth_headers
+            )
+            body = response.get_data(as_text=True)
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        
+        events = [chunk for chunk in body.split('\n\n') if chunk]
+        assert events[0] == 'data: {"token": "Hello"}'
+        assert events[1] == 'data: {"token": " world"}'
+        assert events[2].startswith('event: done\n')
+        
+        saved = json.loads(events[2].split('data: ', 1)[1])
+        assert saved['response'] == 'Hello world'
+        assert session.query(GeneratedText).get(saved['id']) is not None
+    
+    def test_generate_text_stream_disconnect(self, client, auth_headers):
+        """Test that a client disconnect closes the upstream stream"""
+        closed = []
+        
+        def fake_stream(self, prompt, options=None):
+            try:
+                yield 'first'
+                yield 'second'
+            finally:
+                closed.append(True)
+        
+        with patch('app.service.ai_service.AIService.stream_text', fake_stream):
+            response = client.post(
+                '/api/generate-text?stream=true',
+                data=json.dumps({'prompt': 'Disconnect me'}),
+                content_type='application/json',
+                headers=auth_headers,
+                buffered=False
+            )
+            first_event = next(response.response)
+            response.close()
+        
+        assert b'first' in first_event
+        assert closed == [True]
+    
+    def test_generate_text_stream_error_before_first_token(self, client, auth_headers):
+        """Test that a provider failure before any output gets an error status, not a 200 stream"""
+        from app.service.circuit_breaker import CircuitOpenError
+        from app.service.providers.base import ProviderError
+        
+        def failing_stream(error):
+            def fake_stream(self, prompt, options=None):
+                raise error
+                yield
+            return fake_stream
+        
+        statuses = []
+        for error in (ProviderError('upstream failed'), CircuitOpenError('openai', 10.0)):
+            with patch('app.service.ai_service.AIService.stream_text', failing_stream(error)):
+                response = client.post(
+                    '/api/generate-text?stream=true',
+                    data=json.dumps({'prompt': 'Fail me'}),
+                    content_type='application/json',
+                    headers=auth_headers
+                )
+            statuses.append(response.status_code)
+            assert response.mimetype == 'application/json'
+        
+        assert statuses == [502, 503]
+    
+    def test_generate_texts_batch(self, client, session, test_user, auth_headers):
+        """Test batch generation with a per-item failure"""
+        from app.service.factory import AIProviderFactory
+        from app.service.providers.base import AIProvider
+        
+        class BatchProvider(AIProvider):
+            def generate_text(self, prompt, options=None):
+                if prompt == 'fail':
+                    raise RuntimeError('provider rejected prompt')
+                return f'Echo: {prompt}'
+            
+            def get_provider_name(self):
+                return 'BatchProvider'
+        
+        data = {'items': [
+            {'prompt': 'one'},
+            {'prompt': 'fail'},
+            {'prompt': 'three', 'options': {'max_tokens': 10}}
+        ]}
+        with patch.object(AIProviderFactory, 'get_provider', return_value=BatchProvider()):
+            response = client.post(
+                '/api/generate-texts',
+                data=json.dumps(data),
+                content_type='application/json',
+                headers=auth_headers
+            )
+        
+        assert response.status_code == 200
+        response_data = json.loads(response.data)
+        assert response_data['succeeded'] == 2
+        assert response_data['failed'] == 1
+        
+        results = response_data['results']
+        assert [result['status'] for result in results] == ['success', 'error', 'success']
+        assert results[0]['data']['response'] == 'Echo: one'
+        assert 'provider rejected prompt' in results[1]['error']
+        assert results[2]['data']['response'] == 'Echo: three'
+        
+        saved = session.query(GeneratedText).filter_by(user_id=test_user.id).count()
+        assert saved == 2
+    
+    def test_generate_texts_validation(self, client, auth_headers):
+        """Test that an invalid batch is rejected up front"""
+        data = {'items': [{'prompt': 'ok'}, {'prompt': ''}]}
+        response = client.post(
+            '/api/generate-texts',
+            data=json.dumps(data),
+            content_type='application/json',
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 422
+        assert 'items[1].prompt' in json.loads(response.data)['details']
+    
+    def test_generate_text_async_job(self, app, client, session, auth_headers):
+        """Test queueing a generation job and polling its status"""
+        from app.service.job_worker import job_workers
+        from app.models import GenerationJob
+        
+        session.query(GenerationJob).delete()
+        session.commit()
+        
+        response = client.post(
+            '/api/generate-text?async=true',
+            data=json.dumps({'prompt': 'Run me later'}),
+            content_type='application/json',
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 202
+        job = json.loads(response.data)
+        assert job['status'] == 'queued'
+        assert response.headers['Location'] == job['status_url']
+        
+        pending = client.get(job['status_url'], headers=auth_headers)
+        assert json.loads(pending.data)['status'] == 'queued'
+        
+        # Run the job the way a worker thread would
+        assert job_workers.run_once(app) is True
+        
+        done = client.get(job['status_url'], headers=auth_headers)
+        assert done.status_code == 200
+        done_data = json.loads(done.data)
+        assert done_data['status'] == 'succeeded'
+        assert done_data['result']['prompt'] == 'Run me later'
+        assert done_data['result']['response'] == 'This is a mocked response from OpenAI'
+    
+    def test_get_job_not_found(self, client, auth_headers):
+        """Test retrieving a job that does not exist"""
+        response = client.get('/api/jobs/does-not-exist', headers=auth_headers)
+        
+        assert response.status_code == 404
+    
+    def test_generate_text_circuit_open(self, client, auth_headers):
+        """Test that an open circuit fails fast with 503"""
+        from app.service.circuit_breaker import circuit_breakers, CircuitBreaker
+        
+        breaker = circuit_breakers.get('openai')
+        breaker.state = CircuitBreaker.OPEN
+        breaker._opened_at = breaker._clock()
+        try:
+            response = client.post(
+                '/api/generate-text',
+                data=json.dumps({'prompt': 'Fail fast'}),
+                content_type='application/json',
+                headers=auth_headers
+            )
+            status = client.get('/api/providers/status', headers=auth_headers)
+        finally:
+            breaker._transition(CircuitBreaker.CLOSED)
+        
+        assert response.status_code == 503
+        assert 'Retry-After' in response.headers
+        assert json.loads(status.data)['providers']['openai']['state'] == 'open'
+
+    def test_generate_text_rate_limited(self, client, auth_headers):
+        """Test that locally shed requests return 429 with Retry-After"""
+        from app.service.rate_limiter import RateLimitExceeded
+        
+        with patch('app.routes.api.AIService.generate_text') as mock_generate:
+            mock_generate.side_effect = RateLimitExceeded('Local rate limit reached', 4.2)
+            
+            response = client.post(
+                '/api/generate-text',
+                data=json.dumps({'prompt': 'Too many'}),
+                content_type='application/json',
+                headers=auth_headers
+            )
+        
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '5'
+
+    def test_generate_text_mock_provider(self, client, auth_headers):
+        """Test the full generate-text flow against the offline mock provider"""
+        payload = {'prompt': 'Benchmark me', 'options': {'max_tokens': 8}}
+        
+        first = client.post(
+            '/api/generate-text?provider=mock',
+            data=json.dumps(payload),
+            content_type='application/json',
+            headers=auth_headers
+        )
+        second = client.post(
+            '/api/generate-text?provider=mock',
+            data=json.dumps(payload),
+            content_type='application/json',
+            headers=auth_headers
+        )
+        
+        assert first.status_code == 201
+        assert json.loads(first.data)['provider'] == 'Mock'
+        assert json.loads(first.data)['response'] == json.loads(second.data)['response']
+
+
+class TestExport:
+    """Test the streaming bulk export"""
+    
+    @pytest.fixture
+    def texts(self, session, test_user):
+        texts = [
+            GeneratedText(user_id=test_user.id, prompt=f'Prompt {i}', response=f'Response, "{i}"\nline two')
+            for i in range(5)
+        ]
+        session.add_all(texts)
+        session.commit()
+        return texts
+    
+    def test_export_ndjson(self, client, auth_headers, texts):
+        """Test that every text is exported as one JSON object per line, oldest first"""
+        response = client.get('/api/generated-texts/export', headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == 'application/x-ndjson'
+        assert 'attachment' in response.headers['Content-Disposition']
+        
+        rows = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+        assert [row['id'] for row in rows] == [text.id for text in texts]
+        assert rows[0]['response'] == 'Response, "0"\nline two'
+        assert set(rows[0]) == {'id', 'prompt', 'response', 'provider', 'cached', 'timestamp'}
+    
+    def test_export_queries_are_logged(self, client, auth_headers, texts, caplog):
+        """Test that the request log counts statements run while the body streams"""
+        from app.utils.query_stats import query_instrumentation
+        
+        with caplog.at_level('INFO', logger='app.middleware.logging_middleware'):
+            with query_instrumentation.track() as stats:
+                response = client.get('/api/generated-texts/export', headers=auth_headers)
+                response.close()
+        
+        logged = [
+            ast.literal_eval(record.getMessage().split(': ', 1)[1])
+            for record in caplog.records
+            if record.getMessage().startswith('Request processed') and '/export' in record.getMessage()
+        ]
+        assert len(logged) == 1
+        assert logged[0]['db_queries'] == stats.count > 0
+    
+    def test_export_error_aborts_the_body(self, client, auth_headers, texts):
+        """Test that a failure mid-export is not passed off as a complete file"""
+        def failing_export(self, user_id, batch_size=1000):
+            yield from original(self, user_id, batch_size=batch_size)
+            raise RuntimeError('database went away')
+        
+        from app.repository.text_repository import TextRepository
+        original = TextRepository.iter_export
+        
+        # The rows fit in one chunk, so the error surfaces before any is sent
+        with patch.object(TextRepository, 'iter_export', failing_export):
+            with pytest.raises(RuntimeError):
+                client.get('/api/generated-texts/export', headers=auth_headers).get_data()
+    
+    def test_export_csv_gzip(self, client, auth_headers, texts):
+        """Test CSV export with gzip compression"""
+        response = client.get('/api/generated-texts/export?format=csv&gzip=true', headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'application/gzip'
+        assert response.headers['Content-Disposition'].endswith('generated-texts.csv.gz"')
+        
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.data).decode('utf-8'))))
+        assert len(rows) == len(texts)
+        assert rows[4]['prompt'] == 'Prompt 4'
+        assert rows[4]['response'] == 'Response, "4"\nline two'
+    
+    def test_export_only_own_texts(self, client, auth_headers, session, texts):
+        """Test that the export never includes another user's texts"""
+        from app.models import User
+        other = User(username='export_other')
+        other.set_password('password123')
+        session.add(other)
+        session.commit()
+        session.add(GeneratedText(user_id=other.id, prompt='Secret', response='Secret'))
+        session.commit()
+        
+        response = client.get('/api/generated-texts/export', headers=auth_headers)
+        
+        assert b'Secret' not in response.data
+        assert len(response.data.splitlines()) == len(texts)
+    
+    def test_export_invalid_format(self, client, auth_headers):
+        """Test that an unknown format is rejected before streaming starts"""
+        response = client.get('/api/generated-texts/export?format=xml', headers=auth_headers)
+        
+        assert response.status_code == 422
+        assert 'format' in json.loads(response.data)['details']
+
+
+class TestConditionalRequests:
+    """Test ETag / If-None-Match on the history endpoints"""
+    
+    @pytest.fixture
+    def text_id(self, session, test_user):
+        text = GeneratedText(user_id=test_user.id, prompt='Prompt', response='Response')
+        session.add(text)
+        session.commit()
+        return text.id
+    
+    def _get(self, client, url, auth_headers, etag=None):
+        headers = dict(auth_headers, **{'If-None-Match': etag}) if etag else auth_headers
+        return client.get(url, headers=headers)
+    
+    def test_list_not_modified_until_write(self, client, auth_headers, text_id):
+        """Test that the listing revalidates to 304 until the user's texts change"""
+        first = self._get(client, '/api/generated-texts', auth_headers)
+        etag = first.headers['ETag']
+        
+        assert first.status_code == 200
+        assert first.headers['Cache-Control'] == 'private, no-cache'
+        
+        cached = self._get(client, '/api/generated-texts', auth_headers, etag)
+        assert cached.status_code == 304
+        assert cached.data == b''
+        assert cached.headers['ETag'] == etag
+        
+        client.put(
+            f'/api/generated-text/{text_id}',
+            data=json.dumps({'prompt': 'Changed'}),
+            content_type='application/json',
+            headers=auth_headers
+        )
+        
+        changed = self._get(client, '/api/generated-texts', auth_headers, etag)
+        assert changed.status_code == 200
+        assert changed.headers['ETag'] != etag
+        assert json.loads(changed.data)[0]['prompt'] == 'Changed'
+    
+    def test_etag_depends_on_query(self, client, auth_headers, text_id):
+        """Test that each listing variant has its own ETag"""
+        etags = {
+            self._get(client, url, auth_headers).headers['ETag']
+            for url in (
+                '/api/generated-texts',
+                '/api/generated-texts?limit=5',
+                '/api/generated-texts?fields=summary'
+            )
+        }
+        
+        assert len(etags) == 3
+    
+    def test_detail_not_modified(self, client, auth_headers, text_id):
+        """Test conditional GETs of a single text, including after it is deleted"""
+        url = f'/api/generated-text/{text_id}'
+        etag = self._get(client, url, auth_headers).headers['ETag']
+        
+        assert self._get(client, url, auth_headers, etag).status_code == 304
+        
+        client.delete(url, headers=auth_headers)
+        gone = self._get(client, url, auth_headers, etag)
+        assert gone.status_code == 404
+        assert 'ETag' not in gone.headers
+
+
+class TestCompressedResponses:
+    """Test serving responses that are stored compressed"""
+    
+    LONG_RESPONSE = 'A long "quoted" response\n' * 20
+    
+    @pytest.fixture
+    def text_id(self, session, test_user, monkeypatch):
+        from app.utils.compression import response_codec
+        monkeypatch.setattr(response_codec, 'enabled', True)
+        monkeypatch.setattr(response_codec, 'min_length', 100)
+        
+        text = GeneratedText(user_id=test_user.id, prompt='Prompt', response=self.LONG_RESPONSE)
+        session.add(text)
+        session.commit()
+        assert text.response_codec == 'gzip'
+        return text.id
+    
+    def test_detail_passes_stored_gzip_through(self, client, auth_headers, text_id):
+        """Test that gzip clients get the stored bytes and others the inflated JSON"""
+        url = f'/api/generated-text/{text_id}'
+        compressed = client.get(url, headers=dict(auth_headers, **{'Accept-Encoding': 'gzip'}))
+        plain = client.get(url, headers=auth_headers)
+        
+        assert compressed.status_code == 200
+        assert compressed.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in compressed.headers['Vary']
+        assert json.loads(gzip.decompress(compressed.data)) == json.loads(plain.data)
+        assert json.loads(plain.data)['response'] == self.LONG_RESPONSE
+        assert 'Content-Encoding' not in plain.headers
+        
+        # Each encoding is its own representation
+        assert compressed.headers['ETag'] != plain.headers['ETag']
+        revalidated = client.get(url, headers=dict(
+            auth_headers, **{'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['ETag']}
+        ))
+        assert revalidated.status_code == 304
+    
+    def test_export_decodes_compressed_response(self, client, auth_headers, text_id):
+        """Test that exports carry the plain response"""
+        response = client.get('/api/generated-texts/export', headers=auth_headers)
+        
+        rows = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+        assert rows[0]['response'] == self.LONG_RESPONSE
+    
+    def test_update_and_search_compressed_response(self, client, auth_headers, text_id):
+        """Test that compressed responses can be replaced and are searchable"""
+        url = f'/api/generated-text/{text_id}'
+        client.put(
+            url,
+            data=json.dumps({'response': 'Zanzibar ' * 30}),
+            content_type='application/json',
+            headers=auth_headers
+        )
+        
+        found = client.get('/api/generated-texts?q=zanzibar', headers=auth_headers)
+        assert [item['id'] for item in json.loads(found.data)] == [text_id]
+        detail = json.loads(gzip.decompress(
+            client.get(url, headers=dict(auth_headers, **{'Accept-Encoding': 'gzip'})).data
+        ))
+        assert detail['response'] == 'Zanzibar ' * 30
+
+
+class TestDeletedUsers:
+    """Test that tokens stop working once their user is deleted"""
+    
+    def test_user_awaiting_purge_is_rejected(self, client, session, test_user, auth_headers):
+        """Test that a large user queued for purging loses access immediately"""
+        from app.repository.user_repository import UserRepository
+        user_id = test_user.id
+        session.add_all([GeneratedText(user_id=user_id, prompt=f'Prompt {i}', response='Response') for i in range(3)])
+        session.commit()
+        
+        assert client.get('/api/generated-texts', headers=auth_headers).status_code == 200
+        assert UserRepository().delete(user_id, purge_threshold=1)
+        
+        response = client.get('/api/generated-texts', headers=auth_headers)
+        assert response.status_code == 401
+        assert UserRepository().get_by_id(user_id) is None
+        
+        # Leave no queued purge behind for other tests' workers
+        from app.service.purge_worker import purge_worker
+        assert purge_worker.run_once() is True
+
+
+class TestQueryBudgets:
+    """Fail when an endpoint starts issuing more SQL round trips than it needs
+    
+    Authenticated requests all start with one lookup checking that the token's
+    user has not been deleted; every budget below includes it.
+    """
+    
+    @pytest.fixture
+    def text_id(self, session, test_user):
+        texts = [GeneratedText(user_id=test_user.id, prompt=f'Prompt {i}', response='Response') for i in range(3)]
+        session.add_all(texts)
+        session.commit()
+        return texts[0].id
+    
+    def test_list_budgets(self, client, auth_headers, text_id, query_budget):
+        """Test that every listing mode is one query, plus the version lookup for its ETag"""
+        for url, budget in (
+            ('/api/generated-texts', 3),
+            ('/api/generated-texts?limit=2', 3),
+            ('/api/generated-texts?fields=summary', 3),
+            ('/api/generated-texts/search?q=Prompt', 2)
+        ):
+            with query_budget(budget):
+                response = client.get(url, headers=auth_headers)
+            assert response.status_code == 200
+            
+            # Revalidation reads the version only
+            if 'ETag' in response.headers:
+                with query_budget(2):
+                    response = client.get(url, headers=dict(auth_headers, **{'If-None-Match': response.headers['ETag']}))
+                assert response.status_code == 304
+    
+    def test_detail_budgets(self, client, auth_headers, text_id, query_budget):
+        """Test the read, update and delete round trips for one text"""
+        with query_budget(3):
+            assert client.get(f'/api/generated-text/{text_id}', headers=auth_headers).status_code == 200
+        
+        # Writes also bump the user's texts version
+        with query_budget(3):
+            response = client.put(
+                f'/api/generated-text/{text_id}',
+                data=json.dumps({'prompt': 'Updated'}),
+                content_type='application/json',
+                headers=auth_headers
+            )
+            assert response.status_code == 200
+        
+        with query_budget(3):
+            assert client.delete(f'/api/generated-text/{text_id}', headers=auth_headers).status_code == 200
+    
+    def test_cached_detail_budget(self, client, auth_headers, text_id, query_budget, monkeypatch):
+        """Test that a cached text is served without reading its row"""
+        from app.repository.text_cache import text_cache
+        monkeypatch.setattr(text_cache, 'enabled', True)
+        monkeypatch.setattr(text_cache, 'verify_rate', 0.0)
+        text_cache.clear()
+        
+        assert client.get(f'/api/generated-text/{text_id}', headers=auth_headers).status_code == 200
+        with query_budget(2):
+            assert client.get(f'/api/generated-text/{text_id}', headers=auth_headers).status_code == 200
+        
+        metrics = json.loads(client.get('/api/metrics', headers=auth_headers).data)
+        assert metrics['text_cache']['hits'] >= 1
+        text_cache.clear()
+    
+    def test_generate_budget(self, client, auth_headers, query_budget):
+        """Test that generating a text costs an insert and a version bump"""
+        with query_budget(3):
+            response = client.post(
+                '/api/generate-text',
+                data=json.dumps({'prompt': 'Budgeted'}),
+                content_type='application/json',
+                headers=auth_headers
+            )
+        assert response.status_code == 201
+    
+    def test_register_budget(self, client, query_budget):
+        """Test that registration is a single insert, duplicates included"""
+        payload = json.dumps({'username': 'budgeted', 'password': 'Password123'})
+        with query_budget(1):
+            assert client.post('/auth/register', data=payload, content_type='application/json').status_code == 201
+        
+        with query_budget(1):
+            response = client.post(
+                '/auth/register',
+                data=json.dumps({'username': 'BUDGETED', 'password': 'Password123'}),
+                content_type='application/json'
+            )
+        assert response.status_code == 409
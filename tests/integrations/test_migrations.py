@@ -0,0 +1,182 @@
+import pytest
+import warnings
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import downgrade, stamp, upgrade
+from sqlalchemy import inspect
+from app import create_app
+from app.config import TestingConfig
+from app.models import db
+from app.repository import search
+
+
+@pytest.fixture
+def migrated_app(tmp_path):
+    """App bound to an empty SQLite file whose schema comes only from migrations"""
+
+    class MigrationConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'migrations.db'}"
+        AUTO_CREATE_TABLES = False
+
+    return create_app(MigrationConfig)
+
+
+class TestMigrations:
+    """Test the Alembic migration history"""
+
+    def test_upgrade_matches_models(self, migrated_app):
+        """Test that upgrading to head produces the schema the models declare"""
+        with migrated_app.app_context():
+            upgrade()
+
+            with db.engine.connect() as conn:
+                with warnings.catch_warnings():
+                    # SQLite cannot reflect expression indexes such as lower(username)
+                    warnings.simplefilter("ignore")
+                    context = MigrationContext.configure(
+                        conn, opts={"include_name": search.include_name}
+                    )
+                    diff = compare_metadata(context, db.metadata)
+
+            indexes = {
+                index["name"]
+                for table in ("users", "generated_texts", "generation_jobs")
+                for index in inspect(db.engine).get_indexes(table)
+            }
+
+            tables = inspect(db.engine).get_table_names()
+            texts_ddl = db.session.execute(
+                db.text("SELECT sql FROM sqlite_master WHERE name = 'generated_texts'")
+            ).scalar()
+            on_delete = {
+                table: fk["options"].get("ondelete")
+                for table in ("generated_texts", "generation_jobs")
+                for fk in inspect(db.engine).get_foreign_keys(table)
+                if fk["constrained_columns"] == ["user_id"]
+            }
+
+        assert diff == []
+        assert "AUTOINCREMENT" in texts_ddl
+        assert on_delete == {"generated_texts": "CASCADE", "generation_jobs": "CASCADE"}
+        assert "ix_generated_texts_user_id_timestamp_id" in indexes
+        assert "ix_generation_jobs_status_created_at" in indexes
+        assert search.FTS_TABLE in tables
+
+    def test_downgrade_to_base(self, migrated_app):
+        """Test that every migration can be reverted"""
+        with migrated_app.app_context():
+            upgrade()
+            downgrade(revision="base")
+
+            tables = inspect(db.engine).get_table_names()
+
+        assert tables == ["alembic_version"]
+
+    def test_stamp_baseline_and_upgrade(self, migrated_app):
+        """Test that a database created by the baseline create_all upgrades after stamping 0001"""
+        with migrated_app.app_context():
+            # The schema db.create_all() produced before migrations existed
+            db.session.execute(
+                db.text(
+                    "CREATE TABLE users (id INTEGER NOT NULL, username VARCHAR(80) NOT NULL, "
+                    "password_hash VARCHAR(128) NOT NULL, created_at DATETIME, "
+                    "PRIMARY KEY (id), UNIQUE (username))"
+                )
+            )
+            db.session.execute(
+                db.text(
+                    "CREATE TABLE generated_texts (id INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+                    "prompt TEXT NOT NULL, response TEXT NOT NULL, provider VARCHAR(50), timestamp DATETIME, "
+                    "PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id))"
+                )
+            )
+            db.session.execute(
+                db.text("INSERT INTO users (username, password_hash) VALUES ('Baseline', 'x')")
+            )
+            db.session.execute(
+                db.text(
+                    "INSERT INTO generated_texts (user_id, prompt, response, provider, timestamp) "
+                    "VALUES (1, 'p', 'an old answer', 'openai', '2026-01-01 00:00:00')"
+                )
+            )
+            db.session.commit()
+
+            stamp(revision="0001")
+            upgrade()
+
+            row = db.session.execute(
+                db.text("SELECT id, response, cached FROM generated_texts")
+            ).one()
+            username = db.session.execute(
+                db.text("SELECT username_normalized FROM users")
+            ).scalar()
+            matches = db.session.execute(
+                db.text(f"SELECT rowid FROM {search.FTS_TABLE} WHERE {search.FTS_TABLE} MATCH 'old'")
+            ).all()
+            tables = inspect(db.engine).get_table_names()
+
+        assert tuple(row) == (1, "an old answer", 0)
+        assert username == "baseline"
+        assert len(matches) == 1
+        assert "generation_jobs" in tables
+
+    def test_username_normalized_backfill(self, migrated_app):
+        """Test that existing users get a normalized username on upgrade"""
+        with migrated_app.app_context():
+            upgrade(revision="0005")
+            db.session.execute(
+                db.text(
+                    "INSERT INTO users (username, password_hash) VALUES ('MixedCase', 'x')"
+                )
+            )
+            db.session.commit()
+
+            upgrade()
+            normalized = db.session.execute(
+                db.text("SELECT username_normalized FROM users")
+            ).scalar()
+
+        assert normalized == "mixedcase"
+
+    def test_compressed_responses_backfill(self, migrated_app):
+        """Test that long responses are compressed on upgrade and restored on downgrade"""
+        migrated_app.config["RESPONSE_COMPRESSION_ENABLED"] = True
+        migrated_app.config["RESPONSE_COMPRESSION_MIN_LENGTH"] = 10
+
+        with migrated_app.app_context():
+            upgrade(revision="0009")
+            db.session.execute(
+                db.text(
+                    "INSERT INTO users (username, username_normalized, password_hash) "
+                    "VALUES ('u', 'u', 'x')"
+                )
+            )
+            db.session.execute(
+                db.text(
+                    "INSERT INTO generated_texts (user_id, prompt, response, cached, timestamp) "
+                    "VALUES (1, 'p', 'a rather long answer', 0, '2026-01-01 00:00:00')"
+                )
+            )
+            db.session.commit()
+
+            upgrade()
+            upgraded = db.session.execute(
+                db.text("SELECT response, response_codec FROM generated_texts")
+            ).one()
+            matches = db.session.execute(
+                db.text(f"SELECT rowid FROM {search.FTS_TABLE} WHERE {search.FTS_TABLE} MATCH 'user_id : 1 AND rather'")
+            ).all()
+            db.session.commit()
+
+            downgrade(revision="0009")
+            restored = db.session.execute(
+                db.text("SELECT response FROM generated_texts")
+            ).scalar()
+            # Fails if the index disagrees with the (now plain) table
+            db.session.execute(
+                db.text(f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}) VALUES ('integrity-check')")
+            )
+
+        assert tuple(upgraded) == ("", "gzip")
+        assert len(matches) == 1
+        assert restored == "a rather long answer"
@@ -0,0 +1,171 @@
+import pytest
+import time
+from app import create_app
+from app.config import TestingConfig
+from app.models import db, GeneratedText, User
+from app.repository.routing import replica_router
+from app.repository.text_repository import TextRepository
+from app.repository.user_repository import UserRepository
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def replica_app(app, tmp_path):
+    """App with a primary and a replica SQLite file; the replica starts as a copy"""
+
+    class ReplicaConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        SQLALCHEMY_BINDS = {"replica": f"sqlite:///{tmp_path / 'replica.db'}"}
+        REPLICA_READ_YOUR_WRITES_SECONDS = 5
+
+    replica_app = create_app(ReplicaConfig)
+    with replica_app.app_context():
+        sync_replica(replica_app)
+        yield replica_app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+    # Flask-SQLAlchemy registers an (empty) metadata per bind key on the shared
+    # db object; the session-wide test app has no replica bind to match it
+    db.metadatas.pop("replica", None)
+
+    # Put the shared router back to the test app's (primary-only) settings
+    replica_router.clock = time.monotonic
+    replica_router.init_app(app)
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    replica_router.clock = fake
+    return fake
+
+
+def sync_replica(app):
+    """Stand-in for replication: copy the primary onto the replica"""
+    result = app.test_cli_runner().invoke(args=["sync-replica"])
+    assert result.exit_code == 0, result.output
+
+
+def new_request():
+    """Drop the identity map, as happens between requests"""
+    db.session.remove()
+
+
+class TestReplicaRouting:
+    """Test that repository reads go to the replica and writes to the primary"""
+
+    @pytest.fixture
+    def user(self, replica_app):
+        user = User(username="replica_user")
+        user.set_password("password123")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        new_request()
+        return user_id
+
+    def test_reads_use_replica(self, replica_app, user, clock):
+        """Test that a row written straight to the primary is invisible until replicated"""
+        text = GeneratedText(user_id=user, prompt="Prompt", response="Response")
+        db.session.add(text)
+        db.session.commit()
+        text_id = text.id
+        new_request()
+
+        repo = TextRepository()
+        assert repo.get_by_id_and_user(text_id, user) is None
+        assert repo.get_all_by_user_id(user) == []
+
+        sync_replica(replica_app)
+        new_request()
+
+        assert repo.get_by_id_and_user(text_id, user).prompt == "Prompt"
+        assert len(repo.get_all_by_user_id(user)) == 1
+        assert replica_router.stats()["replica_reads"] >= 4
+
+    def test_read_your_writes_window(self, replica_app, user, clock):
+        """Test that a user's reads use the primary right after they write"""
+        repo = TextRepository()
+        text = repo.create(user, "Prompt", "Response")
+        new_request()
+
+        # Not replicated yet, but the writer still sees it
+        assert repo.get_by_id_and_user(text.id, user).prompt == "Prompt"
+        assert [t.id for t, _ in repo.search(user, "Prompt")] == [text.id]
+
+        # Other users keep reading from the replica
+        assert replica_router.read_bind(user + 1) != {}
+
+        # Once the window passes, reads go back to the (lagging) replica
+        clock.now += 6
+        new_request()
+        assert repo.get_by_id_and_user(text.id, user) is None
+
+        sync_replica(replica_app)
+        new_request()
+        assert repo.get_by_id_and_user(text.id, user).prompt == "Prompt"
+
+    def test_writes_go_to_primary(self, replica_app, user, clock):
+        """Test that updates and deletes land on the primary"""
+        repo = TextRepository()
+        text = repo.create(user, "Prompt", "Response")
+        sync_replica(replica_app)
+        clock.now += 6
+        new_request()
+
+        updated = repo.update_returning(text.id, user, prompt="Updated")
+        assert updated.prompt == "Updated"
+        new_request()
+        assert repo.get_by_id_and_user(text.id, user).prompt == "Updated"
+
+        assert repo.delete(text.id, user) is True
+        new_request()
+        assert repo.get_by_id_and_user(text.id, user) is None
+
+    def test_text_cache_fills_from_primary(self, replica_app, user, clock, monkeypatch):
+        """Test that cache misses read the primary, so a lagging replica is never cached"""
+        from app.repository.text_cache import text_cache
+
+        monkeypatch.setattr(text_cache, "enabled", True)
+        monkeypatch.setattr(text_cache, "verify_rate", 0.0)
+        text_cache.clear()
+
+        text = GeneratedText(user_id=user, prompt="Prompt", response="Response")
+        db.session.add(text)
+        db.session.commit()
+        text_id = text.id
+        new_request()
+
+        repo = TextRepository()
+        assert repo.get_by_id_and_user(text_id, user) is None
+        assert repo.get_serialized(text_id, user)["prompt"] == "Prompt"
+        assert text_cache.store.get(user, text_id) is not None
+        text_cache.clear()
+
+    def test_username_lookup_falls_back_to_primary(self, replica_app, clock):
+        """Test that a user registered moments ago can log in before replication"""
+        repo = UserRepository()
+        user = repo.create("FreshUser", "Password123")
+        assert user is not None
+        new_request()
+
+        found = repo.get_by_username("freshuser")
+        assert found is not None
+        assert found.username == "FreshUser"
+        assert replica_router.stats()["fallbacks"] == 1
+
+        assert repo.get_by_username("nobody") is None
+
+    def test_disabled_without_replica_bind(self, app):
+        """Test that reads use the default bind when no replica is configured"""
+        assert replica_router.enabled is False
+        assert replica_router.read_bind(1) == {}
@@ -1,8 +1,25 @@
 import pytest
+import asyncio
+import threading
+import httpx
 from unittest.mock import MagicMock, patch
 from app.service.ai_service import AIService
 from app.service.providers.base import AIProvider
 from app.service.factory import AIProviderFactory
+from app.service.cache import ResponseCache
+from app.service.coalescing import SingleFlight, CoalescedTimeout
+from app.service.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+)
+from app.service.providers.http_pool import AsyncHTTPPool
+from app.service.providers.mock_provider import MockProvider as LoadTestProvider
+from app.service.providers.base import ProviderError
+from app.service.rate_limiter import RateLimiter, RateLimitExceeded, TokenBucket
+from app.service.retry import RetryPolicy
+from app.utils.cache import LRUCache
+from app.utils.query_stats import QueryStats, QueryInstrumentation, parameters_shape
 
 
 class MockProvider(AIProvider):
@@ -65,6 +82,79 @@ class TestAIProviderFactory:
                 assert provider is mock_provider
 
 
+class TestProviderPool:
+    """Test pooling of provider instances in the factory"""
+
+    def setup_method(self):
+        AIProviderFactory.invalidate()
+
+    def teardown_method(self):
+        AIProviderFactory.invalidate()
+
+    def test_same_config_reuses_instance(self):
+        """Test that identical configurations share one provider"""
+        first = AIProviderFactory.get_provider("openai", api_key="k1", model="m1")
+        second = AIProviderFactory.get_provider("OpenAI", api_key="k1", model="m1")
+
+        assert first is second
+
+    def test_different_config_builds_new_instance(self):
+        """Test that the pool is keyed by model and api key"""
+        base = AIProviderFactory.get_provider("openai", api_key="k1", model="m1")
+        other_key = AIProviderFactory.get_provider("openai", api_key="k2", model="m1")
+        other_model = AIProviderFactory.get_provider("openai", api_key="k1", model="m2")
+
+        assert base is not other_key
+        assert base is not other_model
+        assert other_key.api_key == "k2"
+        assert other_model.model == "m2"
+
+    def test_invalidate_specific_config(self):
+        """Test that invalidating one configuration leaves the others pooled"""
+        first = AIProviderFactory.get_provider("openai", api_key="k1", model="m1")
+        kept = AIProviderFactory.get_provider("openai", api_key="k2", model="m1")
+
+        removed = AIProviderFactory.invalidate("openai", api_key="k1", model="m1")
+
+        assert removed == 1
+        assert AIProviderFactory.get_provider("openai", api_key="k1", model="m1") is not first
+        assert AIProviderFactory.get_provider("openai", api_key="k2", model="m1") is kept
+
+    def test_invalidate_provider(self):
+        """Test that invalidating by name drops every instance of that provider"""
+        AIProviderFactory.get_provider("openai", api_key="k1", model="m1")
+        AIProviderFactory.get_provider("openai", api_key="k2", model="m1")
+
+        assert AIProviderFactory.invalidate("openai") == 2
+
+    def test_provider_options_from_config(self):
+        """Test reading provider options from app config"""
+        config = {"OPENAI_API_KEY": "sk-test", "OPENAI_MODEL": "gpt-test"}
+
+        options = AIProviderFactory.provider_options(config, "openai")
+
+        assert options == {"api_key": "sk-test", "model": "gpt-test"}
+
+    def test_init_app_preloads_default_provider(self):
+        """Test that init_app builds the default provider up front"""
+        app = MagicMock()
+        app.config = {
+            "DEFAULT_AI_PROVIDER": "openai",
+            "OPENAI_API_KEY": "sk-boot",
+            "OPENAI_MODEL": "gpt-boot",
+        }
+
+        AIProviderFactory.init_app(app)
+
+        with patch.object(AIProviderFactory, "create_provider") as mock_create:
+            provider = AIProviderFactory.get_provider(
+                "openai", api_key="sk-boot", model="gpt-boot"
+            )
+            mock_create.assert_not_called()
+
+        assert provider.model == "gpt-boot"
+
+
 class TestAIService:
     """Test the AI Service"""
 
@@ -136,3 +226,651 @@ class TestAIService:
             assert mock_provider.last_prompt == "Generate with options"
             assert mock_provider.last_options.get("temperature") == 0.8
             assert mock_provider.last_options.get("max_tokens") == 500
+
+
+class TestResponseCache:
+    """Test the LRU+TTL response cache"""
+
+    def test_lru_eviction_respects_byte_budget(self):
+        """Test that least recently used entries are evicted first"""
+        cache = LRUCache(max_bytes=25, ttl=60)
+        cache.set("a", "x" * 9)
+        cache.set("b", "y" * 9)
+        cache.get("a")
+        cache.set("c", "z" * 9)
+
+        assert cache.get("a") == "x" * 9
+        assert cache.get("b") is None
+        assert cache.get("c") == "z" * 9
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] <= 25
+
+    def test_entries_expire_after_ttl(self):
+        """Test that entries are dropped once their TTL has passed"""
+        now = [100.0]
+        cache = LRUCache(max_bytes=1024, ttl=10, clock=lambda: now[0])
+        cache.set("key", "value")
+
+        now[0] += 11
+
+        assert cache.get("key") is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_prompt_normalization_shares_key(self):
+        """Test that whitespace differences map to the same key"""
+        key1 = ResponseCache.make_key("openai", "m", "Hello   world ", {"temperature": 0})
+        key2 = ResponseCache.make_key("openai", "m", " Hello world", {"temperature": 0})
+        key3 = ResponseCache.make_key("openai", "m", "Hello world", {"temperature": 0.5})
+
+        assert key1 == key2
+        assert key1 != key3
+
+    def test_service_serves_repeat_from_cache(self):
+        """Test that a repeated deterministic prompt skips the provider"""
+        mock_provider = MockProvider("Cached response")
+        cache = ResponseCache(enabled=True)
+
+        with patch.object(
+            AIProviderFactory, "get_provider", return_value=mock_provider
+        ):
+            service = AIService(cache=cache)
+            first = service.generate_text("Same prompt", {"temperature": 0})
+            assert service.last_from_cache is False
+
+            mock_provider.generate_text_called = False
+            second = service.generate_text("Same prompt", {"temperature": 0})
+
+        assert first == second == "Cached response"
+        assert service.last_from_cache is True
+        assert mock_provider.generate_text_called is False
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_sampled_requests_require_opt_in(self):
+        """Test that temperature > 0 bypasses the cache unless opted in"""
+        mock_provider = MockProvider("Sampled response")
+        cache = ResponseCache(enabled=True)
+
+        with patch.object(
+            AIProviderFactory, "get_provider", return_value=mock_provider
+        ):
+            service = AIService(cache=cache)
+            service.generate_text("Prompt", {"temperature": 0.7})
+            service.generate_text("Prompt", {"temperature": 0.7})
+            assert service.last_from_cache is False
+
+            service.generate_text("Prompt", {"temperature": 0.7, "cache": True})
+            service.generate_text("Prompt", {"temperature": 0.7, "cache": True})
+            assert service.last_from_cache is True
+
+        assert "cache" not in mock_provider.last_options
+
+
+class TestSingleFlight:
+    """Test coalescing of identical in-flight requests"""
+
+    def _run_concurrently(self, flight, fn, count, timeout=None):
+        results = [None] * count
+        errors = [None] * count
+
+        def worker(index):
+            try:
+                results[index] = flight.do("key", fn, timeout=timeout)
+            except Exception as e:
+                errors[index] = e
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def _wait_for_waiters(self, flight, count):
+        for _ in range(200):
+            if flight.coalesced >= count:
+                return
+            threading.Event().wait(0.01)
+
+    def test_waiters_share_leader_result(self):
+        """Test that identical concurrent calls make one upstream call"""
+        flight = SingleFlight(enabled=True)
+        release = threading.Event()
+        calls = []
+
+        def generate():
+            calls.append(1)
+            release.wait(5)
+            return "shared response"
+
+        threads, results, errors = self._run_concurrently(flight, generate, 5)
+        self._wait_for_waiters(flight, 4)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert len(calls) == 1
+        assert errors == [None] * 5
+        assert [result for result, _ in results] == ["shared response"] * 5
+        assert sorted(shared for _, shared in results) == [False] + [True] * 4
+        assert flight.in_flight() == 0
+
+    def test_errors_fan_out_to_waiters(self):
+        """Test that a leader failure is raised to every waiter"""
+        flight = SingleFlight(enabled=True)
+        release = threading.Event()
+
+        def generate():
+            release.wait(5)
+            raise RuntimeError("upstream failed")
+
+        threads, results, errors = self._run_concurrently(flight, generate, 3)
+        self._wait_for_waiters(flight, 2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert all(isinstance(error, RuntimeError) for error in errors)
+        assert flight.in_flight() == 0
+
+    def test_waiter_timeout(self):
+        """Test that waiters give up after the wait timeout"""
+        flight = SingleFlight(enabled=True)
+        release = threading.Event()
+
+        def generate():
+            release.wait(5)
+            return "late"
+
+        threads, results, errors = self._run_concurrently(
+            flight, generate, 2, timeout=0.05
+        )
+        self._wait_for_waiters(flight, 1)
+        threads[1].join(5)
+        release.set()
+        threads[0].join(5)
+
+        assert sum(isinstance(error, CoalescedTimeout) for error in errors) == 1
+        assert flight.stats()["timeouts"] == 1
+
+    def test_disabled_runs_every_call(self):
+        """Test that coalescing is a pass-through when disabled"""
+        flight = SingleFlight(enabled=False)
+
+        assert flight.do("key", lambda: "direct") == ("direct", False)
+        assert flight.stats()["leaders"] == 0
+
+
+class TestStreaming:
+    """Test streaming generation"""
+
+    def test_openai_stream_yields_deltas(self, monkeypatch):
+        """Test that OpenAI stream chunks are forwarded as they arrive"""
+        from app.service.providers import openai_provider
+
+        chunks = [
+            {"choices": [{"delta": {"role": "assistant"}}]},
+            {"choices": [{"delta": {"content": "Hel"}}]},
+            {"choices": [{"delta": {"content": "lo"}}]},
+        ]
+        calls = []
+
+        def create(**kwargs):
+            calls.append(kwargs)
+            return iter(chunks)
+
+        monkeypatch.setattr(openai_provider.openai.ChatCompletion, "create", create)
+        provider = openai_provider.OpenAIProvider(api_key="sk-test", model="m")
+
+        assert list(provider.stream_with_logging("Hi")) == ["Hel", "lo"]
+        assert calls[0]["stream"] is True
+
+    def test_default_stream_yields_whole_response(self):
+        """Test the fallback for providers without native streaming"""
+        provider = MockProvider("Whole response")
+
+        assert list(provider.stream_with_logging("Hi")) == ["Whole response"]
+
+    def test_service_stream_populates_cache(self):
+        """Test that a completed stream is cached for later requests"""
+        mock_provider = MockProvider("Streamed")
+        cache = ResponseCache(enabled=True)
+
+        with patch.object(
+            AIProviderFactory, "get_provider", return_value=mock_provider
+        ):
+            service = AIService(cache=cache)
+            assert list(service.stream_text("Prompt", {"temperature": 0})) == ["Streamed"]
+            assert service.generate_text("Prompt", {"temperature": 0}) == "Streamed"
+
+        assert service.last_from_cache is True
+
+
+    def test_service_stream_disconnect_is_not_a_success(self):
+        """Test that closing a stream early records nothing on the circuit breaker"""
+        class ChunkedProvider(MockProvider):
+            def stream_text(self, prompt, options=None):
+                yield "first"
+                yield "second"
+
+        registry = CircuitBreakerRegistry()
+
+        with patch.object(AIProviderFactory, "get_provider", return_value=ChunkedProvider()):
+            service = AIService(
+                provider_name="primary", cache=ResponseCache(enabled=False), breakers=registry
+            )
+            stream = service.stream_text("Hello")
+            assert next(stream) == "first"
+            stream.close()
+
+        assert len(registry.get("primary")._window) == 0
+
+class TestAsyncProviders:
+    """Test the async provider contract"""
+
+    @pytest.fixture
+    def mock_pool(self, monkeypatch):
+        """Route the shared HTTP pool through a mock transport"""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(
+                200, json={"choices": [{"message": {"content": "Async response"}}]}
+            )
+
+        pool = AsyncHTTPPool(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr("app.service.providers.openai_provider.http_pool", pool)
+        yield pool, requests
+        pool.close()
+
+    def test_openai_agenerate_text(self, mock_pool):
+        """Test that the async OpenAI call posts a chat completion"""
+        from app.service.providers.openai_provider import OpenAIProvider
+
+        pool, requests = mock_pool
+        provider = OpenAIProvider(
+            api_key="sk-async", model="gpt-test", api_base="https://llm.test/v1"
+        )
+
+        response = pool.run(provider.agenerate_with_logging("Hi", {"max_tokens": 5}))
+
+        assert response == "Async response"
+        assert str(requests[0].url) == "https://llm.test/v1/chat/completions"
+        assert requests[0].headers["Authorization"] == "Bearer sk-async"
+
+    def test_pool_reuses_client_across_calls(self, mock_pool):
+        """Test that calls on the pool loop share one keep-alive client"""
+        from app.service.providers.openai_provider import OpenAIProvider
+
+        pool, requests = mock_pool
+        provider = OpenAIProvider(api_key="sk-async", model="gpt-test")
+
+        async def generate_many():
+            results = await asyncio.gather(
+                *(provider.agenerate_text(f"Prompt {i}") for i in range(10))
+            )
+            return results, pool.get_client()
+
+        results, client = pool.run(generate_many())
+        _, same_client = pool.run(generate_many())
+
+        assert results == ["Async response"] * 10
+        assert client is same_client
+        assert len(requests) == 20
+
+    def test_default_async_runs_sync_provider(self):
+        """Test the thread fallback for providers without an async client"""
+        provider = MockProvider("Threaded response")
+
+        assert asyncio.run(provider.agenerate_with_logging("Hi")) == "Threaded response"
+        assert provider.generate_text_called
+
+
+class TestCircuitBreaker:
+    """Test the provider circuit breaker and failover"""
+
+    def _breaker(self, now, **kwargs):
+        settings = dict(
+            window_size=4,
+            minimum_calls=4,
+            failure_rate_threshold=0.5,
+            slow_call_duration=5.0,
+            slow_call_rate_threshold=0.75,
+            open_duration=30.0,
+        )
+        settings.update(kwargs)
+        return CircuitBreaker("openai", clock=lambda: now[0], **settings)
+
+    def test_opens_on_error_rate(self):
+        """Test that the circuit opens once the failure rate crosses the threshold"""
+        now = [0.0]
+        breaker = self._breaker(now)
+
+        breaker.record_success(0.1)
+        breaker.record_success(0.1)
+        breaker.record_failure(0.1)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+        breaker.record_failure(0.1)
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow_request() is False
+
+    def test_opens_on_slow_calls(self):
+        """Test that latency alone can open the circuit"""
+        now = [0.0]
+        breaker = self._breaker(now)
+
+        for _ in range(3):
+            breaker.record_success(6.0)
+        breaker.record_success(0.1)
+
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_half_open_trial(self):
+        """Test that a successful trial after the open period closes the circuit"""
+        now = [0.0]
+        breaker = self._breaker(now)
+        for _ in range(4):
+            breaker.record_failure(0.1)
+
+        now[0] = 31.0
+        assert breaker.allow_request() is True
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        # Only one trial call at a time
+        assert breaker.allow_request() is False
+
+        breaker.record_success(0.1)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_trial_reopens(self):
+        """Test that a failed half-open trial re-opens the circuit"""
+        now = [0.0]
+        breaker = self._breaker(now)
+        for _ in range(4):
+            breaker.record_failure(0.1)
+
+        now[0] = 31.0
+        breaker.allow_request()
+        breaker.record_failure(0.1)
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.retry_after() == 30.0
+
+    def test_service_fails_over_when_open(self):
+        """Test that AIService uses the backup provider while the circuit is open"""
+        primary = MockProvider("Primary")
+        backup = MockProvider("Backup")
+        registry = CircuitBreakerRegistry()
+        registry.fallback_provider = "backup"
+        registry.get("primary").state = CircuitBreaker.OPEN
+        registry.get("primary")._opened_at = float("inf")
+
+        def get_provider(name, **kwargs):
+            return backup if name == "backup" else primary
+
+        with patch.object(AIProviderFactory, "get_provider", side_effect=get_provider):
+            service = AIService(provider_name="primary", breakers=registry)
+            response = service.generate_text("Hello")
+
+        assert response == "Backup"
+        assert service.served_by is backup
+        assert primary.generate_text_called is False
+
+    def test_service_fails_fast_without_fallback(self):
+        """Test that an open circuit with no backup raises immediately"""
+        primary = MockProvider("Primary")
+        registry = CircuitBreakerRegistry()
+        registry.get("primary").state = CircuitBreaker.OPEN
+        registry.get("primary")._opened_at = float("inf")
+
+        with patch.object(AIProviderFactory, "get_provider", return_value=primary):
+            service = AIService(provider_name="primary", breakers=registry)
+            with pytest.raises(CircuitOpenError):
+                service.generate_text("Hello")
+
+        assert primary.generate_text_called is False
+
+
+class TestRateLimiter:
+    """Tests for the client-side token bucket limiter"""
+
+    def test_bucket_reports_wait_when_in_debt(self):
+        """Test that reserving past capacity returns the time to refill"""
+        now = [0.0]
+        bucket = TokenBucket(60, 1.0, clock=lambda: now[0])
+
+        assert bucket.reserve(60) == 0.0
+        assert bucket.reserve(2) == 2.0
+
+        now[0] = 5.0
+        assert bucket.reserve(1) == 0.0
+
+    def test_limiter_queues_within_max_wait(self):
+        """Test that requests over the per-minute quota wait for capacity"""
+        now = [0.0]
+        limiter = RateLimiter(
+            requests_per_minute=2, tokens_per_minute=1000, clock=lambda: now[0]
+        )
+
+        assert limiter.reserve(10) == 0.0
+        assert limiter.reserve(10) == 0.0
+        assert limiter.reserve(10) == 30.0
+        assert limiter.stats()["waits"] == 1
+        assert limiter.stats()["wait_seconds"] == 30.0
+
+    def test_limiter_sheds_past_max_wait(self):
+        """Test that load beyond the queue budget is shed and refunded"""
+        now = [0.0]
+        limiter = RateLimiter(tokens_per_minute=600, max_wait=5, clock=lambda: now[0])
+
+        limiter.reserve(600)
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            limiter.reserve(100)
+
+        assert exc_info.value.retry_after == 10.0
+        assert limiter.stats()["shed"] == 1
+
+        # The shed reservation did not push later callers further back
+        now[0] = 5.0
+        assert limiter.reserve(50) == 0.0
+
+    def test_shed_call_does_not_trip_breaker(self):
+        """Test that a locally shed call is not recorded as a provider failure"""
+        provider = MockProvider()
+        provider.generate_text = MagicMock(side_effect=RateLimitExceeded("busy", 1.0))
+        registry = CircuitBreakerRegistry()
+
+        with patch.object(AIProviderFactory, "get_provider", return_value=provider):
+            service = AIService(provider_name="mock", breakers=registry)
+            with pytest.raises(RateLimitExceeded):
+                service.generate_text("Hello")
+
+        assert registry.get("mock").snapshot()["calls_in_window"] == 0
+
+
+class TestRetryPolicy:
+    """Tests for exponential backoff retries"""
+
+    def _policy(self, now, **kwargs):
+        def sleep(seconds):
+            now[0] += seconds
+
+        return RetryPolicy(clock=lambda: now[0], sleep=sleep, **kwargs)
+
+    def test_retries_until_success(self):
+        """Test that retryable errors are retried and counted"""
+        now = [0.0]
+        policy = self._policy(now)
+        fn = MagicMock(side_effect=[TimeoutError(), TimeoutError(), "ok"])
+
+        assert policy.call(fn, lambda e: isinstance(e, TimeoutError)) == "ok"
+        assert fn.call_count == 3
+        assert policy.stats()["retries"] == 2
+
+    def test_does_not_retry_other_errors(self):
+        """Test that non-retryable errors are raised immediately"""
+        policy = self._policy([0.0])
+        fn = MagicMock(side_effect=ValueError("bad request"))
+
+        with pytest.raises(ValueError):
+            policy.call(fn, lambda e: isinstance(e, TimeoutError))
+        assert fn.call_count == 1
+
+    def test_stops_at_deadline(self):
+        """Test that no retry starts once the deadline would be exceeded"""
+        now = [0.0]
+        policy = self._policy(now, max_attempts=10, deadline=5.0)
+        fn = MagicMock(side_effect=TimeoutError())
+
+        with pytest.raises(TimeoutError):
+            policy.call(fn, lambda e: True, retry_after=lambda e: 2.0)
+
+        assert fn.call_count == 3
+        assert now[0] == 4.0
+        assert policy.stats()["exhausted"] == 1
+
+    def test_openai_provider_retries_rate_limit(self, monkeypatch):
+        """Test that OpenAIProvider retries a 429 from the API"""
+        from openai import error as openai_error
+        from app.service.providers import openai_provider
+        from app.service.providers.openai_provider import OpenAIProvider
+
+        create = MagicMock(
+            side_effect=[
+                openai_error.RateLimitError("slow down", http_status=429),
+                {"choices": [{"message": {"content": "Retried"}}]},
+            ]
+        )
+        monkeypatch.setattr(openai_provider.openai.ChatCompletion, "create", create)
+        monkeypatch.setattr(openai_provider.retry_policy, "_sleep", lambda s: None)
+
+        provider = OpenAIProvider(api_key="test-key")
+        assert provider.generate_text("Hello") == "Retried"
+        assert create.call_count == 2
+
+
+class TestMockProvider:
+    """Tests for the offline load-testing provider"""
+
+    def test_text_is_deterministic(self):
+        """Test that the same request always produces the same text"""
+        first = LoadTestProvider(seed=1).generate_text("Hello", {"max_tokens": 10})
+        second = LoadTestProvider(seed=2).generate_text("Hello", {"max_tokens": 10})
+        other = LoadTestProvider().generate_text("Goodbye", {"max_tokens": 10})
+
+        assert first == second
+        assert first != other
+        assert len(first.split()) == 10
+
+    def test_stream_matches_generate(self):
+        """Test that streamed chunks join to the non-streamed text"""
+        provider = LoadTestProvider(tokens_per_second=0)
+        chunks = list(provider.stream_text("Stream me"))
+
+        assert len(chunks) == provider.response_tokens
+        assert "".join(chunks) == provider.generate_text("Stream me")
+
+    def test_latency_distributions(self):
+        """Test that sampled latencies follow the configured distribution"""
+        fixed = LoadTestProvider(latency="fixed", latency_ms=200)
+        long_tail = LoadTestProvider(
+            latency="long_tail", latency_ms=100, tail_sigma=1.5, seed=7
+        )
+        samples = sorted(long_tail._sample_latency() for _ in range(1000))
+
+        assert fixed._sample_latency() == 0.2
+        assert 0.07 < samples[500] < 0.14
+        assert samples[990] > 5 * samples[500]
+
+        with pytest.raises(ValueError):
+            LoadTestProvider(latency="uniform")
+
+    def test_injected_errors(self, monkeypatch):
+        """Test that injected 5xx errors surface as ProviderError after retries"""
+        from app.service.providers import mock_provider
+
+        monkeypatch.setattr(mock_provider.retry_policy, "_sleep", lambda s: None)
+        provider = LoadTestProvider(error_rate=1.0)
+
+        with pytest.raises(ProviderError):
+            provider.generate_text("Hello")
+
+    def test_injected_rate_limits_are_retried(self, monkeypatch):
+        """Test that a simulated 429 is retried using its Retry-After hint"""
+        from app.service.providers import mock_provider
+
+        delays = []
+        monkeypatch.setattr(mock_provider.retry_policy, "_sleep", delays.append)
+        provider = LoadTestProvider(rate_limit_rate=0.5, seed=3)
+        rolls = iter([0.1, 0.9])
+        monkeypatch.setattr(provider._random, "random", lambda: next(rolls))
+
+        assert provider.generate_text("Hello")
+        assert delays == [1.0]
+
+    def test_factory_reads_mock_config(self):
+        """Test that mock settings are passed through from app config"""
+        options = AIProviderFactory.provider_options(
+            {"MOCK_LATENCY_DISTRIBUTION": "normal", "MOCK_ERROR_RATE": 0.1}, "mock"
+        )
+
+        assert options["latency"] == "normal"
+        assert options["error_rate"] == 0.1
+        assert "latency" not in AIProviderFactory.provider_options({}, "openai")
+
+
+class TestQueryStats:
+    """Tests for per-request SQL instrumentation"""
+
+    def test_parameters_shape_hides_values(self):
+        """Test that only parameter types are reported"""
+        assert parameters_shape((1, "secret", None)) == ["int", "str", "NoneType"]
+        assert parameters_shape({"password": "hunter2"}) == {"password": "str"}
+        assert parameters_shape([(1, "a"), (2, "b")]) == "2 x ['int', 'str']"
+
+    def test_flags_slow_and_repeated_statements(self):
+        """Test slow statement capture and N+1 detection"""
+        stats = QueryStats(slow_threshold=0.05, repeat_threshold=3)
+        for user_id in range(3):
+            stats.record("SELECT * FROM users WHERE id = ?", (user_id,), 0.001)
+        stats.record("UPDATE users SET name = ?", ("x",), 0.2)
+
+        assert stats.count == 4
+        assert stats.repeated() == {"SELECT * FROM users WHERE id = ?": 3}
+        assert stats.slow == [
+            {
+                "statement": "UPDATE users SET name = ?",
+                "parameters": ["str"],
+                "duration_ms": 200.0,
+            }
+        ]
+
+    def test_tracking_counts_engine_queries(self, app, db):
+        """Test that nested tracking blocks both see the statements"""
+        instrumentation = QueryInstrumentation()
+        instrumentation.init_app(app)
+
+        with instrumentation.track() as outer:
+            db.session.execute(db.text("SELECT 1"))
+            with instrumentation.track() as inner:
+                db.session.execute(db.text("SELECT 2"))
+        db.session.execute(db.text("SELECT 3"))
+        db.session.rollback()
+
+        assert outer.count == 2
+        assert inner.count == 1
+
+    def test_failed_statement_is_not_timed_into_the_next(self, app, db):
+        """Test that a statement that raises leaves no start time behind"""
+        instrumentation = QueryInstrumentation()
+        instrumentation.init_app(app)
+
+        with instrumentation.track() as stats:
+            with pytest.raises(Exception):
+                db.session.execute(db.text("SELECT * FROM no_such_table"))
+            connection_info = db.session.connection().info
+            db.session.rollback()
+            db.session.execute(db.text("SELECT 1"))
+        db.session.rollback()
+
+        assert stats.count == 1
+        assert "query_start_time" not in connection_info
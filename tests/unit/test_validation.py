@@ -297,3 +297,77 @@ class TestTextValidator:
             TextValidator.validate_update_text(data)
         
         assert 'prompt' in excinfo.value.errors
+    
+    def test_validate_generate_texts_valid(self):
+        """Test validation of a valid batch"""
+        data = {'items': [
+            {'prompt': 'First prompt'},
+            {'prompt': 'Second prompt', 'options': {'temperature': 0}}
+        ]}
+        assert TextValidator.validate_generate_texts(data) is True
+    
+    def test_validate_generate_texts_invalid(self):
+        """Test that batch errors are reported per item"""
+        # Missing items
+        with pytest.raises(ValidationError) as excinfo:
+            TextValidator.validate_generate_texts({'other': []})
+        
+        assert 'items' in excinfo.value.errors
+        
+        # Bad entries
+        data = {'items': [
+            {'prompt': 'Fine'},
+            {'prompt': ''},
+            'not an object',
+            {'prompt': 'Hot', 'options': {'temperature': 2}}
+        ]}
+        with pytest.raises(ValidationError) as excinfo:
+            TextValidator.validate_generate_texts(data)
+        
+        assert set(excinfo.value.errors) == {
+            'items[1].prompt', 'items[2]', 'items[3].options.temperature'
+        }
+        
+        # Too many items
+        data = {'items': [{'prompt': 'p'}] * (TextValidator.MAX_BATCH_SIZE + 1)}
+        with pytest.raises(ValidationError) as excinfo:
+            TextValidator.validate_generate_texts(data)
+        
+        assert 'items' in excinfo.value.errors
+    
+    def test_validate_list_params(self):
+        """Test validating pagination query parameters"""
+        from datetime import datetime
+        from app.utils.pagination import encode_cursor
+        
+        assert TextValidator.validate_list_params({}) == (TextValidator.DEFAULT_PAGE_SIZE, None)
+        
+        cursor = encode_cursor(datetime(2024, 1, 2, 3, 4, 5), 42)
+        limit, after = TextValidator.validate_list_params({'limit': '5', 'cursor': cursor})
+        assert limit == 5
+        assert after == (datetime(2024, 1, 2, 3, 4, 5), 42)
+        
+        with pytest.raises(ValidationError) as excinfo:
+            TextValidator.validate_list_params({'limit': '0', 'cursor': 'not-a-cursor'})
+        
+        assert set(excinfo.value.errors) == {'limit', 'cursor'}
+    
+    def test_validate_search_params(self):
+        """Test validating search query parameters"""
+        assert TextValidator.validate_search_params({'q': ' cats '}) == ('cats', TextValidator.DEFAULT_PAGE_SIZE, 0)
+        assert TextValidator.validate_search_params({'q': 'cats', 'limit': '5', 'offset': '10'}) == ('cats', 5, 10)
+        
+        with pytest.raises(ValidationError) as excinfo:
+            TextValidator.validate_search_params({'q': '', 'limit': 'many', 'offset': '-1'})
+        
+        assert set(excinfo.value.errors) == {'q', 'limit', 'offset'}
+    
+    def test_validate_export_params(self):
+        """Test validating export query parameters"""
+        assert TextValidator.validate_export_params({}) == ('ndjson', False)
+        assert TextValidator.validate_export_params({'format': 'csv', 'gzip': 'TRUE'}) == ('csv', True)
+        
+        with pytest.raises(ValidationError) as excinfo:
+            TextValidator.validate_export_params({'format': 'xml', 'gzip': 'yes'})
+        
+        assert set(excinfo.value.errors) == {'format', 'gzip'}